@@ -1,16 +1,28 @@
 from datetime import datetime, timezone
+from typing import Optional
 
 from bson import ObjectId
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from pydantic import BaseModel, Field
+from pymongo import ReturnDocument
 
+from api.endpoints.order import ORDER_PREGENERATE_BATCH, _build_order_doc, _build_queued_orders
 from db.database import database
 from models.game import Game
+from utils.accounts import account_filter
 from utils.auth import get_current_user
+from utils.game_sessions import game_sessions
+from utils.leaderboard import LEADERBOARD_PERIODS, leaderboard, window_start
+from utils.menu_cache import menu_cache
+from utils.menu_revisions import menu_revisions, slim_order
+from utils.metrics import timed
+from utils.order_archive import archive_game_later
+from utils.pagination import fetch_page, ndjson_response, next_cursor_headers, page_query
+from utils.responses import json_response, public_doc
+from utils.stats import public_stats, recent_days, record_game, stats_col, stats_id
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 game_col = database["game"]
-menu_col = database["menu"]
 order_col = database["order"]
 user_col = database["user"]
 
@@ -30,14 +42,6 @@ def _as_object_id(value: str, label: str) -> ObjectId:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid {label} id")
 
 
-def _serialize_game(game: dict) -> dict:
-    game["id"] = str(game["_id"])
-    if "menu_id" in game:
-        game["menu_id"] = str(game["menu_id"])
-    game.pop("_id", None)
-    return game
-
-
 @router.post(
     "/start",
     status_code=status.HTTP_201_CREATED,
@@ -45,102 +49,162 @@ def _serialize_game(game: dict) -> dict:
     description="현재 사용자로 게임을 생성하고 첫 주문을 반환합니다.",
 )
 async def start_game(body: GameStartRequest, user_id: str = Depends(get_current_user)):
-    menu = await menu_col.find_one({"_id": _as_object_id(body.menu_id, "menu")})
+    menu = await menu_cache.load(_as_object_id(body.menu_id, "menu"))
     if menu is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu not found")
 
-    game = Game(
-        user_id=user_id,
-        menu_id=body.menu_id,
-        score=0,
-        date=datetime.now(timezone.utc),
-    )
-    game_doc = game.model_dump()
+    with timed("pydantic"):
+        game = Game(
+            user_id=user_id,
+            menu_id=body.menu_id,
+            score=0,
+            date=datetime.now(timezone.utc),
+        )
+        game_doc = game.model_dump()
     game_doc["menu_id"] = _as_object_id(body.menu_id, "menu")
+    # 첫 주문이 위치 0을 씁니다. 이후 주문은 order.py의 _reserve_order_seq가 이어서 받아 갑니다.
+    game_doc["order_seq"] = 1
     result = await game_col.insert_one(game_doc)
     game_doc["_id"] = result.inserted_id
 
     # Create first order for the game
-    from api.endpoints.order import _pick_random_menu
-
-    selection = _pick_random_menu(menu)
-    order_doc = {
-        "menu_id": menu["_id"],
-        "game_id": game_doc["_id"],
-        "menu_name": menu.get("name"),
-        "menu_description": menu.get("description"),
-        "level": menu.get("level"),
-        "selection": selection,
-        "created_at": datetime.now(timezone.utc),
-    }
-    order_result = await order_col.insert_one(order_doc)
-    order_doc["_id"] = order_result.inserted_id
-
-    return {
-        "order": {
-            "id": str(order_doc["_id"]),
-            "menu_id": str(order_doc["menu_id"]),
-            "game_id": str(order_doc["game_id"]),
-            "selection": order_doc["selection"],
-        }
-    }
+    order_doc = _build_order_doc(menu, game_doc["_id"], 0)
+    await menu_revisions.save(menu)
+    if ORDER_PREGENERATE_BATCH > 0:
+        # 첫 주문과 이후 주문 배치를 한 번에 저장합니다.
+        queued = _build_queued_orders(menu, game_doc["_id"], 0, ORDER_PREGENERATE_BATCH)
+        order_result = await order_col.insert_many([slim_order(doc) for doc in [order_doc] + queued])
+        order_doc["_id"] = order_result.inserted_ids[0]
+    else:
+        order_result = await order_col.insert_one(slim_order(order_doc))
+        order_doc["_id"] = order_result.inserted_id
+    menu_cache.bind_game(game_doc["_id"], menu.id)
+    game_sessions.create(game_doc, menu, dict(order_doc))
+
+    return json_response(
+        {
+            "order": {
+                "id": order_doc["_id"],
+                "menu_id": order_doc["menu_id"],
+                "game_id": order_doc["game_id"],
+                "selection": order_doc["selection"],
+            }
+        },
+        status_code=status.HTTP_201_CREATED,
+    )
 
 
 @router.post(
     "/end",
     summary="게임 종료",
-    description="게임의 최종 점수를 반환합니다.",
+    description="게임의 최종 점수를 반환합니다. 이미 종료된 게임도 같은 점수를 반환합니다.",
 )
 async def end_game(body: GameEndRequest, user_id: str = Depends(get_current_user)):
-    game = await game_col.find_one({"_id": _as_object_id(body.game_id, "game")})
+    game_id = _as_object_id(body.game_id, "game")
+    # 소유자를 먼저 확인합니다. 다른 사용자의 요청이 세션을 내리거나 저장을 앞당기면 안 됩니다.
+    game = await game_col.find_one({"_id": game_id}, {"user_id": 1, "score": 1, "ended_at": 1})
     if game is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Game not found")
     if game.get("user_id") != user_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Game does not belong to user")
-    return {
-        "game_id": body.game_id,
-        "score": game.get("score", 0),
-    }
+    if game.get("ended_at") is not None:
+        # 이미 종료된 게임은 통계에 다시 반영하지 않습니다.
+        return json_response({"game_id": body.game_id, "score": game.get("score", 0)})
+    # 메모리에만 있던 채점 결과를 저장한 뒤 최종 점수를 읽습니다.
+    await game_sessions.end(game_id)
+    game = await game_col.find_one_and_update(
+        {"_id": game_id, "user_id": user_id, "ended_at": None},
+        {"$set": {"ended_at": datetime.now(timezone.utc)}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if game is None:
+        # 동시에 들어온 다른 종료 요청이 먼저 끝냈습니다.
+        game = await game_col.find_one({"_id": game_id}, {"score": 1})
+        return json_response({"game_id": body.game_id, "score": game.get("score", 0)})
+    # 꺼내지 않은 미리 생성된 주문은 더 이상 필요 없습니다.
+    await order_col.delete_many({"game_id": game["_id"], "queue_seq": {"$exists": True}})
+    await record_game(user_id, game["menu_id"], game.get("score", 0), game["date"])
+    # 주문 요약은 응답을 기다리게 하지 않도록 뒤에서 합니다.
+    archive_game_later(game)
+    return json_response({"game_id": body.game_id, "score": game.get("score", 0)})
 
 
 @router.get(
     "/",
     summary="게임 목록",
-    description="현재 사용자의 게임 목록을 반환합니다.",
+    description="현재 사용자의 게임 목록을 반환합니다. 다음 페이지가 있으면 X-Next-Cursor 헤더의 값을 cursor로 넘기세요.",
 )
 async def list_games(
     user_id: str = Depends(get_current_user),
     limit: int = Query(100, ge=1, le=1000, description="반환할 최대 개수"),
+    cursor: Optional[str] = Query(None, description="이전 응답의 X-Next-Cursor 값"),
+    stream: bool = Query(False, description="true면 NDJSON으로 스트리밍 (마지막 줄에 next_cursor)"),
 ):
-    games = await game_col.find({"user_id": user_id}).to_list(limit)
-    user = await user_col.find_one({"$or": [{"account_id": user_id}, {"accountId": user_id}]})
+    user = await user_col.find_one(account_filter(user_id))
     user_name = user.get("name") if user else None
-    serialized = [_serialize_game(game) for game in games]
-    for game in serialized:
+
+    def serialize(game: dict) -> dict:
+        game = public_doc(game)
         game["user_name"] = user_name
-    return serialized
+        return game
+
+    find_cursor = game_col.find(page_query({"user_id": user_id}, cursor)).sort("_id", 1)
+    if stream:
+        return ndjson_response(find_cursor, limit, serialize)
+    games, next_cursor = await fetch_page(find_cursor, limit)
+    return json_response([serialize(game) for game in games], headers=next_cursor_headers(next_cursor))
+
+
+def _leaderboard_scope(menu_id: Optional[str], period: str) -> Optional[str]:
+    if period not in LEADERBOARD_PERIODS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid period")
+    if menu_id is None:
+        return None
+    return str(_as_object_id(menu_id, "menu"))
 
 
 @router.get(
     "/top",
     summary="상위 점수",
-    description="점수 기준 상위 게임을 반환합니다.",
+    description="점수 기준 상위 게임을 반환합니다. menu_id로 메뉴별, period(all/daily/weekly)로 기간별 순위를 봅니다.",
 )
-async def list_top_games(limit: int = Query(10, ge=1, le=100, description="반환할 최대 개수")):
-    games = await game_col.find().sort("score", -1).to_list(limit)
-    user_ids = {game.get("user_id") for game in games if game.get("user_id")}
-    users = await user_col.find(
-        {"$or": [{"account_id": {"$in": list(user_ids)}}, {"accountId": {"$in": list(user_ids)}}]}
-    ).to_list(len(user_ids))
-    name_map = {}
-    for user in users:
-        account_id = user.get("account_id") or user.get("accountId")
-        if account_id:
-            name_map[account_id] = user.get("name")
-    serialized = [_serialize_game(game) for game in games]
-    for game in serialized:
-        game["user_name"] = name_map.get(game.get("user_id"))
-    return serialized
+async def list_top_games(
+    limit: int = Query(10, ge=1, le=100, description="반환할 최대 개수"),
+    menu_id: Optional[str] = Query(None, description="메뉴 id (없으면 전체)"),
+    period: str = Query("all", description="all, daily, weekly 중 하나 (UTC 기준)"),
+):
+    menu_id = _leaderboard_scope(menu_id, period)
+    return json_response(await leaderboard.top(limit, menu_id=menu_id, period=period))
+
+
+@router.get(
+    "/rank",
+    summary="내 순위",
+    description="현재 사용자의 최고 점수 게임이 몇 위인지 반환합니다.",
+)
+async def get_my_rank(
+    user_id: str = Depends(get_current_user),
+    menu_id: Optional[str] = Query(None, description="메뉴 id (없으면 전체)"),
+    period: str = Query("all", description="all, daily, weekly 중 하나 (UTC 기준)"),
+):
+    menu_id = _leaderboard_scope(menu_id, period)
+    query = {"user_id": user_id}
+    if menu_id is not None:
+        query["menu_id"] = _as_object_id(menu_id, "menu")
+    since = window_start(period)
+    if since is not None:
+        query["date"] = {"$gte": since}
+    game = await game_col.find_one(query, sort=[("score", -1)])
+    if game is None:
+        return json_response(None)
+    score = game.get("score", 0)
+    return json_response(
+        {
+            "game_id": game["_id"],
+            "score": score,
+            "rank": await leaderboard.rank(score, menu_id=menu_id, period=period),
+        }
+    )
 
 
 @router.get(
@@ -151,9 +215,47 @@ async def list_top_games(limit: int = Query(10, ge=1, le=100, description="반
 async def get_best_game(user_id: str = Depends(get_current_user)):
     game = await game_col.find_one({"user_id": user_id}, sort=[("score", -1)])
     if game is None:
-        return None
-    user = await user_col.find_one({"$or": [{"account_id": user_id}, {"accountId": user_id}]})
-    user_name = user.get("name") if user else None
-    serialized = _serialize_game(game)
-    serialized["user_name"] = user_name
-    return serialized
+        return json_response(None)
+    user = await user_col.find_one(account_filter(user_id))
+    game = public_doc(game)
+    game["user_name"] = user.get("name") if user else None
+    return json_response(game)
+
+
+@router.get(
+    "/stats/me",
+    summary="내 통계",
+    description="현재 사용자의 채점 수, 정답률, 평균/최고 점수, 연속 정답 기록을 전체와 메뉴별로 반환합니다.",
+)
+async def get_my_stats(user_id: str = Depends(get_current_user)):
+    user_stats = await stats_col.find_one({"_id": stats_id("user", user_id)})
+    menus = stats_col.find({"scope": "user_menu", "user_id": user_id})
+    return json_response(
+        {
+            "user_id": user_id,
+            "total": public_stats(user_stats),
+            "menus": [public_stats(doc) async for doc in menus],
+        }
+    )
+
+
+@router.get(
+    "/stats/menu/{menu_id}",
+    summary="메뉴 통계",
+    description="메뉴의 누적 통계와 최근 days일(UTC)의 일별 게임 수, 평균 점수, 정답률을 반환합니다.",
+)
+async def get_menu_stats(
+    menu_id: str,
+    days: int = Query(7, ge=1, le=90, description="일별 통계를 볼 기간 (오늘 포함)"),
+):
+    menu_id = str(_as_object_id(menu_id, "menu"))
+    menu_stats = await stats_col.find_one({"_id": stats_id("menu", menu_id)})
+    day_ids = {stats_id("menu_day", menu_id, day): day for day in recent_days(days)}
+    found = {doc["_id"]: doc async for doc in stats_col.find({"_id": {"$in": list(day_ids)}})}
+    return json_response(
+        {
+            "menu_id": menu_id,
+            "total": public_stats(menu_stats),
+            "days": [public_stats(found.get(key) or {"day": day}) for key, day in day_ids.items()],
+        }
+    )
@@ -0,0 +1,154 @@
+import asyncio
+import contextlib
+import json
+import os
+from typing import Callable, Optional
+
+from bson import ObjectId
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from pydantic import ValidationError
+
+from api.endpoints.order import OrderScoreRequest, _next_order, _score, public_order
+from db.database import database
+from utils.auth import get_access_token_user
+from utils.game_sessions import game_sessions, is_active
+from utils.leaderboard import LEADERBOARD_PERIODS, leaderboard_feed
+from utils.rate_limit import client_ip, rate_limiter
+from utils.responses import dumps
+
+# 클라이언트 메시지 하나의 크기 상한 (문자 수)
+GAME_WS_MAX_MESSAGE_SIZE = int(os.getenv("GAME_WS_MAX_MESSAGE_SIZE", "8192"))
+
+# 웹소켓은 Authorization 헤더를 쓸 수 없으므로 HTTPBearer 의존성 없이 ?token=으로 인증합니다.
+router = APIRouter()
+game_col = database["game"]
+
+
+class _GameChannel:
+    def __init__(self, websocket: WebSocket, game_id: ObjectId, user_id: str):
+        self.websocket = websocket
+        self.game_id = game_id
+        self.user_id = user_id
+        self._send_lock = asyncio.Lock()
+        # 순위는 마지막 것만 보내면 되므로 느린 클라이언트에게 쌓아 두지 않습니다.
+        self._board: Optional[dict] = None
+        self._board_ready = asyncio.Event()
+        self._unwatch: Optional[Callable[[], None]] = None
+
+    async def send(self, message: dict) -> None:
+        async with self._send_lock:
+            await self.websocket.send_text(dumps(message).decode("utf-8"))
+
+    def offer_board(self, message: dict) -> None:
+        self._board = message
+        self._board_ready.set()
+
+    async def push_boards(self) -> None:
+        while True:
+            await self._board_ready.wait()
+            self._board_ready.clear()
+            try:
+                await self.send(self._board)
+            except (WebSocketDisconnect, RuntimeError):
+                # 연결이 끊기면 receive 쪽에서 정리합니다. 여기서는 조용히 끝냅니다.
+                return
+
+    def unwatch(self) -> None:
+        if self._unwatch is not None:
+            self._unwatch()
+            self._unwatch = None
+
+    async def handle(self, message: dict) -> dict:
+        kind = message.get("type")
+        if kind == "answer":
+            try:
+                body = OrderScoreRequest(
+                    game_id=str(self.game_id),
+                    **{key: message.get(key) for key in ("order_id", "category", "menu_name", "topping_names")},
+                )
+            except ValidationError:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid answer")
+            # HTTP 채점과 같은 한도를 씁니다.
+            async with rate_limiter.admit("score", client_ip(self.websocket), self.user_id):
+                result, game_id, session, menu = await _score(body, self.user_id)
+                result["type"] = "scored"
+                if message.get("next", True):
+                    result["next_order"] = public_order(await _next_order(game_id, session, menu))
+            return result
+        if kind == "next":
+            order = await _next_order(self.game_id, await game_sessions.get(self.game_id))
+            return {"type": "order", "order": public_order(order)}
+        if kind == "subscribe":
+            menu_id = message.get("menu_id")
+            period = message.get("period", "all")
+            if period not in LEADERBOARD_PERIODS:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid period")
+            if menu_id is not None:
+                if not ObjectId.is_valid(menu_id):
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid menu id")
+                menu_id = str(ObjectId(menu_id))
+            self.unwatch()
+            self._unwatch = leaderboard_feed.watch(menu_id, period, self.offer_board)
+            return await leaderboard_feed.snapshot(menu_id, period)
+        if kind == "unsubscribe":
+            self.unwatch()
+            return {"type": "unsubscribed"}
+        if kind == "ping":
+            return {"type": "pong"}
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unknown message type")
+
+
+@router.websocket("/ws/{game_id}")
+async def game_channel(websocket: WebSocket, game_id: str, token: Optional[str] = Query(None)):
+    """게임 하나의 주문 받기, 답안 제출/채점, 순위 구독을 연결 하나로 처리합니다.
+
+    클라이언트 메시지: answer(order_id, category, menu_name, topping_names[, next]), next,
+    subscribe(menu_id, period), unsubscribe, ping. ref를 넣으면 응답에 그대로 돌려줍니다.
+    채점 한도를 넘으면 status 429와 retry_after(초)가 담긴 error를 보냅니다.
+    """
+    try:
+        user_id = get_access_token_user(token or "")
+        game_oid = ObjectId(game_id)
+    except Exception:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    game = await game_col.find_one(
+        {"_id": game_oid, "user_id": user_id}, {"score": 1, "ended_at": 1, "archived_at": 1}
+    )
+    if game is None or not is_active(game):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    channel = _GameChannel(websocket, game_oid, user_id)
+    pusher = asyncio.create_task(channel.push_boards())
+    try:
+        await channel.send({"type": "ready", "game_id": game_oid, "score": game.get("score", 0)})
+        while True:
+            text = await websocket.receive_text()
+            message = None
+            try:
+                if len(text) > GAME_WS_MAX_MESSAGE_SIZE:
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Message too large")
+                try:
+                    message = json.loads(text)
+                except ValueError:
+                    pass
+                if not isinstance(message, dict):
+                    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid message")
+                reply = await channel.handle(message)
+            except HTTPException as exc:
+                # 요청 하나가 실패해도 연결은 유지합니다.
+                reply = {"type": "error", "status": exc.status_code, "detail": exc.detail}
+                if exc.headers and "Retry-After" in exc.headers:
+                    reply["retry_after"] = int(exc.headers["Retry-After"])
+            if isinstance(message, dict) and "ref" in message:
+                reply["ref"] = message["ref"]
+            await channel.send(reply)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        channel.unwatch()
+        pusher.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await pusher
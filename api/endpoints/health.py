@@ -0,0 +1,36 @@
+import asyncio
+import os
+
+from fastapi import APIRouter, status
+
+from db.database import database
+from utils.responses import json_response
+
+HEALTH_PING_TIMEOUT_SECONDS = float(os.getenv("HEALTH_PING_TIMEOUT_SECONDS", "2"))
+
+router = APIRouter()
+
+
+@router.get(
+    "/health/live",
+    summary="프로세스 상태",
+    description="프로세스가 요청을 받을 수 있으면 200을 반환합니다. MongoDB는 확인하지 않습니다.",
+)
+async def live():
+    return json_response({"status": "ok"})
+
+
+@router.get(
+    "/health/ready",
+    summary="준비 상태",
+    description="MongoDB ping이 성공하면 200, 실패하거나 시간 안에 응답이 없으면 503을 반환합니다.",
+)
+async def ready():
+    try:
+        await asyncio.wait_for(database.ping(), HEALTH_PING_TIMEOUT_SECONDS)
+    except Exception as exc:
+        return json_response(
+            {"status": "unavailable", "mongo": type(exc).__name__},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        )
+    return json_response({"status": "ok", "mongo": "ok"})
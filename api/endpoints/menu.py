@@ -1,15 +1,28 @@
+import hashlib
 from typing import Optional, List
 
 from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
 
 from db.database import database
 from models.menu import Menu, Category
 from pydantic import BaseModel
+from pymongo import ReturnDocument
 from utils.auth import get_current_user
+from utils.menu_cache import compile_menu, menu_cache, menu_content_hash
+from utils.menu_revisions import menu_revisions
+from utils.pagination import fetch_page, ndjson_response, next_cursor_headers, page_query
+from utils.responses import json_response, public_doc
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
 menu_col = database["menu"]
+# 목록 조회는 secondary로 보낼 수 있습니다. 단건 조회는 메뉴 캐시를 채우므로 primary에서 읽습니다.
+menu_read_col = database.read_mostly["menu"]
+
+MENU_FIELDS = {"name", "description", "level", "data"}
+MENU_FORMATS = ("full", "compact")
+# 동시에 수정되어 content_hash 조건이 어긋났을 때 다시 읽고 시도하는 횟수
+MENU_UPDATE_RETRIES = 3
 
 
 class MenuUpdate(BaseModel):
@@ -27,11 +40,79 @@ def _as_object_id(menu_id: str) -> ObjectId:
 
 
 def _serialize_menu(menu: dict) -> dict:
-    menu["id"] = str(menu["_id"])
-    menu.pop("_id", None)
+    menu.pop("content_hash", None)
+    return public_doc(menu)
+
+
+def _projection(fields: Optional[str]) -> Optional[dict]:
+    if not fields:
+        return None
+    projection = {"content_hash": 1}
+    for field in fields.split(","):
+        field = field.strip()
+        if not field:
+            continue
+        # data.kategorie, data.menus.name 처럼 배열 안쪽 필드도 지정할 수 있습니다.
+        if field.split(".")[0] not in MENU_FIELDS or not all(part.isidentifier() for part in field.split(".")):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid field: {field}")
+        projection[field] = 1
+    return projection
+
+
+def _check_format(format: str) -> None:
+    if format not in MENU_FORMATS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid format")
+
+
+def _compact_menu(menu: dict) -> dict:
+    # 이미지 URL은 images 테이블에 한 번만 싣고 항목에서는 인덱스로 참조합니다.
+    images: List[str] = []
+    image_index = {}
+
+    def compact_item(item: dict) -> dict:
+        item = dict(item)
+        if "img" in item:
+            img = item["img"]
+            if img not in image_index:
+                image_index[img] = len(images)
+                images.append(img)
+            item["img"] = image_index[img]
+        return item
+
+    categories = []
+    for category in menu.get("data", []):
+        category = dict(category)
+        if "menus" in category:
+            category["menus"] = [compact_item(item) for item in category["menus"]]
+        if "toping" in category:
+            groups = []
+            for group in category["toping"]:
+                group = dict(group)
+                if "items" in group:
+                    group["items"] = [compact_item(item) for item in group["items"]]
+                groups.append(group)
+            category["toping"] = groups
+        categories.append(category)
+    if "data" in menu:
+        menu["data"] = categories
+    menu["images"] = images
     return menu
 
 
+def _menu_etag(content_hash: str, fields: Optional[str], format: str) -> str:
+    variant = f"{fields or ''}|{format}"
+    if variant == "|full":
+        return f'"{content_hash}"'
+    return f'"{content_hash}-{hashlib.sha256(variant.encode("utf-8")).hexdigest()[:8]}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return etag in candidates or "*" in candidates
+
+
 @router.post(
     "/",
     status_code=status.HTTP_201_CREATED,
@@ -40,19 +121,41 @@ def _serialize_menu(menu: dict) -> dict:
 )
 async def create_menu(menu: Menu):
     menu_dict = menu.model_dump()
+    menu_dict["content_hash"] = menu_content_hash(menu_dict)
     result = await menu_col.insert_one(menu_dict)
     menu_dict["_id"] = result.inserted_id
-    return _serialize_menu(menu_dict)
+    # 채점용 정답 인덱스를 저장 시점에 만들어 둡니다.
+    compiled = compile_menu(menu_dict)
+    menu_cache.put(compiled)
+    # 주문은 이 revision을 참조하므로 메뉴가 바뀌거나 지워져도 남겨 둡니다.
+    await menu_revisions.save(compiled)
+    etag = _menu_etag(menu_dict["content_hash"], None, "full")
+    return json_response(_serialize_menu(menu_dict), status_code=status.HTTP_201_CREATED, headers={"ETag": etag})
 
 
 @router.get(
     "/",
     summary="메뉴 목록",
-    description="메뉴 전체 문서를 반환합니다.",
+    description="메뉴 전체 문서를 반환합니다. 다음 페이지가 있으면 X-Next-Cursor 헤더의 값을 cursor로 넘기세요.",
 )
-async def list_menus(limit: int = Query(100, ge=1, le=1000, description="반환할 최대 개수")):
-    menus = await menu_col.find().to_list(limit)
-    return [_serialize_menu(menu) for menu in menus]
+async def list_menus(
+    limit: int = Query(100, ge=1, le=1000, description="반환할 최대 개수"),
+    cursor: Optional[str] = Query(None, description="이전 응답의 X-Next-Cursor 값"),
+    stream: bool = Query(False, description="true면 NDJSON으로 스트리밍 (마지막 줄에 next_cursor)"),
+    fields: Optional[str] = Query(None, description="반환할 필드 (쉼표 구분, 예: name,data.kategorie)"),
+    format: str = Query("full", description="full 또는 compact (이미지 URL 테이블로 중복 제거)"),
+):
+    _check_format(format)
+
+    def serialize(menu: dict) -> dict:
+        menu = _serialize_menu(menu)
+        return _compact_menu(menu) if format == "compact" else menu
+
+    find_cursor = menu_read_col.find(page_query({}, cursor), _projection(fields)).sort("_id", 1)
+    if stream:
+        return ndjson_response(find_cursor, limit, serialize)
+    menus, next_cursor = await fetch_page(find_cursor, limit)
+    return json_response([serialize(menu) for menu in menus], headers=next_cursor_headers(next_cursor))
 
 
 @router.get(
@@ -61,20 +164,48 @@ async def list_menus(limit: int = Query(100, ge=1, le=1000, description="반환
     description="id/name/description만 반환합니다.",
 )
 async def list_menu_summaries(limit: int = Query(100, ge=1, le=1000, description="반환할 최대 개수")):
-    menus = await menu_col.find({}, {"name": 1, "description": 1}).to_list(limit)
-    return [{"id": str(menu["_id"]), "name": menu.get("name"), "description": menu.get("description")} for menu in menus]
+    menus = await menu_read_col.find({}, {"name": 1, "description": 1}).to_list(limit)
+    return json_response(
+        [{"id": menu["_id"], "name": menu.get("name"), "description": menu.get("description")} for menu in menus]
+    )
 
 
 @router.get(
     "/{menu_id}",
     summary="메뉴 조회",
-    description="id로 메뉴를 조회합니다.",
+    description="id로 메뉴를 조회합니다. ETag를 If-None-Match로 보내면 바뀌지 않은 경우 304를 반환합니다.",
 )
-async def get_menu(menu_id: str):
-    menu = await menu_col.find_one({"_id": _as_object_id(menu_id)})
+async def get_menu(
+    menu_id: str,
+    fields: Optional[str] = Query(None, description="반환할 필드 (쉼표 구분, 예: name,data.kategorie)"),
+    format: str = Query("full", description="full 또는 compact (이미지 URL 테이블로 중복 제거)"),
+    if_none_match: Optional[str] = Header(None),
+):
+    _check_format(format)
+    object_id = _as_object_id(menu_id)
+    projection = _projection(fields)
+    cached = menu_cache.get(object_id)
+    if cached is not None:
+        etag = _menu_etag(cached.content_hash, fields, format)
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    menu = await menu_col.find_one({"_id": object_id}, projection)
     if menu is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu not found")
-    return _serialize_menu(menu)
+    content_hash = menu.get("content_hash")
+    if projection is None:
+        compiled = compile_menu(menu)
+        menu_cache.put(compiled)
+        content_hash = compiled.content_hash
+    headers = {}
+    if content_hash:
+        etag = _menu_etag(content_hash, fields, format)
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        headers["ETag"] = etag
+    menu = _serialize_menu(menu)
+    return json_response(_compact_menu(menu) if format == "compact" else menu, headers=headers)
 
 
 @router.put(
@@ -86,11 +217,28 @@ async def update_menu(menu_id: str, menu: MenuUpdate):
     update = {k: v for k, v in menu.model_dump().items() if v is not None}
     if not update:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No fields to update")
-    result = await menu_col.update_one({"_id": _as_object_id(menu_id)}, {"$set": update})
-    if result.matched_count == 0:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu not found")
-    updated = await menu_col.find_one({"_id": _as_object_id(menu_id)})
-    return _serialize_menu(updated)
+    object_id = _as_object_id(menu_id)
+    for _attempt in range(MENU_UPDATE_RETRIES):
+        current = await menu_col.find_one({"_id": object_id})
+        if current is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu not found")
+        content_hash = menu_content_hash({**current, **update})
+        # 읽은 뒤 다른 수정이 끼어들지 않았을 때만 내용과 content_hash를 한 번에 씁니다.
+        updated = await menu_col.find_one_and_update(
+            {"_id": object_id, "content_hash": current.get("content_hash")},
+            {"$set": {**update, "content_hash": content_hash}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if updated is not None:
+            break
+    else:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Menu was modified concurrently")
+    menu_cache.invalidate(menu_id)
+    compiled = compile_menu(updated)
+    menu_cache.put(compiled)
+    await menu_revisions.save(compiled)
+    etag = _menu_etag(updated["content_hash"], None, "full")
+    return json_response(_serialize_menu(updated), headers={"ETag": etag})
 
 
 @router.delete(
@@ -102,4 +250,5 @@ async def delete_menu(menu_id: str):
     result = await menu_col.delete_one({"_id": _as_object_id(menu_id)})
     if result.deleted_count == 0:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu not found")
-    return {"message": "Menu deleted"}
+    menu_cache.invalidate(menu_id)
+    return json_response({"message": "Menu deleted"})
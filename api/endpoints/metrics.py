@@ -0,0 +1,52 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from utils.metrics import render_prometheus
+from utils.password_pool import password_pool
+from utils.rate_limit import rate_limiter
+
+router = APIRouter()
+
+
+def _password_pool_lines() -> list:
+    snapshot = password_pool.metrics()
+    lines = [
+        "# TYPE password_hash_queue_depth gauge",
+        f"password_hash_queue_depth {snapshot['queue_depth']}",
+        "# TYPE password_hash_rejected_total counter",
+        f"password_hash_rejected_total {snapshot['rejected']}",
+        "# TYPE password_hash_wait_seconds_total counter",
+        f"password_hash_wait_seconds_total {snapshot['wait_seconds_sum']}",
+        "# TYPE password_hash_duration_seconds histogram",
+    ]
+    for bound, count in snapshot["hash_seconds_buckets"].items():
+        lines.append(f'password_hash_duration_seconds_bucket{{le="{bound}"}} {count}')
+    lines.append(f'password_hash_duration_seconds_bucket{{le="+Inf"}} {snapshot["completed"]}')
+    lines.append(f"password_hash_duration_seconds_sum {snapshot['hash_seconds_sum']}")
+    lines.append(f"password_hash_duration_seconds_count {snapshot['completed']}")
+    return lines
+
+
+def _rate_limit_lines() -> list:
+    snapshot = rate_limiter.metrics()
+    lines = ["# TYPE rate_limit_rejected_total counter"]
+    for (route, scope), count in sorted(snapshot["rejected"].items()):
+        lines.append(f'rate_limit_rejected_total{{route="{route}",scope="{scope}"}} {count}')
+    lines.append("# TYPE rate_limit_in_flight gauge")
+    for route, count in sorted(snapshot["in_flight"].items()):
+        lines.append(f'rate_limit_in_flight{{route="{route}"}} {count}')
+    return lines
+
+
+@router.get(
+    "/metrics",
+    summary="Prometheus 메트릭",
+    description="라우트별 지연 시간, MongoDB 명령 수/시간, 단계별(pydantic/bcrypt/jwt) 시간을 반환합니다.",
+    response_class=PlainTextResponse,
+    include_in_schema=False,
+)
+async def metrics():
+    return PlainTextResponse(
+        render_prometheus(_password_pool_lines() + _rate_limit_lines()),
+        media_type="text/plain; version=0.0.4",
+    )
@@ -1,20 +1,51 @@
-import random
+import asyncio
+import os
 from datetime import datetime, timezone
-from typing import Optional
+from typing import List, Optional, Tuple, Union
 
 from bson import ObjectId
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
 from pydantic import BaseModel, Field
+from pymongo import ReturnDocument
 
 from db.database import database
 from models.order import Order, OrderSelection
 from utils.auth import get_current_user
+from utils.game_sessions import ACTIVE_GAME, GameSession, Outcome, game_sessions, is_active, persist_outcomes
+from utils.leaderboard import leaderboard
+from utils.menu_cache import CompiledMenu, menu_cache
+from utils.menu_revisions import answer_from_pick, menu_revisions, pick_from_names, slim_order
+from utils.metrics import timed
+from utils.order_generator import order_generators
+from utils.order_archive import archive_col, archived_orders
+from utils.pagination import fetch_page, ndjson_page, ndjson_response, next_cursor_headers, page_list, page_query
+from utils.rate_limit import client_ip, rate_limiter
+from utils.responses import json_response, public_doc
+from utils.stats import answer_stats
 
 router = APIRouter(dependencies=[Depends(get_current_user)])
-menu_col = database["menu"]
 order_col = database["order"]
 game_col = database["game"]
 
+# 0이면 주문을 요청 시점에 생성합니다. 양수면 start_game에서 N개를 미리 만들어 둡니다.
+ORDER_PREGENERATE_BATCH = int(os.getenv("ORDER_PREGENERATE_BATCH", "0"))
+ORDER_REFILL_THRESHOLD = int(os.getenv("ORDER_REFILL_THRESHOLD", str(max(1, ORDER_PREGENERATE_BATCH // 4))))
+ORDER_SCORE_BATCH_MAX = int(os.getenv("ORDER_SCORE_BATCH_MAX", "200"))
+
+_background_tasks = set()
+_SCORE_PROJECTION = {
+    "menu_id": 1,
+    "game_id": 1,
+    "selection": 1,
+    "pick": 1,
+    "level": 1,
+    "answer": 1,
+    "menu_hash": 1,
+    "queue_seq": 1,
+    "scored_at": 1,
+    "is_correct": 1,
+}
+
 
 class OrderCreateRequest(BaseModel):
     game_id: str = Field(..., description="게임 id", examples=["64f1c6f0d1a2b3c4d5e6f789"])
@@ -28,6 +59,17 @@ class OrderScoreRequest(BaseModel):
     topping_names: Optional[list] = Field(None, description="선택한 토핑 이름 목록")
 
 
+# 채점/저장에만 쓰는 필드. answer는 정답 그 자체이고, menu_hash/pick은 hydrate 뒤에는 필요 없습니다.
+_PRIVATE_ORDER_FIELDS = ("answer", "menu_hash", "pick")
+
+
+def public_order(order: dict) -> dict:
+    """주문 응답은 모두 이 함수를 거칩니다. 저장용 필드를 빼고 _id를 id로 바꿉니다."""
+    for key in _PRIVATE_ORDER_FIELDS:
+        order.pop(key, None)
+    return public_doc(order)
+
+
 def _as_object_id(value: str, label: str) -> ObjectId:
     try:
         return ObjectId(value)
@@ -35,131 +77,452 @@ def _as_object_id(value: str, label: str) -> ObjectId:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid {label} id")
 
 
-def _serialize_order(order: dict) -> dict:
-    order["id"] = str(order["_id"])
-    if "menu_id" in order:
-        order["menu_id"] = str(order["menu_id"])
-    if "game_id" in order:
-        order["game_id"] = str(order["game_id"])
-    order.pop("_id", None)
+def _game_ended() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Game already ended")
+
+
+async def _active_game(game_id: ObjectId, projection: Optional[dict] = None) -> dict:
+    # 끝난 게임에 주문을 더하거나 채점하면 요약(order_archive), 통계, 순위가 서로 어긋납니다.
+    game = await game_col.find_one({"_id": game_id}, {**(projection or {}), "ended_at": 1, "archived_at": 1})
+    if game is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Game not found")
+    if not is_active(game):
+        raise _game_ended()
+    return game
+
+
+def _build_order_docs(menu: CompiledMenu, game_id: ObjectId, count: int, position: Union[int, str]) -> List[dict]:
+    generator = order_generators.for_menu(menu)
+    if generator.empty:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Menu has no items")
+    generated = generator.generate(count, order_generators.stream(game_id, position))
+    created_at = datetime.now(timezone.utc)
+    docs = []
+    with timed("pydantic"):
+        for selection, answer, pick in generated:
+            order = Order(
+                menu_id=str(menu.id),
+                game_id=str(game_id),
+                menu_name=menu.name,
+                menu_description=menu.description,
+                level=menu.level,
+                selection=OrderSelection(**selection),
+                created_at=created_at,
+            )
+            order_doc = order.model_dump()
+            order_doc["menu_id"] = menu.id
+            order_doc["game_id"] = game_id
+            order_doc["is_correct"] = False
+            order_doc["answer"] = answer
+            order_doc["menu_hash"] = menu.content_hash
+            order_doc["pick"] = pick
+            docs.append(order_doc)
+    return docs
+
+
+def _build_order_doc(menu: CompiledMenu, game_id: ObjectId, order_seq: int) -> dict:
+    return _build_order_docs(menu, game_id, 1, order_seq)[0]
+
+
+def _build_queued_orders(menu: CompiledMenu, game_id: ObjectId, start_seq: int, count: int) -> List[dict]:
+    docs = _build_order_docs(menu, game_id, count, f"queue:{start_seq}") if count > 0 else []
+    for offset, order_doc in enumerate(docs):
+        order_doc["queue_seq"] = start_seq + offset
+    # 남은 주문이 ORDER_REFILL_THRESHOLD개가 되는 지점의 주문을 꺼내면 다음 배치를 채웁니다.
+    marker = max(0, count - ORDER_REFILL_THRESHOLD)
+    if docs:
+        docs[min(marker, count - 1)]["queue_refill_from"] = start_seq + count
+    return docs
+
+
+async def _refill_order_queue(menu_id: ObjectId, game_id: ObjectId, start_seq: int) -> None:
+    menu = await menu_cache.load(menu_id)
+    if menu is None or not menu.categories:
+        return
+    await menu_revisions.save(menu)
+    docs = _build_queued_orders(menu, game_id, start_seq, ORDER_PREGENERATE_BATCH)
+    await order_col.insert_many([slim_order(order_doc) for order_doc in docs])
+
+
+async def _claim_queued_order(game_id: ObjectId) -> Optional[dict]:
+    claimed_at = datetime.now(timezone.utc)
+    order = await order_col.find_one_and_update(
+        {"game_id": game_id, "queue_seq": {"$exists": True}},
+        {"$unset": {"queue_seq": "", "queue_refill_from": ""}, "$set": {"created_at": claimed_at}},
+        sort=[("queue_seq", 1)],
+    )
+    if order is None:
+        return None
+    order["created_at"] = claimed_at
+    order.pop("queue_seq", None)
+    await menu_revisions.hydrate([order])
+    refill_from = order.pop("queue_refill_from", None)
+    if refill_from is not None:
+        task = asyncio.create_task(_refill_order_queue(order["menu_id"], game_id, refill_from))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
     return order
 
 
-def _pick_random_menu(menu: dict) -> dict:
-    categories = menu.get("data", [])
-    if not categories:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Menu has no categories")
-    category = random.choice(categories)
-    items = category.get("menus", [])
-    if not items:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Category has no items")
-    item = random.choice(items)
-    toppings = []
-    topping_groups = category.get("toping", [])
-    for group in topping_groups:
-        if random.choice([True, False]):
-            group_items = group.get("items", [])
-            if group_items:
-                topping_item = random.choice(group_items)
-                toppings.append({"group": group.get("name"), "item": topping_item})
-    if not toppings:
-        toppings = None
-    return {
-        "category": category.get("kategorie"),
-        "item": item,
-        "topping": toppings,
-    }
+async def _reserve_order_seq(game_id: ObjectId) -> dict:
+    # 새로 만드는 주문의 난수 위치를 게임 문서에서 하나 가져옵니다. 진행 중인 게임인지도 같이 확인합니다.
+    game = await game_col.find_one_and_update(
+        {"_id": game_id, **ACTIVE_GAME}, {"$inc": {"order_seq": 1}}, projection={"menu_id": 1, "order_seq": 1}
+    )
+    if game is None:
+        game_sessions.drop(game_id)
+        await _active_game(game_id)
+        raise _game_ended()
+    return game
+
+
+async def _next_order(game_id: ObjectId, session: Optional[GameSession], menu: Optional[CompiledMenu] = None) -> dict:
+    # menu를 넘기면(채점하면서 진행 중인 게임임을 이미 확인한 경우) 그 메뉴로 주문을 만듭니다.
+    order_doc = None
+    if ORDER_PREGENERATE_BATCH > 0:
+        if menu is None and session is None:
+            await _active_game(game_id)
+        order_doc = await _claim_queued_order(game_id)
+    if order_doc is None:
+        game = await _reserve_order_seq(game_id)
+        if menu is None and session is not None:
+            menu = await session.current_menu()
+        elif menu is None:
+            menu = await menu_cache.load(game.get("menu_id"))
+            if menu is None:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu not found")
+        order_doc = _build_order_doc(menu, game_id, game.get("order_seq", 0))
+        await menu_revisions.save(menu)
+        result = await order_col.insert_one(slim_order(order_doc))
+        order_doc["_id"] = result.inserted_id
+    menu_cache.bind_game(game_id, order_doc["menu_id"])
+    if session is not None:
+        session.order = dict(order_doc)
+    return order_doc
 
 
 @router.post(
     "/",
     status_code=status.HTTP_201_CREATED,
     summary="주문 생성",
-    description="게임에 대한 랜덤 주문을 생성합니다.",
+    description="게임에 대한 랜덤 주문을 생성합니다. 미리 생성된 주문이 있으면 그 중 다음 주문을 반환합니다. 끝난 게임이면 409를 반환합니다.",
 )
 async def create_order(body: OrderCreateRequest):
-    game = await game_col.find_one({"_id": _as_object_id(body.game_id, "game")})
-    if game is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Game not found")
-    menu = await menu_col.find_one({"_id": game.get("menu_id")})
-    if menu is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Menu not found")
-    selection = _pick_random_menu(menu)
-    order = Order(
-        menu_id=str(menu["_id"]),
-        game_id=body.game_id,
-        menu_name=menu.get("name"),
-        menu_description=menu.get("description"),
-        level=menu.get("level"),
-        selection=OrderSelection(**selection),
-        created_at=datetime.now(timezone.utc),
-    )
-    order_doc = order.model_dump()
-    order_doc["menu_id"] = menu["_id"]
-    order_doc["game_id"] = _as_object_id(body.game_id, "game")
-    order_doc["is_correct"] = False
-    result = await order_col.insert_one(order_doc)
-    order_doc["_id"] = result.inserted_id
-    response = _serialize_order(order_doc)
-    response["menu_id"] = str(menu["_id"])
-    response["game_id"] = body.game_id
-    return response
+    game_id = _as_object_id(body.game_id, "game")
+    order_doc = await _next_order(game_id, await game_sessions.get(game_id))
+    return json_response(public_order(order_doc), status_code=status.HTTP_201_CREATED)
 
 
-@router.post(
-    "/score",
-    summary="주문 채점",
-    description="제출 답안을 확인하고 정답이면 게임 점수를 갱신합니다.",
-)
-async def score_order(body: OrderScoreRequest):
-    order = await order_col.find_one({"_id": _as_object_id(body.order_id, "order")})
-    if order is None:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
-    if str(order.get("game_id")) != body.game_id:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Order does not belong to game")
+async def _find_order(query: dict) -> Optional[dict]:
+    # revision만 참조하는 주문은 expected를 만들 수 있게 selection을 채웁니다.
+    order = await order_col.find_one(query, _SCORE_PROJECTION)
+    if order is not None:
+        await menu_revisions.hydrate([order])
+    return order
+
+
+def _expected_answer(order: dict) -> dict:
     selection = order.get("selection", {})
-    expected_category = selection.get("category")
-    expected_menu = selection.get("item", {}).get("name")
     expected_toppings = []
     if selection.get("topping"):
         for topping in selection["topping"]:
             expected_toppings.append(topping.get("item", {}).get("name"))
     expected_set = set(filter(None, expected_toppings))
-    provided_set = set(filter(None, body.topping_names or []))
+    return {
+        "category": selection.get("category"),
+        "menu_name": selection.get("item", {}).get("name"),
+        "topping_names": list(expected_set) if expected_set else [],
+    }
+
+
+def _answer_matches(order: dict, answer: OrderScoreRequest) -> bool:
+    expected = _expected_answer(order)
+    return (
+        expected["category"] == answer.category
+        and expected["menu_name"] == answer.menu_name
+        and set(expected["topping_names"]) == set(filter(None, answer.topping_names or []))
+    )
+
+
+def _check_answer(order: dict, menu: Optional[CompiledMenu], answer: OrderScoreRequest) -> Optional[bool]:
+    # 주문을 만든 메뉴 그대로면 정수 id/비트마스크로 비교하고, 메뉴에 없는 답안이면 None을 반환합니다.
+    # 그 사이 메뉴가 바뀌었거나 answer가 없는 예전 주문은 이름으로 비교합니다.
+    if menu is None or order.get("menu_hash") != menu.content_hash:
+        return _answer_matches(order, answer)
+    expected = order.get("answer")
+    if expected is None and order.get("pick") is not None:
+        # revision을 참조하는 주문은 answer를 저장하지 않습니다.
+        expected = answer_from_pick(menu, order["pick"])
+    if not expected:
+        return _answer_matches(order, answer)
+    submitted = menu.answers.encode(answer.category, answer.menu_name, answer.topping_names or [])
+    if submitted is None:
+        return None
+    return submitted == expected
+
+
+def _invalid_answer() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Answer not in menu")
+
 
-    is_correct = (
-        body.category == expected_category
-        and body.menu_name == expected_menu
-        and expected_set == provided_set
+def _score_result(body: OrderScoreRequest, order: dict, is_correct: bool, already_scored: bool) -> dict:
+    return {
+        "order_id": body.order_id,
+        "correct": is_correct,
+        "already_scored": already_scored,
+        "expected": _expected_answer(order),
+    }
+
+
+async def _score_in_session(session: GameSession, body: OrderScoreRequest) -> Optional[dict]:
+    order = session.order
+    if "scored_correct" in order:
+        return _score_result(body, order, order["scored_correct"], True)
+    is_correct = _check_answer(order, await session.current_menu(), body)
+    if is_correct is None:
+        raise _invalid_answer()
+    if session.order is not order or "scored_correct" in order:
+        # 메뉴를 읽는 사이 다음 주문으로 넘어갔거나 먼저 채점됐으면 MongoDB 기준으로 처리합니다.
+        return None
+    outcome = Outcome(
+        session.game_id,
+        is_correct,
+        order.get("level") or 0,
+        datetime.now(timezone.utc),
+        session.user_id,
+        session.menu_id,
     )
+    game_sessions.record(session, outcome)
+    return _score_result(body, order, is_correct, False)
+
+
+def _claim_filter(menu: CompiledMenu, body: OrderScoreRequest) -> Optional[dict]:
+    # 주문을 읽지 않고 정답인 주문만 잡는 조건. 지금 메뉴로 만든 주문의 answer 또는 pick을 비교합니다.
+    # 여기서 못 잡은 주문(오답, 이미 채점됨, 예전 메뉴로 만든 주문)은 주문을 읽어서 가립니다.
+    topping_names = body.topping_names or []
+    submitted = menu.answers.encode(body.category, body.menu_name, topping_names)
+    if submitted is None:
+        return None
+    matches = [{f"answer.{key}": value for key, value in submitted.items()}]
+    pick = pick_from_names(menu, body.category, body.menu_name, topping_names)
+    if pick is not None and answer_from_pick(menu, pick) == submitted:
+        matches.append({"answer": None, "pick": pick})
+    return {"menu_hash": menu.content_hash, "$or": matches}
+
+
+async def _score(
+    body: OrderScoreRequest, user_id: str
+) -> Tuple[dict, ObjectId, Optional[GameSession], Optional[CompiledMenu]]:
+    """(채점 결과, game_id, 세션, 채점에 쓴 메뉴). 세션 경로나 이미 채점된 주문이면 메뉴는 None입니다."""
+    order_id = _as_object_id(body.order_id, "order")
+    game_id = _as_object_id(body.game_id, "game")
+    session = await game_sessions.get(game_id)
+    if session is not None:
+        if session.order is not None and session.order["_id"] == order_id:
+            result = await _score_in_session(session, body)
+            if result is not None:
+                return result, game_id, session, None
+        # 세션이 들고 있지 않은 주문은 아직 저장하지 않은 결과를 먼저 내보낸 뒤 MongoDB 기준으로 채점합니다.
+        await game_sessions.flush()
+    # 채점은 주문당 한 번만 반영됩니다. scored_at이 없는 주문만 조건부로 갱신합니다.
+    unscored = {
+        "_id": order_id,
+        "game_id": game_id,
+        "queue_seq": None,
+        "scored_at": None,
+        "is_correct": {"$ne": True},
+    }
+    scored_at = datetime.now(timezone.utc)
+    menu = await menu_cache.for_game(game_id)
+    claim = _claim_filter(menu, body) if menu is not None else None
+    order = None
+    if claim is not None:
+        # 정답이면 주문을 먼저 읽지 않고 바로 채점합니다. 정답 턴은 주문과 게임 갱신 두 번으로 끝납니다.
+        order = await order_col.find_one_and_update(
+            {**unscored, **claim},
+            {"$set": {"is_correct": True, "scored_at": scored_at}},
+            projection=_SCORE_PROJECTION,
+        )
+    if order is not None:
+        is_correct = True
+        await menu_revisions.hydrate([order])
+    else:
+        # 오답인지 이미 채점된 주문인지는 주문을 읽어야 압니다. 끝난 게임인지도 함께 확인합니다.
+        order, _game = await asyncio.gather(_find_order({"_id": order_id}), _active_game(game_id))
+        if order is None or order.get("queue_seq") is not None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Order not found")
+        if order.get("game_id") != game_id:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Order does not belong to game")
+        menu_cache.bind_game(game_id, order["menu_id"])
+        if order.get("scored_at") is not None or order.get("is_correct"):
+            return _score_result(body, order, bool(order.get("is_correct")), True), game_id, session, None
+        menu = await menu_cache.load(order["menu_id"])
+        is_correct = _check_answer(order, menu, body)
+        if is_correct is None:
+            raise _invalid_answer()
+        scored = await order_col.find_one_and_update(
+            unscored,
+            {"$set": {"is_correct": is_correct, "scored_at": scored_at}},
+            projection={"_id": 1},
+        )
+        if scored is None:
+            # 동시에 들어온 다른 채점이 먼저 반영됐습니다.
+            order = await _find_order({"_id": order_id})
+            return _score_result(body, order, bool(order.get("is_correct")), True), game_id, session, menu
+
+    outcome = Outcome(game_id, is_correct, order.get("level") or 0, scored_at, user_id, order["menu_id"])
     if is_correct:
-        game = await game_col.find_one({"_id": _as_object_id(body.game_id, "game")})
-        if game is None:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Game not found")
-        level = order.get("level") or 0
-        await game_col.update_one(
-            {"_id": _as_object_id(body.game_id, "game")},
+        level = outcome.level
+        # 끝난 게임이면 점수를 올리지 않습니다. 종료 시점의 점수로 통계와 요약을 만들었습니다.
+        game = await game_col.find_one_and_update(
+            {"_id": game_id, **ACTIVE_GAME},
             {"$inc": {"score": level}},
+            projection={"user_id": 1, "menu_id": 1, "score": 1, "date": 1},
+            return_document=ReturnDocument.AFTER,
         )
-        await order_col.update_one(
-            {"_id": _as_object_id(body.order_id, "order")},
-            {"$set": {"is_correct": True}},
+        if game is None:
+            # 채점한 주문도 채점 전으로 되돌립니다.
+            await order_col.update_one(
+                {"_id": order_id, "scored_at": scored_at}, {"$set": {"is_correct": False, "scored_at": None}}
+            )
+            raise _game_ended()
+        if session is not None:
+            game_sessions.sync_score(session, game.get("score", 0))
+        leaderboard.record(game)
+    answer_stats.record([outcome])
+    return _score_result(body, order, is_correct, False), game_id, session, menu
+
+
+@router.post(
+    "/score",
+    summary="주문 채점",
+    description=(
+        "제출 답안을 확인하고 정답이면 게임 점수를 갱신합니다. 이미 채점된 주문은 기존 결과를 반환합니다. "
+        "끝난 게임이면 409를, 계정별 채점 요청이 너무 많으면 429와 Retry-After를 반환합니다."
+    ),
+)
+async def score_order(body: OrderScoreRequest, request: Request, user_id: str = Depends(get_current_user)):
+    async with rate_limiter.admit("score", client_ip(request), user_id):
+        result, _game_id, _session, _menu = await _score(body, user_id)
+    return json_response(result)
+
+
+@router.post(
+    "/score/next",
+    status_code=status.HTTP_201_CREATED,
+    summary="주문 채점 후 다음 주문",
+    description=(
+        "POST /score와 같이 채점한 뒤, 채점하면서 읽은 게임과 메뉴로 다음 주문을 만들어 next_order로 함께 반환합니다. "
+        "키오스크의 턴당 요청(채점 + 주문 생성)을 한 번으로 줄입니다."
+    ),
+)
+async def score_and_next_order(body: OrderScoreRequest, request: Request, user_id: str = Depends(get_current_user)):
+    async with rate_limiter.admit("score", client_ip(request), user_id):
+        result, game_id, session, menu = await _score(body, user_id)
+        result["next_order"] = public_order(await _next_order(game_id, session, menu))
+    return json_response(result, status_code=status.HTTP_201_CREATED)
+
+
+class OrderScoreBatchRequest(BaseModel):
+    game_id: str = Field(..., description="게임 id")
+    answers: List[OrderScoreRequest] = Field(
+        ..., min_length=1, max_length=ORDER_SCORE_BATCH_MAX, description="채점할 답안 목록"
+    )
+
+
+@router.post(
+    "/score/batch",
+    summary="주문 일괄 채점",
+    description="한 게임의 답안 여러 개를 한 번에 채점합니다. 주문별 결과를 요청 순서대로 반환합니다.",
+)
+async def score_orders_batch(body: OrderScoreBatchRequest, request: Request, user_id: str = Depends(get_current_user)):
+    # 배치 하나를 채점 요청 하나로 셉니다. 답안 수는 ORDER_SCORE_BATCH_MAX로 제한됩니다.
+    async with rate_limiter.admit("score", client_ip(request), user_id):
+        return await _score_batch(body, user_id)
+
+
+async def _score_batch(body: OrderScoreBatchRequest, user_id: str):
+    game_id = _as_object_id(body.game_id, "game")
+    await _active_game(game_id)
+    answers = {}
+    results = []
+    for answer in body.answers:
+        result = {"order_id": answer.order_id}
+        results.append(result)
+        if answer.game_id != body.game_id:
+            result["error"] = "Order does not belong to game"
+            continue
+        try:
+            order_id = ObjectId(answer.order_id)
+        except Exception:
+            result["error"] = "Invalid order id"
+            continue
+        if order_id in answers:
+            result["error"] = "Duplicate order id"
+            continue
+        answers[order_id] = (answer, result)
+
+    session = await game_sessions.get(game_id)
+    if session is not None:
+        # 세션이 들고 있는 주문도 이번 배치에서 MongoDB 기준으로 채점되므로 세션에서 떼어냅니다.
+        if session.order is not None and session.order["_id"] in answers:
+            session.order = None
+        await game_sessions.flush()
+
+    orders = {}
+    if answers:
+        cursor = order_col.find({"_id": {"$in": list(answers)}, "game_id": game_id}, _SCORE_PROJECTION)
+        orders = {order["_id"]: order for order in await menu_revisions.hydrate(await cursor.to_list(None))}
+    # 한 게임의 주문은 모두 같은 메뉴에서 나옵니다.
+    menu = await menu_cache.load(next(iter(orders.values()))["menu_id"]) if orders else None
+
+    scored_at = datetime.now(timezone.utc)
+    pending = {}
+    outcomes = {}
+    for order_id, (answer, result) in answers.items():
+        order = orders.get(order_id)
+        if order is None or order.get("queue_seq") is not None:
+            result["error"] = "Order not found"
+            continue
+        result["expected"] = _expected_answer(order)
+        if order.get("scored_at") is not None or order.get("is_correct"):
+            result.update(correct=bool(order.get("is_correct")), already_scored=True)
+            continue
+        is_correct = _check_answer(order, menu, answer)
+        if is_correct is None:
+            result["error"] = "Answer not in menu"
+            continue
+        result.update(correct=is_correct, already_scored=False)
+        pending[order_id] = result
+        outcomes[order_id] = Outcome(
+            game_id, is_correct, order.get("level") or 0, scored_at, user_id, order["menu_id"]
         )
-    else:
-        await order_col.update_one(
-            {"_id": _as_object_id(body.order_id, "order")},
-            {"$set": {"is_correct": False}},
+
+    applied = await persist_outcomes(outcomes)
+    lost = [order_id for order_id in outcomes if order_id not in applied]
+    if lost:
+        # 동시에 들어온 다른 채점이 먼저 반영된 주문은 그 결과를 돌려줍니다.
+        async for current in order_col.find({"_id": {"$in": lost}}, {"is_correct": 1}):
+            pending[current["_id"]].update(correct=bool(current.get("is_correct")), already_scored=True)
+
+    answer_stats.record(outcome for order_id, outcome in outcomes.items() if order_id in applied)
+    gained = sum(outcome.level for outcome in applied.values() if outcome.is_correct)
+    score = None
+    if gained:
+        game = await game_col.find_one_and_update(
+            {"_id": game_id, **ACTIVE_GAME},
+            {"$inc": {"score": gained}},
+            projection={"user_id": 1, "menu_id": 1, "score": 1, "date": 1},
+            return_document=ReturnDocument.AFTER,
         )
+        if game is None:
+            raise _game_ended()
+        score = game.get("score")
+        if session is not None:
+            game_sessions.sync_score(session, score)
+        leaderboard.record(game)
 
-    return {
-        "order_id": body.order_id,
-        "correct": is_correct,
-        "expected": {
-            "category": expected_category,
-            "menu_name": expected_menu,
-            "topping_names": list(expected_set) if expected_set else [],
-        },
-    }
+    return json_response({"game_id": body.game_id, "score_gained": gained, "score": score, "results": results})
 
 
 @router.get("/game/{game_id}")
@@ -167,13 +530,27 @@ async def list_orders_by_game(
     game_id: str,
     user_id: str = Depends(get_current_user),
     limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="이전 응답의 X-Next-Cursor 값"),
+    stream: bool = Query(False, description="true면 NDJSON으로 스트리밍 (마지막 줄에 next_cursor)"),
 ):
     game = await game_col.find_one({"_id": _as_object_id(game_id, "game")})
     if game is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Game not found")
     if game.get("user_id") != user_id:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Game does not belong to user")
-    orders = await order_col.find(
-        {"game_id": _as_object_id(game_id, "game"), "is_correct": True}
-    ).to_list(limit)
-    return [_serialize_order(order) for order in orders]
+    if game.get("archived_at") is not None:
+        # 끝난 게임은 요약 문서(order_archive)에서 읽습니다. 원본 주문은 TTL로 지워집니다.
+        summary = await archive_col.find_one({"_id": game["_id"]})
+        if summary is not None:
+            orders, next_cursor = page_list(archived_orders(summary), cursor, limit)
+            if stream:
+                return ndjson_page(orders, next_cursor, public_order)
+            return json_response([public_order(order) for order in orders], headers=next_cursor_headers(next_cursor))
+    find_cursor = order_col.find(
+        page_query({"game_id": _as_object_id(game_id, "game"), "is_correct": True}, cursor)
+    ).sort("_id", 1)
+    if stream:
+        return ndjson_response(find_cursor, limit, public_order, menu_revisions.hydrate)
+    orders, next_cursor = await fetch_page(find_cursor, limit)
+    await menu_revisions.hydrate(orders)
+    return json_response([public_order(order) for order in orders], headers=next_cursor_headers(next_cursor))
@@ -1,22 +1,25 @@
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel, Field, ConfigDict
+from pymongo.errors import DuplicateKeyError
 from starlette import status
 
 from db.database import database
 from models.user import User
+from utils.accounts import account_filter, account_id_of
 from utils.auth import (
-    get_password_hash,
+    get_password_hash_async,
     create_access_token,
     create_refresh_token,
-    verify_password,
+    verify_password_async,
     ACCESS_TOKEN_EXPIRE_MINUTES,
     REFRESH_TOKEN_EXPIRE_DAYS,
     get_current_refresh_user,
     get_current_user,
     is_password_too_long,
 )
+from utils.rate_limit import client_ip, rate_limiter
 
 user_col = database["user"]
 router = APIRouter()
@@ -40,21 +43,24 @@ class RefreshTokenRequest(BaseModel):
 @router.post(
     "/signup",
     summary="회원가입",
-    description="새 사용자를 등록하고 액세스/리프레시 토큰을 반환합니다.",
+    description="새 사용자를 등록하고 액세스/리프레시 토큰을 반환합니다. 요청이 너무 많으면 429와 Retry-After를 반환합니다.",
 )
-async def signup(user: User):
+async def signup(user: User, request: Request):
+    async with rate_limiter.admit("signup", client_ip(request), user.account_id):
+        return await _signup(user)
+
+
+async def _signup(user: User):
     logger.info("signup request account_id=%s password_bytes=%s", user.account_id, len(user.password.encode("utf-8")))
     if is_password_too_long(user.password):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Password is too long")
 
-    existing = await user_col.find_one(
-        {"$or": [{"account_id": user.account_id}, {"accountId": user.account_id}]}
-    )
+    existing = await user_col.find_one(account_filter(user.account_id))
     if existing:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="User already exists")
 
     try:
-        hashed_password = get_password_hash(user.password)
+        hashed_password = await get_password_hash_async(user.password)
     except ValueError as exc:
         logger.exception("bcrypt hash failed account_id=%s", user.account_id)
         raise HTTPException(
@@ -66,7 +72,11 @@ async def signup(user: User):
 
     doc["password"] = hashed_password
 
-    result = await user_col.insert_one(doc)
+    try:
+        result = await user_col.insert_one(doc)
+    except DuplicateKeyError:
+        # 같은 account_id로 동시에 가입하면 위 확인을 둘 다 통과하고 unique 인덱스에서 걸립니다.
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="User already exists")
 
     access_token = create_access_token({"sub": str(user.account_id)})
     refresh_token = create_refresh_token({"sub": str(user.account_id)})
@@ -88,19 +98,23 @@ async def signup(user: User):
 @router.post(
     "/login",
     summary="로그인",
-    description="사용자를 인증하고 액세스/리프레시 토큰을 반환합니다.",
+    description="사용자를 인증하고 액세스/리프레시 토큰을 반환합니다. 요청이 너무 많으면 429와 Retry-After를 반환합니다.",
 )
-async def login(body: UserLoginRequest):
+async def login(body: UserLoginRequest, request: Request):
+    # bcrypt 검증 전에 계정/IP별 한도를 확인합니다.
+    async with rate_limiter.admit("login", client_ip(request), body.account_id):
+        return await _login(body)
+
+
+async def _login(body: UserLoginRequest):
     logger.info("login request account_id=%s password_bytes=%s", body.account_id, len(body.password.encode("utf-8")))
     if is_password_too_long(body.password):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Password is too long")
-    user = await user_col.find_one(
-        {"$or": [{"account_id": body.account_id}, {"accountId": body.account_id}]}
-    )
+    user = await user_col.find_one(account_filter(body.account_id))
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     try:
-        password_ok = verify_password(body.password, user["password"])
+        password_ok = await verify_password_async(body.password, user["password"])
     except ValueError as exc:
         logger.exception("bcrypt verify failed account_id=%s", body.account_id)
         raise HTTPException(
@@ -109,7 +123,7 @@ async def login(body: UserLoginRequest):
         ) from exc
     if not password_ok:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect password")
-    account_id = user.get("account_id") or user.get("accountId")
+    account_id = account_id_of(user)
     access_token = create_access_token({"sub": str(account_id)})
     refresh_token = create_refresh_token({"sub": str(account_id)})
     return {
@@ -141,10 +155,10 @@ async def refresh_token(body: RefreshTokenRequest):
     description="현재 로그인 사용자의 정보를 반환합니다.",
 )
 async def get_me(account_id: str = Depends(get_current_user)):
-    user = await user_col.find_one({"$or": [{"account_id": account_id}, {"accountId": account_id}]})
+    user = await user_col.find_one(account_filter(account_id))
     if not user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
     return {
-        "account_id": user.get("account_id") or user.get("accountId"),
+        "account_id": account_id_of(user),
         "name": user.get("name"),
     }
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from api.endpoints import game, menu, order, user
+from api.endpoints import game, game_ws, menu, order, user
 
 api_router = APIRouter()
 
@@ -8,3 +8,4 @@ api_router.include_router(user.router, prefix="/user", tags=["user"])
 api_router.include_router(menu.router, prefix="/menu", tags=["menu"])
 api_router.include_router(order.router, prefix="/order", tags=["order"])
 api_router.include_router(game.router, prefix="/game", tags=["game"])
+api_router.include_router(game_ws.router, prefix="/game", tags=["game"])
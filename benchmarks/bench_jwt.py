@@ -0,0 +1,36 @@
+# python -m benchmarks.bench_jwt --tokens 100 --rounds 20000
+import argparse
+import time
+
+import jwt
+
+from utils import auth
+
+
+def _measure(fn, tokens, rounds: int) -> float:
+    start = time.perf_counter()
+    for i in range(rounds):
+        fn(tokens[i % len(tokens)])
+    return rounds / (time.perf_counter() - start)
+
+
+def _decode_uncached(token: str) -> dict:
+    return jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JWT 검증 처리량 (tokens/sec)")
+    parser.add_argument("--tokens", type=int, default=100, help="서로 다른 토큰 수 (동시 접속 클라이언트)")
+    parser.add_argument("--rounds", type=int, default=20000)
+    args = parser.parse_args()
+
+    tokens = [auth.create_access_token({"sub": f"user{i}"}) for i in range(args.tokens)]
+    before = _measure(_decode_uncached, tokens, args.rounds)
+    auth._verified_tokens.clear()
+    after = _measure(auth._decode_token, tokens, args.rounds)
+    print(f"jwt.decode         : {before:12,.0f} tokens/sec")
+    print(f"cached _decode_token: {after:12,.0f} tokens/sec ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
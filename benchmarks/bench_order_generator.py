@@ -0,0 +1,65 @@
+# python -m benchmarks.bench_order_generator --categories 10 --items 20 --groups 4 --count 100000
+# 기존 random.choice 방식과 OrderGenerator(alias table)의 주문 생성 속도를 비교합니다.
+import argparse
+import random
+import time
+
+from bson import ObjectId
+
+from benchmarks.bench_serialization import build_menu
+from utils.menu_cache import compile_menu
+from utils.order_generator import OrderGenerator
+
+
+def _legacy_pick(menu):
+    # 이전 _pick_random_menu + 이름으로 answer 인코딩: 주문마다 random.choice 여러 번, 토핑 그룹마다 동전 던지기
+    category = random.choice(menu.categories)
+    item = random.choice(category.items)
+    toppings = []
+    for group in category.topping_groups:
+        if random.choice([True, False]) and group.items:
+            toppings.append({"group": group.name, "item": dict(random.choice(group.items))})
+    selection = {"category": category.name, "item": dict(item), "topping": toppings or None}
+    names = (topping["item"].get("name") for topping in toppings)
+    return selection, menu.answers.encode(category.name, item.get("name"), names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="주문 생성 속도 비교")
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--batch", type=int, default=50, help="generate 한 번에 만들 주문 수")
+    parser.add_argument("--level", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    menu = build_menu(args.categories, args.items)
+    menu["level"] = args.level
+    compiled = compile_menu({**menu, "_id": ObjectId()})
+
+    random.seed(args.seed)
+    start = time.perf_counter()
+    for _ in range(args.count):
+        _legacy_pick(compiled)
+    legacy = args.count / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    generator = OrderGenerator(compiled)
+    setup = time.perf_counter() - start
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    toppings = 0
+    for _ in range(args.count // args.batch):
+        for selection, _answer, _pick in generator.generate(args.batch, rng):
+            toppings += len(selection["topping"] or [])
+    generated = (args.count // args.batch) * args.batch
+    fast = generated / (time.perf_counter() - start)
+
+    print(f"menu: {args.categories} categories x {args.items} items, level {args.level}, table setup {setup * 1000:.2f}ms")
+    print(f"random.choice       : {legacy:12,.0f} orders/sec")
+    print(f"OrderGenerator batch: {fast:12,.0f} orders/sec ({fast / legacy:.1f}x), {toppings / generated:.2f} toppings/order")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# python -m benchmarks.bench_order_size --categories 10 --items 20 --count 20000 [--menu examples/menu.json]
+# 메뉴 스냅샷을 통째로 담은 주문 문서와 menu_revision을 참조하는(pick) 주문 문서의 BSON 크기를 비교하고,
+# 읽을 때 스냅샷 필드를 되살리는(hydrate) 비용을 잽니다. MongoDB 없이 메뉴 캐시만으로 실행됩니다.
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timezone
+
+import bson
+from bson import ObjectId
+
+from benchmarks.bench_serialization import build_menu
+from models.order import Order, OrderSelection
+from utils.menu_cache import compile_menu, menu_cache
+from utils.menu_revisions import menu_revisions, slim_order
+from utils.order_generator import OrderGenerator
+
+
+def _order_docs(compiled, count: int, seed: int):
+    game_id = ObjectId()
+    created_at = datetime.now(timezone.utc)
+    docs = []
+    for selection, answer, pick in OrderGenerator(compiled).generate(count, random.Random(seed)):
+        order_doc = Order(
+            menu_id=str(compiled.id),
+            game_id=str(game_id),
+            menu_name=compiled.name,
+            menu_description=compiled.description,
+            level=compiled.level,
+            selection=OrderSelection(**selection),
+            created_at=created_at,
+        ).model_dump()
+        order_doc.update(
+            _id=ObjectId(),
+            menu_id=compiled.id,
+            game_id=game_id,
+            is_correct=False,
+            answer=answer,
+            menu_hash=compiled.content_hash,
+            pick=pick,
+        )
+        docs.append(order_doc)
+    return docs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="주문 문서 크기 비교 (스냅샷 vs revision 참조)")
+    parser.add_argument("--categories", type=int, default=10)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--menu", default=None, help="합성 메뉴 대신 쓸 메뉴 JSON 파일")
+    args = parser.parse_args()
+
+    if args.menu:
+        with open(args.menu, encoding="utf-8") as fp:
+            menu = {**json.load(fp), "_id": ObjectId()}
+    else:
+        menu = build_menu(args.categories, args.items)
+        menu["description"] = "강남점 점심 메뉴 - 커피, 디저트, 브런치"
+    compiled = compile_menu(menu)
+    menu_cache.put(compiled)
+    docs = _order_docs(compiled, args.count, args.seed)
+
+    snapshot = [{key: value for key, value in doc.items() if key != "pick"} for doc in docs]
+    slim = [slim_order(doc) for doc in docs]
+    snapshot_bytes = sum(len(bson.encode(doc)) for doc in snapshot) / len(docs)
+    slim_bytes = sum(len(bson.encode(doc)) for doc in slim) / len(docs)
+
+    start = time.perf_counter()
+    asyncio.run(menu_revisions.hydrate(slim))
+    hydrate_us = (time.perf_counter() - start) / len(docs) * 1e6
+    assert all(doc["selection"] == full["selection"] for doc, full in zip(slim, docs))
+
+    print(f"menu: {len(compiled.categories)} categories, {len(docs)} orders")
+    print(f"snapshot order: {snapshot_bytes:8.1f} bytes/order")
+    print(f"revision ref  : {slim_bytes:8.1f} bytes/order ({snapshot_bytes / slim_bytes:.1f}x smaller)")
+    print(f"hydrate       : {hydrate_us:8.2f} us/order (menu cache hit)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# python -m benchmarks.bench_serialization --categories 40 --items 50 --rounds 200
+# 큰 메뉴 문서를 기존 경로(_id 문자열화 + jsonable_encoder + JSONResponse)와
+# BSONJSONResponse 경로로 각각 인코딩해 비교합니다.
+import argparse
+import copy
+import time
+from datetime import datetime, timezone
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from utils.responses import BSONJSONResponse, public_doc
+
+
+def build_menu(categories: int, items: int) -> dict:
+    def item(name: str) -> dict:
+        return {"img": f"https://cdn.example.com/{name}.png", "name": name}
+
+    return {
+        "_id": ObjectId(),
+        "name": "bench menu",
+        "description": "benchmark",
+        "level": 5,
+        "created_at": datetime.now(timezone.utc),
+        "data": [
+            {
+                "kategorie": f"category-{c}",
+                "menus": [item(f"item-{c}-{i}") for i in range(items)],
+                "toping": [
+                    {"name": f"group-{c}-{g}", "items": [item(f"topping-{c}-{g}-{t}") for t in range(8)]}
+                    for g in range(4)
+                ],
+            }
+            for c in range(categories)
+        ],
+    }
+
+
+def _legacy(menu: dict) -> bytes:
+    menu["id"] = str(menu["_id"])
+    menu.pop("_id", None)
+    return JSONResponse(jsonable_encoder(menu)).body
+
+
+def _bson(menu: dict) -> bytes:
+    return BSONJSONResponse(public_doc(menu)).body
+
+
+def _measure(fn, menu: dict, rounds: int):
+    copies = [copy.deepcopy(menu) for _ in range(rounds)]
+    start = time.perf_counter()
+    for doc in copies:
+        body = fn(doc)
+    elapsed = time.perf_counter() - start
+    return rounds / elapsed, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="메뉴 문서 JSON 직렬화 비교")
+    parser.add_argument("--categories", type=int, default=40)
+    parser.add_argument("--items", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    menu = build_menu(args.categories, args.items)
+    legacy, legacy_size = _measure(_legacy, menu, args.rounds)
+    fast, fast_size = _measure(_bson, menu, args.rounds)
+    print(f"menu: {args.categories} categories x {args.items} items, {fast_size:,} bytes (legacy {legacy_size:,})")
+    print(f"jsonable_encoder + JSONResponse: {legacy:10,.1f} docs/sec")
+    print(f"BSONJSONResponse (orjson)      : {fast:10,.1f} docs/sec ({fast / legacy:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+# python -m benchmarks.load_test --sessions 50 --concurrency 10 --turns 20 --output bench.json
+# 앱을 프로세스 안에서 띄우고 examples/requests의 요청 본문으로 게임 세션을 재생합니다.
+# 기본은 mongomock-motor(pip install -r benchmarks/requirements.txt)를 쓰고, --mongo를 주면 MONGO_DETAILS의 실제 MongoDB를 씁니다.
+# --turn-mode fused는 턴마다 채점+주문 생성 두 요청 대신 POST /order/score/next 한 번을 보냅니다.
+# 프로세스 안에서는 네트워크 왕복이 없으므로 --rtt-ms로 요청마다 왕복 지연을 더해 비교할 수 있습니다.
+# --abusers N은 틀린 비밀번호 로그인과 같은 답안 채점을 응답과 상관없이 --abuse-rps로 보내는 클라이언트를 N개 함께 띄웁니다.
+# --rate-limit off/on으로 두 번 실행해 정상 세션의 지연을 비교하세요 (세션마다 X-Forwarded-For로 IP를 나눕니다).
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+EXAMPLES = Path(__file__).resolve().parent.parent / "examples"
+
+
+def _load(name: str) -> dict:
+    return json.loads((EXAMPLES / "requests" / name).read_text(encoding="utf-8"))
+
+
+def _use_mongomock() -> None:
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("mongomock-motor is not installed; pip install -r benchmarks/requirements.txt or pass --mongo")
+    import pymongo
+
+    if pymongo.version_tuple[:2] >= (4, 11):
+        # 앱의 bulk_write(채점 배치, 통계)가 mongomock에서 TypeError로 실패합니다.
+        raise SystemExit(
+            f"pymongo {pymongo.version} does not work with mongomock bulk_write; "
+            "pip install -r benchmarks/requirements.txt or pass --mongo"
+        )
+    from db.database import database
+
+    database.use_client(AsyncMongoMockClient())
+
+
+class Recorder:
+    def __init__(self, rtt: float = 0.0):
+        self.rtt = rtt
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.turns = []
+
+    async def call(self, client, label: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        if self.rtt:
+            await asyncio.sleep(self.rtt)
+        response = await client.request(method, url, **kwargs)
+        self.latencies[label].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[label] += 1
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for label, samples in sorted(self.latencies.items()):
+            endpoints[label] = {
+                "requests": len(samples),
+                "errors": self.errors[label],
+                "req_per_sec": len(samples) / elapsed,
+                **_percentiles(samples),
+            }
+        total = sum(len(samples) for samples in self.latencies.values())
+        return {
+            "elapsed_sec": elapsed,
+            "requests": total,
+            "req_per_sec": total / elapsed,
+            "endpoints": endpoints,
+            # 한 턴(채점 + 다음 주문 받기)에 걸린 시간
+            "turn": {"turns": len(self.turns), **_percentiles(self.turns)} if self.turns else None,
+        }
+
+
+def _percentiles(samples: list) -> dict:
+    samples = sorted(samples)
+    quantiles = statistics.quantiles(samples, n=100, method="inclusive") if len(samples) > 1 else samples * 99
+    return {"p50_ms": quantiles[49] * 1000, "p95_ms": quantiles[94] * 1000, "p99_ms": quantiles[98] * 1000}
+
+
+def _answer(order: dict, correct: bool, menu: dict) -> dict:
+    selection = order["selection"]
+    body = _load("order_score.json")
+    body.update(
+        order_id=order["id"],
+        game_id=order["game_id"],
+        category=selection["category"],
+        menu_name=selection["item"]["name"],
+        topping_names=[topping["item"]["name"] for topping in selection.get("topping") or []],
+    )
+    if not correct:
+        # 메뉴에 없는 이름은 400으로 거절되므로 같은 카테고리의 다른 아이템을 고릅니다.
+        others = [
+            item["name"]
+            for category in menu["data"]
+            if category["kategorie"] == selection["category"]
+            for item in category["menus"]
+            if item["name"] != body["menu_name"]
+        ]
+        if others:
+            body["menu_name"] = random.choice(others)
+    return body
+
+
+async def _call_with_retry(client, recorder: Recorder, label: str, method: str, url: str, **kwargs):
+    # 정상 클라이언트는 429/503을 받으면 Retry-After만큼 기다렸다가 다시 보냅니다.
+    for _ in range(5):
+        response = await recorder.call(client, label, method, url, **kwargs)
+        if response.status_code not in (429, 503):
+            break
+        await asyncio.sleep(min(float(response.headers.get("Retry-After", "1")), 5))
+    return response
+
+
+def _client_ip() -> str:
+    return f"10.{random.randrange(256)}.{random.randrange(256)}.{random.randrange(1, 255)}"
+
+
+async def _sign_in(client, recorder: Recorder, ip: str, label: str = "") -> tuple:
+    signup = _load("user_signup.json")
+    signup["account_id"] = f"bench-{uuid.uuid4().hex[:12]}"
+    forwarded = {"X-Forwarded-For": ip}
+    await _call_with_retry(client, recorder, f"{label}POST /user/signup", "POST", "/api/user/signup", json=signup, headers=forwarded)
+    login = _load("user_login.json")
+    login.update(account_id=signup["account_id"], password=signup["password"])
+    response = await _call_with_retry(client, recorder, f"{label}POST /user/login", "POST", "/api/user/login", json=login, headers=forwarded)
+    if response.status_code != 200:
+        # 재시도해도 로그인하지 못한 세션은 에러로만 기록하고 끝냅니다.
+        return login, None
+    return login, {"Authorization": f"Bearer {response.json()['access_token']}", **forwarded}
+
+
+async def run_session(
+    client, recorder: Recorder, menu: dict, turns: int, accuracy: float, turn_mode: str, think: float = 0.0
+) -> None:
+    _login, headers = await _sign_in(client, recorder, _client_ip())
+    if headers is None:
+        return
+
+    start = _load("game_start.json")
+    start["menu_id"] = menu["id"]
+    response = await recorder.call(client, "POST /game/start", "POST", "/api/game/start", json=start, headers=headers)
+    order = response.json()["order"]
+    game_id = order["game_id"]
+    for _ in range(turns):
+        if think:
+            await asyncio.sleep(think)
+        answer = _answer(order, random.random() < accuracy, menu)
+        turn_start = time.perf_counter()
+        if turn_mode == "fused":
+            response = await recorder.call(
+                client, "POST /order/score/next", "POST", "/api/order/score/next", json=answer, headers=headers
+            )
+            order = response.json()["next_order"]
+        else:
+            await recorder.call(client, "POST /order/score", "POST", "/api/order/score", json=answer, headers=headers)
+            create = _load("order_create.json")
+            create["game_id"] = game_id
+            response = await recorder.call(client, "POST /order/", "POST", "/api/order/", json=create, headers=headers)
+            order = response.json()
+        recorder.turns.append(time.perf_counter() - turn_start)
+    end = _load("game_end.json")
+    end["game_id"] = game_id
+    await recorder.call(client, "POST /game/end", "POST", "/api/game/end", json=end, headers=headers)
+    await recorder.call(client, "GET /game/top", "GET", "/api/game/top", params=_load("game_top.json"), headers=headers)
+
+
+async def run_abuser(client, recorder: Recorder, menu: dict, stop: asyncio.Event, rps: float) -> None:
+    # 한 계정/IP로 bcrypt를 태우는 틀린 비밀번호 로그인과 이미 채점된 답안 채점을 반복합니다.
+    login, headers = await _sign_in(client, recorder, _client_ip(), "abuse ")
+    if headers is None:
+        return
+    login["password"] = "wrong-" + login["password"]
+    start = _load("game_start.json")
+    start["menu_id"] = menu["id"]
+    response = await client.post("/api/game/start", json=start, headers=headers)
+    answer = _answer(response.json()["order"], True, menu)
+    forwarded = {"X-Forwarded-For": headers["X-Forwarded-For"]}
+    pending = set()
+    while not stop.is_set():
+        # 응답을 기다리지 않고 정해진 속도로 보냅니다. 거절이 빨라져도 보내는 양은 같습니다.
+        for label, url, body, request_headers in (
+            ("abuse POST /user/login", "/api/user/login", login, forwarded),
+            ("abuse POST /order/score", "/api/order/score", answer, headers),
+        ):
+            task = asyncio.create_task(recorder.call(client, label, "POST", url, json=body, headers=request_headers))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        await asyncio.sleep(2 / rps)
+    await asyncio.gather(*pending)
+
+
+async def run(args) -> dict:
+    import httpx
+
+    if not args.mongo:
+        _use_mongomock()
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            # 메뉴를 만들 계정 하나와 메뉴 하나를 준비합니다.
+            setup = {"name": "bench", "account_id": f"bench-admin-{uuid.uuid4().hex[:8]}", "password": "password123"}
+            response = await client.post("/api/user/signup", json=setup)
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            menu = json.loads((EXAMPLES / args.menu).read_text(encoding="utf-8"))
+            response = await client.post("/api/menu/", json=menu, headers=headers)
+            menu["id"] = response.json()["id"]
+
+            recorder = Recorder(args.rtt_ms / 1000)
+            semaphore = asyncio.Semaphore(args.concurrency)
+
+            async def limited():
+                async with semaphore:
+                    await run_session(
+                        client, recorder, menu, args.turns, args.accuracy, args.turn_mode, args.think_ms / 1000
+                    )
+
+            stop = asyncio.Event()
+            abusers = [asyncio.create_task(run_abuser(client, recorder, menu, stop, args.abuse_rps)) for _ in range(args.abusers)]
+            started = time.perf_counter()
+            await asyncio.gather(*(limited() for _ in range(args.sessions)))
+            report = recorder.report(time.perf_counter() - started)
+            stop.set()
+            await asyncio.gather(*abusers)
+    report["config"] = vars(args)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="게임 세션 재생 부하 테스트")
+    parser.add_argument("--sessions", type=int, default=20, help="재생할 게임 세션 수")
+    parser.add_argument("--concurrency", type=int, default=5, help="동시에 진행할 세션 수")
+    parser.add_argument("--turns", type=int, default=20, help="세션당 채점+주문 반복 횟수")
+    parser.add_argument("--accuracy", type=float, default=0.8, help="정답 제출 비율")
+    parser.add_argument("--menu", default="menu.json", help="examples/ 아래 메뉴 파일")
+    parser.add_argument("--turn-mode", choices=("split", "fused"), default="split", help="split: 채점 후 주문 생성, fused: /order/score/next")
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="요청마다 더할 네트워크 왕복 지연")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="턴 사이 쉬는 시간 (사람이 답을 고르는 시간)")
+    parser.add_argument("--abusers", type=int, default=0, help="함께 띄울 악성 클라이언트 수")
+    parser.add_argument("--abuse-rps", type=float, default=10.0, help="악성 클라이언트 하나가 초당 보내는 요청 수 (로그인/채점 반반)")
+    parser.add_argument("--rate-limit", choices=("on", "off"), default=None, help="RATE_LIMIT 설정을 덮어씁니다")
+    parser.add_argument("--mongo", action="store_true", help="MONGO_DETAILS의 실제 MongoDB 사용")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", help="결과 JSON 파일 경로")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON 파일 경로")
+    args = parser.parse_args()
+    # 앱을 import하기 전에 정해야 합니다.
+    os.environ["RATE_LIMIT_TRUST_FORWARDED"] = "1"
+    if args.rate_limit is not None:
+        os.environ["RATE_LIMIT"] = "1" if args.rate_limit == "on" else "0"
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    report = asyncio.run(run(args))
+    baseline, baseline_turn = {}, None
+    if args.baseline:
+        baseline_report = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        baseline, baseline_turn = baseline_report["endpoints"], baseline_report.get("turn")
+    for label, stats in report["endpoints"].items():
+        line = (
+            f"{label:22} n={stats['requests']:6} err={stats['errors']:4} {stats['req_per_sec']:9.1f} req/s "
+            f"p50={stats['p50_ms']:8.2f}ms p95={stats['p95_ms']:8.2f}ms p99={stats['p99_ms']:8.2f}ms"
+        )
+        if label in baseline and baseline[label]["p99_ms"]:
+            line += f"  p99 {stats['p99_ms'] / baseline[label]['p99_ms'] - 1:+.0%} vs baseline"
+        print(line)
+    turn = report["turn"]
+    if turn:
+        line = f"turn ({args.turn_mode}) n={turn['turns']:6} p50={turn['p50_ms']:8.2f}ms p95={turn['p95_ms']:8.2f}ms p99={turn['p99_ms']:8.2f}ms"
+        if baseline_turn and baseline_turn["p50_ms"]:
+            line += f"  p50 {turn['p50_ms'] / baseline_turn['p50_ms'] - 1:+.0%} vs baseline"
+        print(line)
+    print(f"total {report['requests']} requests in {report['elapsed_sec']:.2f}s ({report['req_per_sec']:.1f} req/s)")
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
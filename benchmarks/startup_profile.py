@@ -0,0 +1,104 @@
+# python -m benchmarks.startup_profile --runs 3 --top 15 [--lifespan] [--target-ms 800]
+# 새 인터프리터에서 `import main`을 -X importtime으로 실행해 모듈/패키지별 import 시간을 요약합니다.
+# --lifespan이면 이어서 lifespan 시작(MongoDB 연결, 인덱스 확인 등)까지 재고, 설정된 MONGO_DETAILS로 접속합니다.
+# --target-ms를 넘으면 종료 코드 1로 끝나므로 배포 전 확인이나 CI에 그대로 쓸 수 있습니다.
+import argparse
+import json
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+OWN_PACKAGES = ("main", "api", "db", "utils", "models")
+
+_SNIPPET = """
+import asyncio, json, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+timings = {"import_ms": (imported - start) * 1000}
+if %(lifespan)r:
+    async def _startup():
+        async with main.app.router.lifespan_context(main.app):
+            timings["lifespan_ms"] = (time.perf_counter() - imported) * 1000
+    asyncio.run(_startup())
+print(json.dumps(timings))
+"""
+
+
+def _parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    # "import time: self [us] | cumulative | imported package"
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def _run_once(lifespan: bool) -> Tuple[dict, Dict[str, Tuple[int, int]]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _SNIPPET % {"lifespan": lifespan}],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr[-4000:])
+        raise SystemExit(result.returncode)
+    return json.loads(result.stdout.strip().splitlines()[-1]), _parse_importtime(result.stderr)
+
+
+def _min_runs(runs: List[Dict[str, Tuple[int, int]]]) -> Dict[str, Tuple[int, int]]:
+    # 실행마다 흔들리는 값이라 모듈별 최솟값을 씁니다.
+    merged = {}
+    for modules in runs:
+        for name, (self_us, cumulative_us) in modules.items():
+            best = merged.get(name)
+            merged[name] = (self_us, cumulative_us) if best is None else (min(best[0], self_us), min(best[1], cumulative_us))
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="워커 시작 시간(import, lifespan) 프로파일")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--lifespan", action="store_true", help="lifespan 시작 시간도 잽니다 (MongoDB 필요)")
+    parser.add_argument("--target-ms", type=float, default=None, help="import(+lifespan) 합계 목표")
+    args = parser.parse_args()
+
+    timings, runs = [], []
+    for _ in range(args.runs):
+        timing, modules = _run_once(args.lifespan)
+        timings.append(timing)
+        runs.append(modules)
+    modules = _min_runs(runs)
+
+    packages = defaultdict(int)
+    for name, (self_us, _cumulative_us) in modules.items():
+        packages[name.split(".")[0]] += self_us
+
+    print(f"top {args.top} packages by self time (min of {args.runs} runs)")
+    for package, self_us in sorted(packages.items(), key=lambda entry: -entry[1])[: args.top]:
+        marker = " *" if package in OWN_PACKAGES else ""
+        print(f"  {self_us / 1000:8.1f} ms  {package}{marker}")
+    print(f"top {args.top} modules by self time")
+    for name, (self_us, cumulative_us) in sorted(modules.items(), key=lambda entry: -entry[1][0])[: args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  (cumulative {cumulative_us / 1000:8.1f} ms)  {name}")
+
+    own_ms = sum(self_us for package, self_us in packages.items() if package in OWN_PACKAGES) / 1000
+    import_ms = min(timing["import_ms"] for timing in timings)
+    total_ms = import_ms
+    print(f"import main: {import_ms:.1f} ms (this repo's modules {own_ms:.1f} ms, marked *)")
+    if args.lifespan:
+        lifespan_ms = min(timing["lifespan_ms"] for timing in timings)
+        total_ms += lifespan_ms
+        print(f"lifespan startup: {lifespan_ms:.1f} ms")
+        print(f"total: {total_ms:.1f} ms")
+    if args.target_ms is not None and total_ms > args.target_ms:
+        print(f"over target: {total_ms:.1f} ms > {args.target_ms:.1f} ms")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
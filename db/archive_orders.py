@@ -0,0 +1,73 @@
+# python -m db.archive_orders [--batch-size 100] [--pause 0.05] [--abandoned-hours 0]
+# 끝났지만 아직 요약되지 않은 게임(이 기능 이전에 끝난 게임, 백그라운드 요약이 실패한 게임)의
+# 주문을 order_archive로 요약하고 원본 주문을 만료시킵니다. 여러 번 실행해도 안전합니다.
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo import ReturnDocument
+
+from db.database import database
+from utils.order_archive import archive_game
+from utils.stats import record_game
+
+game_col = database["game"]
+order_col = database["order"]
+
+
+async def end_abandoned(game: dict) -> Optional[dict]:
+    """/game/end와 같이 게임을 먼저 끝내고 통계에 올립니다. 끝낸 뒤에는 채점과 새 주문이 409로 막힙니다."""
+    if game.get("ended_at") is not None:
+        return game
+    ended = await game_col.find_one_and_update(
+        {"_id": game["_id"], "ended_at": None},
+        {"$set": {"ended_at": datetime.now(timezone.utc)}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if ended is None:
+        # 그 사이 플레이어가 끝냈습니다. 통계는 /game/end가 올렸습니다.
+        return await game_col.find_one({"_id": game["_id"]})
+    await order_col.delete_many({"game_id": ended["_id"], "queue_seq": {"$exists": True}})
+    await record_game(ended.get("user_id"), ended.get("menu_id"), ended.get("score", 0), ended["date"])
+    return ended
+
+
+async def archive(batch_size: int, pause: float, abandoned_hours: float) -> int:
+    query = {"ended_at": {"$ne": None}, "archived_at": None}
+    if abandoned_hours > 0:
+        # 오래전에 시작해 끝내지 않은 게임은 끝낸 뒤 요약합니다.
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=abandoned_hours)
+        query = {"archived_at": None, "$or": [{"ended_at": {"$ne": None}}, {"date": {"$lt": cutoff}}]}
+    archived = 0
+    last_id = None
+    while True:
+        batch_query = dict(query)
+        if last_id is not None:
+            batch_query["_id"] = {"$gt": last_id}
+        games = await game_col.find(batch_query).sort("_id", 1).to_list(batch_size)
+        if not games:
+            break
+        for game in games:
+            game = await end_abandoned(game)
+            if game is not None and await archive_game(game) is not None:
+                archived += 1
+        last_id = games[-1]["_id"]
+        print(f"archived={archived} last_id={last_id}")
+        if pause:
+            await asyncio.sleep(pause)
+    print(f"done; archived {archived} games")
+    return archived
+
+
+def main():
+    parser = argparse.ArgumentParser(description="끝난 게임의 주문을 order_archive로 요약")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--pause", type=float, default=0.05, help="배치 사이 대기 시간(초)")
+    parser.add_argument("--abandoned-hours", type=float, default=0, help="0보다 크면 이 시간보다 오래된 미종료 게임도 요약")
+    args = parser.parse_args()
+    asyncio.run(archive(args.batch_size, args.pause, args.abandoned_hours))
+
+
+if __name__ == "__main__":
+    main()
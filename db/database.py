@@ -1,7 +1,109 @@
 import os
+from typing import Optional
+
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReadPreference
+
+from utils.metrics import MongoCommandListener
 
 MONGO_DETAILS = os.getenv("MONGO_DETAILS", "mongodb://localhost:27017")
+MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "order_alone")
+# 풀은 워커 프로세스마다 따로 생깁니다. 워커 수 x MONGO_MAX_POOL_SIZE가 서버 연결 한도를 넘지 않게 하세요.
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "100"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "0")) or None
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0")) or None
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "0")) or None
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+# 메뉴 조회, 리더보드처럼 약간 늦은 데이터를 읽어도 되는 쿼리에 쓰는 read preference
+MONGO_READ_MOSTLY_PREFERENCE = os.getenv("MONGO_READ_MOSTLY_PREFERENCE", "secondaryPreferred")
+
+READ_PREFERENCES = {
+    "primary": ReadPreference.PRIMARY,
+    "primaryPreferred": ReadPreference.PRIMARY_PREFERRED,
+    "secondary": ReadPreference.SECONDARY,
+    "secondaryPreferred": ReadPreference.SECONDARY_PREFERRED,
+    "nearest": ReadPreference.NEAREST,
+}
+
+
+class CollectionProxy:
+    """모듈 import 시점에 만들어 두는 컬렉션 핸들. 실제 컬렉션은 클라이언트가 생긴 뒤 찾습니다."""
+
+    def __init__(self, owner: "ManagedDatabase", name: str, read_preference=None):
+        self._owner = owner
+        self._name = name
+        self._read_preference = read_preference
+        self._cached = None
+
+    def _collection(self):
+        client = self._owner.client
+        if self._cached is None or self._cached[0] is not client:
+            database = client[self._owner.name]
+            self._cached = (client, database.get_collection(self._name, read_preference=self._read_preference))
+        return self._cached[1]
+
+    def __getattr__(self, attr):
+        return getattr(self._collection(), attr)
+
+    def __repr__(self) -> str:
+        return f"CollectionProxy({self._owner.name}.{self._name})"
+
+
+class _ReadMostly:
+    def __init__(self, owner: "ManagedDatabase"):
+        self._owner = owner
+
+    def __getitem__(self, name: str) -> CollectionProxy:
+        return CollectionProxy(self._owner, name, READ_PREFERENCES[MONGO_READ_MOSTLY_PREFERENCE])
+
+
+class ManagedDatabase:
+    def __init__(self, uri: str = MONGO_DETAILS, name: str = MONGO_DB_NAME):
+        self.uri = uri
+        self.name = name
+        self._client: Optional[AsyncIOMotorClient] = None
+        self.read_mostly = _ReadMostly(self)
+
+    def start(self) -> None:
+        if self._client is None:
+            self._client = AsyncIOMotorClient(
+                self.uri,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+                connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                readPreference=MONGO_READ_PREFERENCE,
+                event_listeners=[MongoCommandListener()],
+            )
+
+    def stop(self) -> None:
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    def use_client(self, client) -> None:
+        # 부하 테스트처럼 mongomock 등 다른 클라이언트를 끼워 넣을 때 씁니다.
+        self.stop()
+        self._client = client
+
+    @property
+    def client(self) -> AsyncIOMotorClient:
+        # lifespan 밖(스크립트, 벤치마크)에서는 처음 쓸 때 연결합니다.
+        if self._client is None:
+            self.start()
+        return self._client
+
+    def __getitem__(self, name: str) -> CollectionProxy:
+        return CollectionProxy(self, name)
+
+    async def ping(self) -> None:
+        await self.client.admin.command("ping")
+
 
-client = AsyncIOMotorClient(MONGO_DETAILS)
-database = client["order_alone"]
\ No newline at end of file
+database = ManagedDatabase()
@@ -0,0 +1,78 @@
+# python -m db.explain
+# 엔드포인트가 사용하는 쿼리별 실행 계획을 요약합니다. COLLSCAN이 보이면 인덱스를 확인하세요.
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from db.database import database
+from utils.accounts import account_filter, load_account_lookup_mode
+
+
+async def _samples() -> dict:
+    game = await database["game"].find_one({}, {"user_id": 1, "menu_id": 1}) or {}
+    order = await database["order"].find_one({}, {"game_id": 1}) or {}
+    return {
+        "user_id": game.get("user_id", ""),
+        "menu_id": game.get("menu_id"),
+        "game_id": order.get("game_id"),
+        "since": datetime.now(timezone.utc) - timedelta(days=1),
+    }
+
+
+def _queries(samples: dict) -> list:
+    user_id = samples["user_id"]
+    game_id = samples["game_id"]
+    return [
+        ("user signup/login/me", "user", account_filter(user_id), None),
+        ("game list_games", "game", {"user_id": user_id}, [("_id", 1)]),
+        ("game get_best_game / rank", "game", {"user_id": user_id}, [("score", -1)]),
+        ("game list_top_games", "game", {}, [("score", -1)]),
+        ("game list_top_games menu", "game", {"menu_id": samples["menu_id"]}, [("score", -1)]),
+        ("game list_top_games daily", "game", {"date": {"$gte": samples["since"]}}, [("score", -1)]),
+        ("order list_orders_by_game", "order", {"game_id": game_id, "is_correct": True}, [("_id", 1)]),
+        ("order archive_game", "order", {"game_id": game_id, "queue_seq": None}, [("_id", 1)]),
+        ("order create_order (queue)", "order", {"game_id": game_id, "queue_seq": {"$exists": True}}, [("queue_seq", 1)]),
+        ("game get_my_stats", "stats", {"scope": "user_menu", "user_id": user_id}, None),
+    ]
+
+
+def _stages(plan: dict) -> list:
+    stages = []
+    while plan:
+        stage = plan.get("stage", "?")
+        if plan.get("indexName"):
+            stage = f"{stage}({plan['indexName']})"
+        stages.append(stage)
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+    return stages
+
+
+async def explain(limit: int) -> None:
+    await load_account_lookup_mode()
+    samples = await _samples()
+    for label, collection, query, sort in _queries(samples):
+        cursor = database[collection].find(query).limit(limit)
+        if sort:
+            cursor = cursor.sort(sort)
+        result = await cursor.explain()
+        winning = result.get("queryPlanner", {}).get("winningPlan", {})
+        winning = winning.get("queryPlan", winning)
+        stats = result.get("executionStats", {})
+        stages = _stages(winning)
+        flag = "  <-- COLLSCAN" if any(stage.startswith("COLLSCAN") for stage in stages) else ""
+        print(
+            f"{label:32} {' <- '.join(stages):60} "
+            f"keys={stats.get('totalKeysExamined', '-')} docs={stats.get('totalDocsExamined', '-')} "
+            f"returned={stats.get('nReturned', '-')} ms={stats.get('executionTimeMillis', '-')}{flag}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="엔드포인트 쿼리 explain() 요약")
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(explain(args.limit))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import asyncio
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+# 컬렉션별로 선언된 인덱스. 엔드포인트 쿼리를 바꾸면 여기와 db/explain.py도 같이 봐야 합니다.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "user": [
+        IndexModel(
+            [("account_id", ASCENDING)],
+            name="account_id_unique",
+            unique=True,
+            partialFilterExpression={"account_id": {"$exists": True}},
+        ),
+        IndexModel([("accountId", ASCENDING)], name="legacy_accountId", sparse=True),
+    ],
+    "game": [
+        IndexModel([("user_id", ASCENDING), ("score", DESCENDING)], name="user_id_score"),
+        IndexModel([("user_id", ASCENDING), ("_id", ASCENDING)], name="user_id_id"),
+        IndexModel([("menu_id", ASCENDING), ("score", DESCENDING)], name="menu_id_score"),
+        IndexModel([("score", DESCENDING), ("date", ASCENDING)], name="score_date"),
+    ],
+    "order": [
+        IndexModel(
+            [("game_id", ASCENDING), ("is_correct", ASCENDING), ("_id", ASCENDING)],
+            name="game_id_is_correct_id",
+        ),
+        IndexModel(
+            [("game_id", ASCENDING), ("queue_seq", ASCENDING)],
+            name="game_id_queue_seq",
+            partialFilterExpression={"queue_seq": {"$exists": True}},
+        ),
+        # 요약(order_archive)이 끝난 게임의 원본 주문에만 expire_at이 있습니다.
+        IndexModel([("expire_at", ASCENDING)], name="expire_at_ttl", expireAfterSeconds=0),
+    ],
+    # RATE_LIMIT_BACKEND=mongo의 토큰 버킷. 다시 가득 찰 때쯤 지웁니다.
+    "rate_limit": [
+        IndexModel([("expire_at", ASCENDING)], name="expire_at_ttl", expireAfterSeconds=0),
+    ],
+    "stats": [
+        IndexModel([("scope", ASCENDING), ("user_id", ASCENDING)], name="scope_user_id"),
+    ],
+}
+
+
+async def _ensure_collection_indexes(database, collection_name: str, models: List[IndexModel]) -> None:
+    collection = database[collection_name]
+    await collection.create_indexes(models)
+    existing = await collection.index_information()
+    missing = [model.document["name"] for model in models if model.document["name"] not in existing]
+    if missing:
+        raise RuntimeError(f"Missing indexes on {collection_name}: {', '.join(missing)}")
+
+
+async def ensure_indexes(database) -> None:
+    # 워커마다 시작할 때 실행되므로 컬렉션별 왕복을 동시에 보냅니다.
+    await asyncio.gather(
+        *(_ensure_collection_indexes(database, collection_name, models) for collection_name, models in INDEXES.items())
+    )
@@ -0,0 +1,88 @@
+# python -m db.migrate_account_id [--batch-size 500] [--pause 0.05]
+# 레거시 accountId 필드를 account_id로 옮깁니다. 진행 상황은 migration 컬렉션에 저장되어
+# 중단 후 다시 실행하면 이어서 진행합니다. 서비스 중에도 실행할 수 있습니다.
+import argparse
+import asyncio
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from db.database import database
+from utils.accounts import ACCOUNT_ID_MIGRATION
+
+user_col = database["user"]
+migration_col = database["migration"]
+
+
+def _operation(user: dict) -> UpdateOne:
+    if user.get("account_id"):
+        return UpdateOne({"_id": user["_id"]}, {"$unset": {"accountId": ""}})
+    return UpdateOne(
+        {"_id": user["_id"], "accountId": user["accountId"]},
+        {"$set": {"account_id": user["accountId"]}, "$unset": {"accountId": ""}},
+    )
+
+
+async def migrate(batch_size: int, pause: float) -> bool:
+    state = await migration_col.find_one({"_id": ACCOUNT_ID_MIGRATION}) or {}
+    if state.get("completed"):
+        print("account_id migration already completed")
+        return True
+    last_id = state.get("last_id")
+    migrated = state.get("migrated", 0)
+    failed = 0
+    while True:
+        query = {"accountId": {"$exists": True}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        users = await user_col.find(query, {"account_id": 1, "accountId": 1}).sort("_id", 1).to_list(batch_size)
+        if not users:
+            break
+        try:
+            result = await user_col.bulk_write([_operation(user) for user in users], ordered=False)
+            migrated += result.modified_count
+        except BulkWriteError as exc:
+            # 같은 account_id가 이미 있는 경우 등은 건너뛰고 수동 처리 대상으로 남깁니다.
+            migrated += exc.details.get("nModified", 0)
+            failed += len(exc.details.get("writeErrors", []))
+            for error in exc.details.get("writeErrors", []):
+                print(f"skipped user {users[error['index']]['_id']}: {error.get('errmsg')}")
+        last_id = users[-1]["_id"]
+        await migration_col.update_one(
+            {"_id": ACCOUNT_ID_MIGRATION},
+            {"$set": {"last_id": last_id, "migrated": migrated, "updated_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        print(f"migrated={migrated} failed={failed} last_id={last_id}")
+        if pause:
+            await asyncio.sleep(pause)
+
+    remaining = await user_col.count_documents({"accountId": {"$exists": True}})
+    completed = remaining == 0
+    await migration_col.update_one(
+        {"_id": ACCOUNT_ID_MIGRATION},
+        {
+            "$set": {"completed": completed, "remaining": remaining, "updated_at": datetime.now(timezone.utc)},
+            # 다음 실행은 남은 문서를 처음부터 다시 훑습니다.
+            "$unset": {"last_id": ""},
+        },
+        upsert=True,
+    )
+    if completed:
+        print("account_id migration completed; restart workers (ACCOUNT_ID_LOOKUP=auto) to use single-field lookups")
+    else:
+        print(f"{remaining} legacy users remain; resolve the conflicts above and run again")
+    return completed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="user.accountId -> account_id 온라인 마이그레이션")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.05, help="배치 사이 대기 시간(초)")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.batch_size, args.pause))
+
+
+if __name__ == "__main__":
+    main()
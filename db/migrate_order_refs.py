@@ -0,0 +1,134 @@
+# python -m db.migrate_order_refs [--batch-size 500] [--pause 0.05]
+# 메뉴 스냅샷(menu_name, menu_description, selection)을 통째로 들고 있는 예전 주문을
+# menu_revision 참조(menu_hash + pick)로 바꿉니다. 주문의 revision(없으면 현재 메뉴)에서 되살린 내용이
+# 스냅샷과 똑같을 때만 바꾸고, 그 사이 메뉴가 바뀌어 되살릴 수 없는 주문은 스냅샷 그대로 둡니다.
+# 진행 상황은 migration 컬렉션에 저장되어 중단 후 다시 실행하면 이어서 진행합니다. 서비스 중에도 실행할 수 있습니다.
+import argparse
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from db.database import database
+from utils.menu_cache import CompiledMenu, menu_cache
+from utils.menu_revisions import SLIM_DROPPED_FIELDS, menu_revisions, selection_from_pick
+
+ORDER_REFS_MIGRATION = "order_menu_refs"
+
+order_col = database["order"]
+migration_col = database["migration"]
+
+_LEGACY = {"selection": {"$exists": True}, "pick": None}
+_PROJECTION = {"menu_id": 1, "menu_hash": 1, "menu_name": 1, "menu_description": 1, "selection": 1}
+
+
+def _find_pick(menu: CompiledMenu, selection: dict) -> Optional[dict]:
+    # 이름과 아이템 내용이 모두 같은 첫 위치를 찾습니다.
+    for position, category in enumerate(menu.categories):
+        if category.name != selection.get("category") or selection.get("item") not in category.items:
+            continue
+        picked = []
+        for topping in selection.get("topping") or ():
+            found = next(
+                (
+                    [group_position, group.items.index(topping.get("item"))]
+                    for group_position, group in enumerate(category.topping_groups)
+                    if group.name == topping.get("group") and topping.get("item") in group.items
+                ),
+                None,
+            )
+            if found is None:
+                break
+            picked.append(found)
+        else:
+            return {"c": position, "i": category.items.index(selection["item"]), "t": picked}
+    return None
+
+
+def _operation(order: dict, menu: CompiledMenu) -> Optional[UpdateOne]:
+    selection = order.get("selection") or {}
+    pick = _find_pick(menu, selection)
+    if pick is None or selection_from_pick(menu, pick) != selection:
+        return None
+    if (menu.name, menu.description) != (order.get("menu_name"), order.get("menu_description")):
+        return None
+    # answer도 지웁니다. 채점할 때 pick과 revision으로 다시 만듭니다.
+    return UpdateOne(
+        {"_id": order["_id"], **_LEGACY},
+        {"$set": {"pick": pick, "menu_hash": menu.content_hash}, "$unset": {key: "" for key in SLIM_DROPPED_FIELDS}},
+    )
+
+
+async def _menu_for(order: dict, menus: Dict[Tuple, Optional[CompiledMenu]]) -> Optional[CompiledMenu]:
+    key = (order.get("menu_id"), order.get("menu_hash"))
+    if key not in menus:
+        menu = await menu_revisions.resolve(*key)
+        if menu is None and order.get("menu_id") is not None:
+            # revision이 저장되기 전의 주문은 현재 메뉴와 비교해 봅니다.
+            menu = await menu_cache.load(order["menu_id"])
+        if menu is not None:
+            await menu_revisions.save(menu)
+        menus[key] = menu
+    return menus[key]
+
+
+async def migrate(batch_size: int, pause: float) -> int:
+    state = await migration_col.find_one({"_id": ORDER_REFS_MIGRATION}) or {}
+    last_id = state.get("last_id")
+    migrated = state.get("migrated", 0)
+    skipped = 0
+    menus: Dict[Tuple, Optional[CompiledMenu]] = {}
+    while True:
+        query = dict(_LEGACY)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        orders = await order_col.find(query, _PROJECTION).sort("_id", 1).to_list(batch_size)
+        if not orders:
+            break
+        operations = []
+        for order in orders:
+            menu = await _menu_for(order, menus)
+            operation = _operation(order, menu) if menu is not None else None
+            if operation is None:
+                skipped += 1
+            else:
+                operations.append(operation)
+        if operations:
+            result = await order_col.bulk_write(operations, ordered=False)
+            migrated += result.modified_count
+        last_id = orders[-1]["_id"]
+        await migration_col.update_one(
+            {"_id": ORDER_REFS_MIGRATION},
+            {"$set": {"last_id": last_id, "migrated": migrated, "updated_at": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+        print(f"migrated={migrated} skipped={skipped} last_id={last_id}")
+        if pause:
+            await asyncio.sleep(pause)
+
+    remaining = await order_col.count_documents(_LEGACY)
+    await migration_col.update_one(
+        {"_id": ORDER_REFS_MIGRATION},
+        {
+            "$set": {"remaining": remaining, "updated_at": datetime.now(timezone.utc)},
+            # 다음 실행(ORDER_SLIM=0 워커가 그 사이 만든 주문 등)은 처음부터 다시 훑습니다.
+            "$unset": {"last_id": ""},
+        },
+        upsert=True,
+    )
+    # 되살릴 수 없는 주문은 스냅샷으로 계속 읽히므로 남아 있어도 괜찮습니다.
+    print(f"done; migrated {migrated} orders, {remaining} keep their snapshot")
+    return remaining
+
+
+def main():
+    parser = argparse.ArgumentParser(description="주문 메뉴 스냅샷 -> menu_revision 참조 온라인 마이그레이션")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.05, help="배치 사이 대기 시간(초)")
+    args = parser.parse_args()
+    asyncio.run(migrate(args.batch_size, args.pause))
+
+
+if __name__ == "__main__":
+    main()
@@ -351,19 +351,6 @@ export default function App() {
     }
   };
 
-  const requestNextOrder = async () => {
-    if (!gameId) return;
-    const response = await apiFetch("/order", {
-      method: "POST",
-      body: JSON.stringify({ game_id: gameId }),
-    });
-    if (!response.ok) {
-      throw new Error("다음 주문을 생성하지 못했습니다.");
-    }
-    const data = await response.json();
-    setCurrentOrder(data);
-  };
-
   const submitScore = async () => {
     if (!currentOrder || !gameId) return;
     if (!answerCategory || !answerMenuName) {
@@ -377,7 +364,8 @@ export default function App() {
     setGameStatus(null);
 
     try {
-      const response = await apiFetch("/order/score", {
+      // 채점과 다음 주문 생성을 한 요청으로 처리합니다.
+      const response = await apiFetch("/order/score/next", {
         method: "POST",
         body: JSON.stringify({
           order_id: currentOrder.id,
@@ -401,8 +389,8 @@ export default function App() {
         });
       }
       resetAnswer();
-      if (isRunning) {
-        await requestNextOrder();
+      if (isRunning && data.next_order) {
+        setCurrentOrder(data.next_order);
       }
     } catch (error) {
       setGameStatus({ type: "error", message: error.message });
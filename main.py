@@ -1,13 +1,77 @@
-from fastapi import FastAPI
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from api.endpoints import health as health_endpoint
+from api.endpoints import metrics as metrics_endpoint
 from api.routers import api_router
+from db.database import database
+from db.indexes import ensure_indexes
+from utils import metrics
+from utils.accounts import load_account_lookup_mode
+from utils.broadcast import broadcaster
+from utils.game_sessions import game_sessions
+from utils.leaderboard import leaderboard_feed
+from utils.pagination import NEXT_CURSOR_HEADER
+from utils.password_pool import password_pool
+from utils.rate_limit import rate_limiter
+from utils.responses import BSONJSONResponse
+from utils.stats import answer_stats
+
+MONGO_ENSURE_INDEXES = os.getenv("MONGO_ENSURE_INDEXES", "1") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 클라이언트, 스레드 풀은 import 시점이 아니라 여기서(또는 처음 쓸 때) 만듭니다.
+    # 그래서 gunicorn --preload로 마스터에서 import한 앱을 fork해도 안전합니다.
+    database.start()
+    startup = [load_account_lookup_mode()]
+    if MONGO_ENSURE_INDEXES:
+        startup.append(ensure_indexes(database))
+    await asyncio.gather(*startup)
+    await broadcaster.start()
+    await rate_limiter.start()
+    answer_stats.start()
+    game_sessions.start()
+    leaderboard_feed.start()
+    yield
+    await leaderboard_feed.stop()
+    await game_sessions.stop()
+    # 세션이 마지막으로 넘긴 채점 결과까지 저장합니다.
+    await answer_stats.stop()
+    await rate_limiter.stop()
+    await broadcaster.stop()
+    password_pool.shutdown()
+    database.stop()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=BSONJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    stats = metrics.start_request()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    metrics.finish_request(metrics.route_label(request.scope), elapsed, stats)
+    if metrics.METRICS_SERVER_TIMING:
+        response.headers["Server-Timing"] = metrics.server_timing(elapsed, stats)
+    return response
+
+
 app.include_router(api_router, prefix="/api")
+app.include_router(metrics_endpoint.router)
+app.include_router(health_endpoint.router, tags=["health"])
@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Optional
 
 from pydantic import BaseModel, Field
 
@@ -8,3 +9,4 @@ class Game(BaseModel):
     menu_id: str = Field(..., description="메뉴 id")
     score: int = Field(..., description="현재 점수")
     date: datetime = Field(..., description="게임 시작 시각 (UTC)")
+    ended_at: Optional[datetime] = Field(None, description="게임 종료 시각 (UTC)")
@@ -19,3 +19,6 @@ class Order(BaseModel):
     selection: OrderSelection = Field(..., description="주문 선택 정보")
     created_at: datetime = Field(..., description="생성 시각 (UTC)")
     is_correct: Optional[bool] = Field(None, description="정답 여부")
+    answer: Optional[dict] = Field(None, description="채점용 정답 (카테고리/아이템 id, 토핑 비트마스크)")
+    menu_hash: Optional[str] = Field(None, description="answer를 만든 메뉴의 content_hash (menu_revision _id)")
+    pick: Optional[dict] = Field(None, description="revision 안 위치 (카테고리/아이템 인덱스, [토핑 그룹, 토핑] 인덱스 목록)")
@@ -0,0 +1,92 @@
+import asyncio
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pymongo
+import pytest
+from bson import ObjectId
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from api.endpoints.order import OrderScoreRequest, _expected_answer  # noqa: E402
+from db.database import database  # noqa: E402
+from utils.menu_cache import menu_cache  # noqa: E402
+from utils.menu_revisions import menu_revisions  # noqa: E402
+from utils.stats import answer_stats  # noqa: E402
+
+# mongomock 4.3의 bulk_write는 pymongo 4.11부터 UpdateOne이 넘기는 sort 인자를 받지 못합니다.
+requires_bulk_write = pytest.mark.skipif(
+    pymongo.version_tuple[:2] >= (4, 11),
+    reason="mongomock bulk_write needs pymongo<4.11; pip install -r tests/requirements.txt",
+)
+
+
+def _items(*names):
+    return [{"name": name} for name in names]
+
+
+@pytest.fixture
+def menu_doc() -> dict:
+    return {
+        "_id": ObjectId(),
+        "name": "테스트 메뉴",
+        "description": "테스트용",
+        "level": 3,
+        "data": [
+            {
+                "kategorie": "커피",
+                "menus": _items("아메리카노", "라떼"),
+                "toping": [
+                    {"name": "샷", "items": _items("샷 추가", "더블 샷")},
+                    {"name": "시럽", "items": _items("바닐라")},
+                ],
+            },
+            {"kategorie": "디저트", "menus": _items("케이크"), "toping": [{"name": "크림", "items": _items("휘핑")}]},
+        ],
+    }
+
+
+@pytest.fixture
+def run():
+    # pytest-asyncio 없이 코루틴을 실행합니다. motor 클라이언트가 루프에 묶이므로 테스트마다 루프 하나를 씁니다.
+    loop = asyncio.new_event_loop()
+    yield loop.run_until_complete
+    loop.close()
+
+
+@pytest.fixture
+def mongo():
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    client = mongomock_motor.AsyncMongoMockClient()
+    database.use_client(client)
+    menu_cache.clear()
+    menu_revisions._entries.clear()
+    menu_revisions._saved.clear()
+    answer_stats._pending.clear()
+    yield client[database.name]
+    database.stop()
+
+
+@pytest.fixture
+def game(run, mongo, menu_doc):
+    run(mongo["menu"].insert_one(menu_doc))
+    result = run(
+        mongo["game"].insert_one(
+            {"user_id": "a1", "menu_id": menu_doc["_id"], "score": 0, "date": datetime.now(timezone.utc)}
+        )
+    )
+    return result.inserted_id
+
+
+def answer_for(order: dict, game_id, **overrides) -> OrderScoreRequest:
+    # 기본은 정답. 필드를 넘기면 그 값으로 바꿉니다.
+    expected = _expected_answer(order)
+    fields = {
+        "order_id": str(order["_id"]),
+        "game_id": str(game_id),
+        "category": expected["category"],
+        "menu_name": expected["menu_name"],
+        "topping_names": expected["topping_names"],
+    }
+    return OrderScoreRequest(**{**fields, **overrides})
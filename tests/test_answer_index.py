@@ -0,0 +1,57 @@
+import random
+
+from utils.menu_cache import compile_menu, pack_topping_mask
+from utils.menu_revisions import answer_from_pick, pick_from_names
+from utils.order_generator import OrderGenerator
+
+
+def test_encode_matches_ids_and_topping_bits(menu_doc):
+    answers = compile_menu(menu_doc).answers
+
+    encoded = answers.encode("커피", "라떼", ["바닐라", "샷 추가"])
+
+    mask = (1 << answers.toppings["샷 추가"]) | (1 << answers.toppings["바닐라"])
+    assert encoded == {"c": 0, "i": 1, "t": mask}
+    # 토핑 순서와 빈 이름은 결과에 영향을 주지 않습니다.
+    assert answers.encode("커피", "라떼", ["샷 추가", None, "", "바닐라"]) == encoded
+    assert answers.encode("커피", "아메리카노", []) == {"c": 0, "i": 0, "t": 0}
+
+
+def test_encode_rejects_names_not_in_menu(menu_doc):
+    answers = compile_menu(menu_doc).answers
+
+    assert answers.encode("음료", "라떼", []) is None
+    assert answers.encode("커피", "케이크", []) is None
+    assert answers.encode("커피", "라떼", ["초코"]) is None
+    # 다른 카테고리의 토핑은 메뉴에 있어도 고를 수 없습니다.
+    assert answers.encode("커피", "라떼", ["휘핑"]) is None
+
+
+def test_encode_uses_first_category_for_duplicate_names(menu_doc):
+    menu_doc["data"].append({"kategorie": "커피", "menus": [{"name": "콜드브루"}], "toping": []})
+    answers = compile_menu(menu_doc).answers
+
+    assert answers.encode("커피", "라떼", [])["c"] == 0
+    # 뒤쪽 같은 이름 카테고리의 아이템은 인덱스에 없으므로 이름 기준 채점으로 넘어갑니다.
+    assert answers.encode("커피", "콜드브루", []) is None
+
+
+def test_wide_topping_masks_are_packed_as_hex():
+    assert pack_topping_mask(5) == 5
+    assert pack_topping_mask(1 << 63) == format(1 << 63, "x")
+
+
+def test_pick_from_names_finds_generated_picks(menu_doc):
+    menu = compile_menu(menu_doc)
+
+    for selection, answer, pick in OrderGenerator(menu).generate(200, random.Random(4)):
+        names = [topping["item"]["name"] for topping in selection["topping"] or ()]
+        assert pick_from_names(menu, selection["category"], selection["item"]["name"], names) == pick
+        assert answer_from_pick(menu, pick) == answer
+
+
+def test_pick_from_names_rejects_two_toppings_from_one_group(menu_doc):
+    menu = compile_menu(menu_doc)
+
+    assert pick_from_names(menu, "커피", "라떼", ["샷 추가", "더블 샷"]) is None
+    assert pick_from_names(menu, "커피", "라떼", ["휘핑"]) is None
@@ -0,0 +1,138 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from api.endpoints.game import GameEndRequest, end_game
+from api.endpoints.order import _next_order, _score
+from conftest import answer_for, requires_bulk_write
+from utils.broadcast import broadcaster
+from utils.game_sessions import GAME_END_CHANNEL, Outcome, game_sessions, persist_outcomes
+
+pytestmark = requires_bulk_write
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    monkeypatch.setattr(game_sessions, "enabled", True)
+    yield game_sessions
+    game_sessions._sessions.clear()
+    game_sessions._outcomes.clear()
+    game_sessions._score_deltas.clear()
+
+
+@pytest.fixture
+def boards(monkeypatch):
+    recorded = []
+    monkeypatch.setattr("utils.leaderboard.leaderboard.record", recorded.append)
+    return recorded
+
+
+def test_mongo_score_replaces_a_stale_session_score(run, mongo, game, sessions, boards):
+    earlier = run(_next_order(game, None))
+    run(_next_order(game, None))
+    session = run(sessions.get(game))
+    # 다른 워커가 그 사이 점수를 올렸습니다.
+    run(mongo["game"].update_one({"_id": game}, {"$inc": {"score": 10}}))
+
+    result, *_ = run(_score(answer_for(earlier, game), "a1"))
+
+    assert result["correct"] is True
+    assert session.score == 13
+    assert [entry["score"] for entry in boards] == [13]
+
+
+def test_only_the_owner_can_end_a_live_session(run, mongo, game, sessions, monkeypatch):
+    monkeypatch.setattr("utils.order_archive.ORDER_ARCHIVE", False)
+    order = run(_next_order(game, None))
+    run(sessions.get(game))
+    run(_score(answer_for(order, game), "a1"))
+
+    with pytest.raises(HTTPException) as error:
+        run(end_game(GameEndRequest(game_id=str(game)), user_id="b2"))
+
+    assert error.value.status_code == 403
+    # 다른 사용자의 요청은 세션을 내리거나 저장하지 않습니다.
+    assert game in sessions._sessions and len(sessions._outcomes) == 1
+    assert run(mongo["game"].find_one({"_id": game}))["score"] == 0
+
+    response = run(end_game(GameEndRequest(game_id=str(game)), user_id="a1"))
+
+    assert b'"score":3' in response.body
+    assert game not in sessions._sessions and not sessions._outcomes
+    ended = run(mongo["game"].find_one({"_id": game}))
+    assert ended["score"] == 3 and ended["ended_at"] is not None
+
+
+def test_flush_drops_sessions_of_games_ended_elsewhere(run, mongo, game, sessions, boards):
+    order = run(_next_order(game, None))
+    run(sessions.get(game))
+    run(_score(answer_for(order, game), "a1"))
+    # 다른 워커가 게임을 끝냈습니다.
+    run(mongo["game"].update_one({"_id": game}, {"$set": {"ended_at": datetime.now(timezone.utc)}}))
+
+    run(sessions.flush())
+
+    assert game not in sessions._sessions
+    assert run(mongo["game"].find_one({"_id": game}))["score"] == 0
+    with pytest.raises(HTTPException) as error:
+        run(_next_order(game, None))
+    assert error.value.status_code == 409
+
+
+def test_ending_a_game_drops_its_session_on_every_worker(run, mongo, game, sessions):
+    run(_next_order(game, None))
+    run(sessions.get(game))
+
+    # 다른 워커의 종료 알림이 broadcaster로 도착했습니다.
+    broadcaster.publish(GAME_END_CHANNEL, str(game))
+
+    assert game not in sessions._sessions
+
+
+def test_persist_outcomes_skips_orders_scored_elsewhere(run, mongo, game):
+    orders = [run(_next_order(game, None)) for _ in range(2)]
+    scored_at = datetime.now(timezone.utc)
+    run(mongo["order"].update_one({"_id": orders[0]["_id"]}, {"$set": {"is_correct": True, "scored_at": scored_at}}))
+    outcomes = {order["_id"]: Outcome(game, True, 3, scored_at, "a1", order["menu_id"]) for order in orders}
+
+    applied = run(persist_outcomes(outcomes))
+
+    assert list(applied) == [orders[1]["_id"]]
+    assert run(mongo["order"].find_one({"_id": orders[1]["_id"]}))["is_correct"] is True
+
+
+def test_session_scores_are_saved_on_flush(run, mongo, game, sessions, boards):
+    order = run(_next_order(game, None))
+    session = run(sessions.get(game))
+
+    result, *_ = run(_score(answer_for(order, game), "a1"))
+
+    assert result["correct"] is True and session.score == 3
+    # flush 전에는 MongoDB에 아무것도 쓰지 않습니다.
+    assert run(mongo["order"].find_one({"_id": order["_id"]})).get("scored_at") is None
+    assert run(mongo["game"].find_one({"_id": game}))["score"] == 0
+
+    run(sessions.flush())
+
+    assert run(mongo["order"].find_one({"_id": order["_id"]}))["is_correct"] is True
+    assert run(mongo["game"].find_one({"_id": game}))["score"] == 3
+    assert not sessions._outcomes and not sessions._score_deltas
+
+
+def test_outcomes_lost_to_another_request_leave_the_score(run, mongo, game, sessions, boards):
+    order = run(_next_order(game, None))
+    session = run(sessions.get(game))
+    run(_score(answer_for(order, game), "a1"))
+    # 세션이 저장하기 전에 다른 워커가 같은 주문을 오답으로 채점했습니다.
+    run(
+        mongo["order"].update_one(
+            {"_id": order["_id"]}, {"$set": {"is_correct": False, "scored_at": datetime.now(timezone.utc)}}
+        )
+    )
+
+    run(sessions.flush())
+
+    assert session.score == 0
+    assert run(mongo["game"].find_one({"_id": game}))["score"] == 0
+    assert run(mongo["order"].find_one({"_id": order["_id"]}))["is_correct"] is False
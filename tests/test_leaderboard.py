@@ -0,0 +1,54 @@
+from utils.leaderboard import Board
+
+
+def _entry(game_id: str, score: int) -> dict:
+    return {"id": game_id, "score": score}
+
+
+def test_rank_counts_strictly_higher_scores():
+    board = Board(10)
+    board.replace([_entry("a", 30), _entry("b", 20), _entry("c", 20), _entry("d", 10)])
+
+    assert board.rank_of(40) == 1
+    assert board.rank_of(30) == 1
+    # 동점은 같은 순위입니다.
+    assert board.rank_of(20) == 2
+    assert board.rank_of(15) == 4
+    assert board.rank_of(0) == 5
+
+
+def test_rank_below_a_full_board_is_unknown():
+    board = Board(2)
+    board.replace([_entry("a", 30), _entry("b", 20)])
+
+    assert board.rank_of(25) == 2
+    assert board.rank_of(10) is None
+
+
+def test_update_moves_existing_entry_and_evicts_lowest():
+    board = Board(3)
+    board.replace([_entry("a", 30), _entry("b", 20), _entry("c", 10)])
+
+    assert board.update(_entry("c", 40))
+    assert [entry["id"] for entry in board.top(3)] == ["c", "a", "b"]
+
+    assert board.update(_entry("d", 25))
+    assert [entry["id"] for entry in board.top(3)] == ["c", "a", "d"]
+    assert board.rank_of(20) is None
+
+
+def test_update_rejects_scores_below_a_full_board():
+    board = Board(2)
+    board.replace([_entry("a", 30), _entry("b", 20)])
+
+    assert not board.update(_entry("c", 5))
+    assert [entry["id"] for entry in board.top(5)] == ["a", "b"]
+
+
+def test_ties_are_ordered_by_game_id():
+    board = Board(3)
+    board.replace([])
+    for game_id in ("b", "c", "a"):
+        board.update(_entry(game_id, 10))
+
+    assert [entry["id"] for entry in board.top(3)] == ["a", "b", "c"]
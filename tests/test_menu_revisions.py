@@ -0,0 +1,47 @@
+from api.endpoints.order import _next_order
+from utils.menu_cache import menu_cache
+from utils.menu_revisions import SLIM_DROPPED_FIELDS, menu_revisions, slim_order
+
+
+def _forget_menus():
+    # 다른 워커나 재시작한 워커처럼 메모리에 아무 메뉴도 없는 상태입니다.
+    menu_cache.clear()
+    menu_revisions._entries.clear()
+    menu_revisions._saved.clear()
+
+
+def test_slim_order_is_hydrated_from_its_revision_after_a_menu_edit(run, mongo, game, menu_doc):
+    order = run(_next_order(game, None))
+    run(
+        mongo["menu"].update_one(
+            {"_id": menu_doc["_id"]},
+            {"$set": {"name": "새 메뉴", "data": [{"kategorie": "차", "menus": [{"name": "녹차"}], "toping": []}]}},
+        )
+    )
+    _forget_menus()
+
+    stored = run(mongo["order"].find_one({"_id": order["_id"]}))
+    assert not set(SLIM_DROPPED_FIELDS) & set(stored)
+    [hydrated] = run(menu_revisions.hydrate([stored]))
+
+    assert hydrated["selection"] == order["selection"]
+    assert (hydrated["menu_name"], hydrated["menu_description"]) == ("테스트 메뉴", "테스트용")
+    assert hydrated["level"] == 3
+
+
+def test_orders_without_a_pick_are_left_alone(run, mongo):
+    legacy = {"menu_id": None, "menu_name": "예전 메뉴", "selection": {"category": "커피"}}
+
+    assert slim_order(dict(legacy)) == legacy
+    assert run(menu_revisions.hydrate([dict(legacy)])) == [legacy]
+
+
+def test_unknown_revision_keeps_the_slim_order(run, mongo, game):
+    order = run(_next_order(game, None))
+    stored = run(mongo["order"].find_one({"_id": order["_id"]}))
+    run(mongo["menu_revision"].delete_many({}))
+    _forget_menus()
+
+    [hydrated] = run(menu_revisions.hydrate([dict(stored)]))
+
+    assert "selection" not in hydrated and hydrated["pick"] == stored["pick"]
@@ -0,0 +1,101 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from api.endpoints.game import GameEndRequest, end_game
+from api.endpoints.order import _next_order, _score, list_orders_by_game
+from conftest import answer_for, requires_bulk_write
+from db.archive_orders import archive
+from utils.game_sessions import game_sessions
+from utils.order_archive import ORDER_ARCHIVE_RAW_TTL_SECONDS, archive_game
+
+pytestmark = requires_bulk_write
+
+
+def _wrong(order: dict, game_id):
+    if order["selection"]["category"] == "커피":
+        return answer_for(order, game_id, category="디저트", menu_name="케이크", topping_names=[])
+    return answer_for(order, game_id, category="커피", menu_name="라떼", topping_names=[])
+
+
+def _same_instant(stored: datetime, expected: datetime) -> bool:
+    # MongoDB는 밀리초까지 naive UTC로 돌려줍니다.
+    return abs(stored.replace(tzinfo=timezone.utc) - expected) < timedelta(milliseconds=1)
+
+
+def _listed(run, game_id) -> list:
+    response = run(list_orders_by_game(str(game_id), user_id="a1", limit=100, cursor=None, stream=False))
+    return json.loads(response.body)
+
+
+@pytest.fixture
+def played(run, mongo, game, monkeypatch):
+    # 종료 후 요약은 테스트에서 직접 부릅니다.
+    monkeypatch.setattr("utils.order_archive.ORDER_ARCHIVE", False)
+    orders = [run(_next_order(game, None)) for _ in range(3)]
+    run(_score(answer_for(orders[0], game), "a1"))
+    run(_score(_wrong(orders[1], game), "a1"))
+    run(_score(answer_for(orders[2], game), "a1"))
+    run(end_game(GameEndRequest(game_id=str(game)), user_id="a1"))
+    return orders
+
+
+def test_archive_summarizes_and_expires_raw_orders(run, mongo, game, played):
+    summary = run(archive_game(run(mongo["game"].find_one({"_id": game}))))
+
+    assert (summary["orders_served"], summary["orders_scored"], summary["orders_correct"]) == (3, 3, 2)
+    assert summary["score"] == 6
+    raw = run(mongo["order"].find({"game_id": game}).to_list(None))
+    expire_at = summary["archived_at"] + timedelta(seconds=ORDER_ARCHIVE_RAW_TTL_SECONDS)
+    assert len(raw) == 3
+    assert all(_same_instant(order["expire_at"], expire_at) for order in raw)
+    assert _same_instant(run(mongo["game"].find_one({"_id": game}))["archived_at"], summary["archived_at"])
+    # 다시 요약해도 바뀌지 않습니다.
+    assert run(archive_game(run(mongo["game"].find_one({"_id": game})))) is None
+
+
+def test_archived_game_lists_the_same_orders(run, mongo, game, played):
+    before = _listed(run, game)
+
+    run(archive_game(run(mongo["game"].find_one({"_id": game}))))
+    # TTL 인덱스가 원본 주문을 지운 뒤에도 요약에서 같은 목록을 읽습니다.
+    run(mongo["order"].delete_many({"game_id": game}))
+    after = _listed(run, game)
+
+    assert [order["id"] for order in before] == [str(played[0]["_id"]), str(played[2]["_id"])]
+    assert [order["selection"] for order in after] == [order["selection"] for order in before]
+    assert [order["id"] for order in after] == [order["id"] for order in before]
+    assert all(order["is_correct"] is True for order in after)
+    assert not any({"answer", "pick", "menu_hash"} & set(order) for order in after)
+
+
+def test_abandoned_games_are_ended_before_archiving(run, mongo, game):
+    order = run(_next_order(game, None))
+    started = datetime.now(timezone.utc) - timedelta(hours=3)
+    run(mongo["game"].update_one({"_id": game}, {"$set": {"date": started, "score": 4}}))
+
+    assert run(archive(batch_size=10, pause=0, abandoned_hours=1)) == 1
+
+    ended = run(mongo["game"].find_one({"_id": game}))
+    assert ended["ended_at"] is not None and ended["archived_at"] is not None
+    stats = run(mongo["stats"].find_one({"_id": "user:a1"}))
+    assert (stats["games"], stats["best_score"]) == (1, 4)
+    for call in (_score(answer_for(order, game), "a1"), _next_order(game, None)):
+        with pytest.raises(HTTPException) as error:
+            run(call)
+        assert error.value.status_code == 409
+    assert run(game_sessions._reload(game)) is None
+
+
+def test_games_archived_without_ended_at_are_closed(run, mongo, game):
+    order = run(_next_order(game, None))
+    # 이전 버전의 --abandoned-hours는 ended_at 없이 요약했습니다.
+    run(mongo["game"].update_one({"_id": game}, {"$set": {"archived_at": datetime.now(timezone.utc)}}))
+
+    with pytest.raises(HTTPException) as error:
+        run(_score(answer_for(order, game), "a1"))
+
+    assert error.value.status_code == 409
+    assert run(game_sessions._reload(game)) is None
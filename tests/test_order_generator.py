@@ -0,0 +1,77 @@
+import random
+from collections import Counter
+
+import pytest
+from bson import ObjectId
+
+from api.endpoints.order import _next_order
+from utils.menu_cache import compile_menu
+from utils.menu_revisions import answer_from_pick, selection_from_pick
+from utils.order_generator import AliasTable, OrderGenerator, OrderGeneratorRegistry, order_generators
+
+
+def test_alias_table_follows_weights():
+    weights = [1, 2, 3, 4]
+    table = AliasTable(weights)
+    rng = random.Random(1)
+    draws = 200_000
+
+    counts = Counter(table.sample(rng) for _ in range(draws))
+
+    for index, weight in enumerate(weights):
+        assert counts[index] / draws == pytest.approx(weight / sum(weights), abs=0.01)
+
+
+def test_alias_table_never_samples_zero_weights():
+    table = AliasTable([0, 5, 0, 1])
+    rng = random.Random(2)
+
+    assert set(table.sample(rng) for _ in range(10_000)) == {1, 3}
+
+
+def test_alias_table_single_entry():
+    table = AliasTable([3.5])
+
+    assert [table.sample(random.Random(seed)) for seed in range(5)] == [0] * 5
+
+
+def test_generated_orders_round_trip_through_pick(menu_doc):
+    menu = compile_menu(menu_doc)
+
+    orders = OrderGenerator(menu).generate(500, random.Random(3))
+
+    for selection, answer, pick in orders:
+        assert selection_from_pick(menu, pick) == selection
+        assert answer_from_pick(menu, pick) == answer
+        names = [topping["item"]["name"] for topping in selection["topping"] or ()]
+        assert menu.answers.encode(selection["category"], selection["item"]["name"], names) == answer
+    assert {selection["category"] for selection, _answer, _pick in orders} == {"커피", "디저트"}
+
+
+def test_generator_is_deterministic_per_seed(menu_doc):
+    generator = OrderGenerator(compile_menu(menu_doc))
+
+    assert generator.generate(20, random.Random(7)) == generator.generate(20, random.Random(7))
+
+
+def test_order_positions_are_reserved_on_the_game(run, mongo, game, monkeypatch):
+    positions = []
+    stream = order_generators.stream
+    monkeypatch.setattr(
+        order_generators, "stream", lambda game_id, position: positions.append(position) or stream(game_id, position)
+    )
+
+    for _ in range(3):
+        run(_next_order(game, None))
+
+    # 워커 메모리가 아니라 게임 문서의 order_seq에서 위치를 받으므로 워커가 바뀌어도 이어집니다.
+    assert positions == [0, 1, 2]
+    assert run(mongo["game"].find_one({"_id": game}))["order_seq"] == 3
+
+
+def test_streams_depend_only_on_seed_game_and_position():
+    other_worker = OrderGeneratorRegistry(order_generators.seed)
+    game_id = ObjectId()
+
+    assert other_worker.stream(game_id, 4).random() == order_generators.stream(game_id, 4).random()
+    assert order_generators.stream(game_id, 4).random() != order_generators.stream(game_id, 5).random()
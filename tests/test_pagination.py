@@ -0,0 +1,65 @@
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from utils.pagination import decode_cursor, encode_cursor, fetch_page, page_list, page_query
+
+
+def test_cursor_round_trip():
+    for _ in range(20):
+        last_id = ObjectId()
+        cursor = encode_cursor(last_id)
+
+        assert "=" not in cursor
+        assert decode_cursor(cursor) == last_id
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor", "abc", encode_cursor(ObjectId())[:-2], "@@@@@@@@@@@@@@@@"])
+def test_invalid_cursor_is_bad_request(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+
+    assert error.value.status_code == 400
+
+
+def test_page_query_continues_after_cursor():
+    last_id = ObjectId()
+
+    assert page_query({"game_id": 1}, None) == {"game_id": 1}
+    assert page_query({"game_id": 1}, encode_cursor(last_id)) == {"game_id": 1, "_id": {"$gt": last_id}}
+
+
+def _walk_list(docs, limit):
+    pages, cursor = [], None
+    while True:
+        page, cursor = page_list(docs, cursor, limit)
+        pages.append([doc["_id"] for doc in page])
+        if cursor is None:
+            return pages
+
+
+def test_page_list_walks_every_doc_once():
+    docs = [{"_id": ObjectId()} for _ in range(7)]
+
+    pages = _walk_list(docs, 3)
+
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [doc_id for page in pages for doc_id in page] == [doc["_id"] for doc in docs]
+    assert _walk_list(docs, 7) == [[doc["_id"] for doc in docs]]
+
+
+def test_fetch_page_matches_page_list(run, mongo):
+    docs = [{"_id": ObjectId(), "game_id": 1} for _ in range(5)]
+    run(mongo["order"].insert_many([dict(doc) for doc in docs]))
+
+    async def walk(limit):
+        pages, cursor = [], None
+        while True:
+            find_cursor = mongo["order"].find(page_query({"game_id": 1}, cursor)).sort("_id", 1)
+            page, cursor = await fetch_page(find_cursor, limit)
+            pages.append([doc["_id"] for doc in page])
+            if cursor is None:
+                return pages
+
+    assert run(walk(2)) == _walk_list(docs, 2)
+    assert run(walk(5)) == _walk_list(docs, 5)
@@ -0,0 +1,72 @@
+import pytest
+from fastapi import HTTPException
+
+from utils.auth import verify_password_async
+from utils.password_pool import PASSWORD_HASH_MAX_PENDING
+from utils.rate_limit import MemoryBackend, Rate, RateLimiter, RoutePolicy
+
+
+class _RecordingBackend(MemoryBackend):
+    def __init__(self):
+        super().__init__()
+        self.taken = []
+
+    async def take(self, key: str, rate: Rate) -> float:
+        self.taken.append(key)
+        return await super().take(key, rate)
+
+
+def _limiter(backend, route=None, ip=None, account=None, concurrency=0, account_concurrency=0) -> RateLimiter:
+    policy = RoutePolicy(route, ip, account, concurrency, account_concurrency)
+    return RateLimiter({"login": policy}, backend=backend, enabled=True)
+
+
+def _rejected(run, limiter, ip="1.2.3.4", account="a1") -> HTTPException:
+    async def enter():
+        async with limiter.admit("login", ip, account):
+            pass
+
+    with pytest.raises(HTTPException) as error:
+        run(enter())
+    return error.value
+
+
+def test_narrow_buckets_are_checked_first(run):
+    backend = _RecordingBackend()
+    limiter = _limiter(backend, route=Rate(100, 1), ip=Rate(100, 1), account=Rate(1, 1 / 60))
+
+    run(limiter.check("login", "1.2.3.4", "a1"))
+    error = _rejected(run, limiter)
+
+    assert error.status_code == 429
+    assert error.headers["Retry-After"] == "60"
+    assert backend.taken == ["login:account:a1", "login:ip:1.2.3.4", "login:route:", "login:account:a1"]
+    # 계정 한도에 걸린 요청은 IP/라우트 토큰을 쓰지 않으므로 다른 계정은 그대로 들어옵니다.
+    run(limiter.check("login", "1.2.3.4", "b2"))
+    assert limiter.rejected == {("login", "account"): 1}
+
+
+def test_concurrency_cap_rejects_without_waiting(run):
+    limiter = _limiter(MemoryBackend(), concurrency=1)
+
+    async def overlapping():
+        async with limiter.admit("login", "1.2.3.4", "a1"):
+            assert limiter.metrics()["in_flight"] == {"login": 1}
+            async with limiter.admit("login", "5.6.7.8", "b2"):
+                pass
+
+    with pytest.raises(HTTPException) as error:
+        run(overlapping())
+
+    assert (error.value.status_code, error.value.headers["Retry-After"]) == (429, "1")
+    assert limiter.metrics()["in_flight"] == {"login": 0}
+    assert limiter.rejected == {("login", "concurrency"): 1}
+
+
+def test_saturated_password_pool_returns_503(run, monkeypatch):
+    monkeypatch.setattr("utils.auth.password_pool.pending", PASSWORD_HASH_MAX_PENDING)
+
+    with pytest.raises(HTTPException) as error:
+        run(verify_password_async("password", "hash"))
+
+    assert (error.value.status_code, error.value.headers["Retry-After"]) == (503, "1")
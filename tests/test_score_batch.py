@@ -0,0 +1,75 @@
+import json
+
+import api.endpoints.order as order_endpoints
+from api.endpoints.order import OrderScoreBatchRequest, _next_order, _score, _score_batch
+from conftest import answer_for, requires_bulk_write
+
+pytestmark = requires_bulk_write
+
+
+class _CountingCollection:
+    def __init__(self, collection):
+        self.collection = collection
+        self.updates = []
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def find_one_and_update(self, query, update, **kwargs):
+        self.updates.append(update)
+        return self.collection.find_one_and_update(query, update, **kwargs)
+
+
+def _wrong(order: dict, game_id):
+    if order["selection"]["category"] == "커피":
+        return answer_for(order, game_id, category="디저트", menu_name="케이크", topping_names=[])
+    return answer_for(order, game_id, category="커피", menu_name="라떼", topping_names=[])
+
+
+def _batch(run, game_id, answers) -> dict:
+    response = run(_score_batch(OrderScoreBatchRequest(game_id=str(game_id), answers=answers), "a1"))
+    return json.loads(response.body)
+
+
+def test_batch_scores_orders_and_adds_the_score_once(run, mongo, game, monkeypatch):
+    orders = [run(_next_order(game, None)) for _ in range(3)]
+    games = _CountingCollection(order_endpoints.game_col)
+    monkeypatch.setattr(order_endpoints, "game_col", games)
+
+    body = _batch(
+        run,
+        game,
+        [
+            answer_for(orders[0], game),
+            _wrong(orders[1], game),
+            answer_for(orders[2], game),
+            answer_for(orders[0], game),
+            answer_for(orders[1], orders[1]["menu_id"]),
+        ],
+    )
+
+    assert [result.get("correct") for result in body["results"]] == [True, False, True, None, None]
+    errors = [result["error"] for result in body["results"][3:]]
+    assert errors == ["Duplicate order id", "Order does not belong to game"]
+    assert (body["score_gained"], body["score"]) == (6, 6)
+    # 정답 두 개의 점수를 $inc 한 번으로 더합니다.
+    assert games.updates == [{"$inc": {"score": 6}}]
+    stored = [run(mongo["order"].find_one({"_id": order["_id"]})) for order in orders]
+    assert [order["is_correct"] for order in stored] == [True, False, True]
+
+
+def test_batch_reports_orders_scored_before(run, mongo, game):
+    orders = [run(_next_order(game, None)) for _ in range(2)]
+    run(_score(answer_for(orders[0], game), "a1"))
+
+    body = _batch(run, game, [_wrong(orders[0], game), answer_for(orders[1], game)])
+
+    results = [(result["correct"], result["already_scored"]) for result in body["results"]]
+    assert results == [(True, True), (True, False)]
+    assert (body["score_gained"], body["score"]) == (3, 6)
+
+    again = _batch(run, game, [answer_for(orders[1], game)])
+
+    assert again["results"][0]["already_scored"] is True
+    assert (again["score_gained"], again["score"]) == (0, None)
+    assert run(mongo["game"].find_one({"_id": game}))["score"] == 6
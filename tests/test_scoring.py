@@ -0,0 +1,107 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from api.endpoints.order import _expected_answer, _next_order, _score, public_order
+from conftest import answer_for, requires_bulk_write
+from utils.menu_cache import menu_cache
+from utils.stats import answer_stats
+
+pytestmark = requires_bulk_write
+
+
+def test_correct_answer_scores_once(run, mongo, game):
+    order = run(_next_order(game, None))
+    body = answer_for(order, game)
+
+    first, *_ = run(_score(body, "a1"))
+    second, *_ = run(_score(body, "a1"))
+
+    assert (first["correct"], first["already_scored"]) == (True, False)
+    assert (second["correct"], second["already_scored"]) == (True, True)
+    assert run(mongo["game"].find_one({"_id": game}))["score"] == 3
+
+
+def test_wrong_answer_is_final(run, mongo, game):
+    order = run(_next_order(game, None))
+    wrong = "케이크" if order["selection"]["category"] == "커피" else "라떼"
+    category = "디저트" if wrong == "케이크" else "커피"
+
+    result, *_ = run(_score(answer_for(order, game, category=category, menu_name=wrong, topping_names=[]), "a1"))
+    retry, *_ = run(_score(answer_for(order, game), "a1"))
+
+    assert (result["correct"], result["already_scored"]) == (False, False)
+    # 한 번 틀린 주문은 정답을 다시 보내도 점수가 오르지 않습니다.
+    assert (retry["correct"], retry["already_scored"]) == (False, True)
+    assert run(mongo["game"].find_one({"_id": game}))["score"] == 0
+
+
+def test_answer_not_in_menu_is_rejected(run, game):
+    order = run(_next_order(game, None))
+
+    with pytest.raises(HTTPException) as error:
+        run(_score(answer_for(order, game, menu_name="없는 메뉴"), "a1"))
+
+    assert error.value.status_code == 400
+    # 거절된 답안은 채점으로 치지 않습니다.
+    result, *_ = run(_score(answer_for(order, game), "a1"))
+    assert result["already_scored"] is False
+
+
+def test_ended_game_is_conflict(run, mongo, game):
+    order = run(_next_order(game, None))
+    run(mongo["game"].update_one({"_id": game}, {"$set": {"ended_at": datetime.now(timezone.utc)}}))
+
+    with pytest.raises(HTTPException) as score_error:
+        run(_score(answer_for(order, game), "a1"))
+    with pytest.raises(HTTPException) as next_error:
+        run(_next_order(game, None))
+
+    assert score_error.value.status_code == next_error.value.status_code == 409
+    assert run(mongo["game"].find_one({"_id": game}))["score"] == 0
+
+
+@pytest.mark.parametrize("slim", [True, False])
+def test_correct_answer_is_claimed_without_reading_the_order(run, mongo, game, monkeypatch, slim):
+    monkeypatch.setattr("utils.menu_revisions.ORDER_SLIM", slim)
+    order = run(_next_order(game, None))
+
+    async def no_read(query):
+        raise AssertionError("order read on the correct path")
+
+    monkeypatch.setattr("api.endpoints.order._find_order", no_read)
+    result, *_ = run(_score(answer_for(order, game), "a1"))
+
+    assert (result["correct"], result["already_scored"]) == (True, False)
+    assert result["expected"] == _expected_answer(order)
+    assert run(mongo["game"].find_one({"_id": game}))["score"] == 3
+
+
+def test_unknown_game_menu_falls_back_to_reading_the_order(run, mongo, game):
+    order = run(_next_order(game, None))
+    # 다른 워커에서 만든 주문처럼 이 워커가 게임의 메뉴를 모르는 경우입니다.
+    menu_cache.clear()
+
+    result, *_ = run(_score(answer_for(order, game), "a1"))
+
+    assert (result["correct"], result["already_scored"]) == (True, False)
+    assert run(mongo["game"].find_one({"_id": game}))["score"] == 3
+
+
+def test_stats_are_written_after_the_response(run, mongo, game):
+    order = run(_next_order(game, None))
+
+    run(_score(answer_for(order, game), "a1"))
+
+    assert run(mongo["stats"].find_one({"_id": "user:a1"})) is None
+    run(answer_stats.flush())
+    stats = run(mongo["stats"].find_one({"_id": "user:a1"}))
+    assert (stats["orders_served"], stats["correct"], stats["current_streak"]) == (1, 1, 1)
+
+
+def test_public_order_keeps_is_correct_and_hides_the_answer(run, mongo, game):
+    order = public_order(run(_next_order(game, None)))
+
+    assert order["is_correct"] is False
+    assert not {"answer", "menu_hash", "pick"} & set(order)
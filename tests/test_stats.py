@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from utils.stats import _answers_update
+
+
+def _expected_streaks(results):
+    current = best = 0
+    for is_correct in results:
+        current = current + 1 if is_correct else 0
+        best = max(best, current)
+    return current, best
+
+
+async def _apply(collection, batches, streaks=True):
+    for batch in batches:
+        await collection.update_one({"_id": "user:a1"}, _answers_update({"scope": "user"}, batch, streaks), upsert=True)
+    return await collection.find_one({"_id": "user:a1"})
+
+
+@pytest.mark.parametrize(
+    "batches",
+    [
+        [[True, True, False, True]],
+        [[True], [True], [False], [True]],
+        [[True, True], [True, False, True, True, True]],
+        [[False, False], [True, True]],
+        [[True, True, True], [True, True]],
+    ],
+)
+def test_streaks_match_sequential_application(run, mongo, batches):
+    doc = run(_apply(mongo["stats"], batches))
+
+    results = [is_correct for batch in batches for is_correct in batch]
+    assert (doc["current_streak"], doc["best_streak"]) == _expected_streaks(results)
+    assert doc["orders_served"] == len(results)
+    assert doc["correct"] == sum(results)
+
+
+def test_streaks_do_not_depend_on_batch_boundaries(run, mongo):
+    rng = random.Random(5)
+    for _ in range(50):
+        results = [rng.random() < 0.6 for _ in range(rng.randrange(1, 15))]
+        cuts = sorted(rng.sample(range(1, len(results)), min(3, len(results) - 1))) if len(results) > 1 else []
+        batches = [results[start:end] for start, end in zip([0] + cuts, cuts + [len(results)])]
+        run(mongo["stats"].delete_many({}))
+
+        doc = run(_apply(mongo["stats"], batches))
+
+        assert (doc["current_streak"], doc["best_streak"]) == _expected_streaks(results), batches
+
+
+def test_menu_scopes_skip_streaks(run, mongo):
+    doc = run(_apply(mongo["stats"], [[True, True]], streaks=False))
+
+    assert "current_streak" not in doc and "best_streak" not in doc
+
+
+def test_identity_values_are_stored_literally(run, mongo):
+    update = _answers_update({"scope": "user", "user_id": "$name"}, [True], True)
+
+    run(mongo["stats"].update_one({"_id": "user:$name"}, update, upsert=True))
+
+    assert run(mongo["stats"].find_one({"_id": "user:$name"}))["user_id"] == "$name"
@@ -0,0 +1,37 @@
+import os
+from typing import Iterable, Optional
+
+from db.database import database
+
+# legacy: account_id/accountId 둘 다 조회, normalized: account_id만 조회,
+# auto: 시작 시 migration 컬렉션에서 account_id 마이그레이션 완료 여부를 확인합니다.
+ACCOUNT_ID_LOOKUP = os.getenv("ACCOUNT_ID_LOOKUP", "auto")
+ACCOUNT_ID_MIGRATION = "account_id"
+
+migration_col = database["migration"]
+_normalized = ACCOUNT_ID_LOOKUP == "normalized"
+
+
+async def load_account_lookup_mode() -> bool:
+    global _normalized
+    if ACCOUNT_ID_LOOKUP == "auto":
+        state = await migration_col.find_one({"_id": ACCOUNT_ID_MIGRATION})
+        _normalized = bool(state and state.get("completed"))
+    return _normalized
+
+
+def account_filter(account_id: str) -> dict:
+    if _normalized:
+        return {"account_id": account_id}
+    return {"$or": [{"account_id": account_id}, {"accountId": account_id}]}
+
+
+def accounts_filter(account_ids: Iterable[str]) -> dict:
+    account_ids = list(account_ids)
+    if _normalized:
+        return {"account_id": {"$in": account_ids}}
+    return {"$or": [{"account_id": {"$in": account_ids}}, {"accountId": {"$in": account_ids}}]}
+
+
+def account_id_of(user: dict) -> Optional[str]:
+    return user.get("account_id") or user.get("accountId")
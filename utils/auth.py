@@ -1,4 +1,8 @@
 # utils/auth.py
+import hashlib
+import os
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
@@ -7,23 +11,47 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 import bcrypt
 
+from utils.metrics import timed
+from utils.password_pool import PasswordPoolSaturated, password_pool
+
 SECRET_KEY = "CHANGE_ME_TO_RANDOM_LONG_STRING"  # .env로 빼는 걸 추천
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 MAX_BCRYPT_PASSWORD_BYTES = 72
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "4096"))
 
 bearer_scheme = HTTPBearer()
+# sha256(token) -> 검증된 payload. 토큰의 exp까지만 유효합니다.
+_verified_tokens: "OrderedDict[bytes, dict]" = OrderedDict()
 
 def get_password_hash(password: str) -> str:
     password_bytes = password.encode("utf-8")
-    return bcrypt.hashpw(password_bytes, bcrypt.gensalt()).decode("utf-8")
+    return bcrypt.hashpw(password_bytes, bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode("utf-8")
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     plain_bytes = plain_password.encode("utf-8")
     hashed_bytes = hashed_password.encode("utf-8")
     return bcrypt.checkpw(plain_bytes, hashed_bytes)
 
+async def _run_in_password_pool(fn, *args):
+    try:
+        with timed("bcrypt"):
+            return await password_pool.run(fn, *args)
+    except PasswordPoolSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, try again later",
+            headers={"Retry-After": "1"},
+        )
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_password_pool(get_password_hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_password_pool(verify_password, plain_password, hashed_password)
+
 def is_password_too_long(password: str) -> bool:
     return len(password.encode("utf-8")) > MAX_BCRYPT_PASSWORD_BYTES
 
@@ -31,34 +59,63 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire, "type": "access"})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    with timed("jwt"):
+        return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
     to_encode.update({"exp": expire, "type": "refresh"})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    with timed("jwt"):
+        return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def _get_verified_token(digest: bytes) -> Optional[dict]:
+    payload = _verified_tokens.get(digest)
+    if payload is None:
+        return None
+    if payload["exp"] <= time.time():
+        _verified_tokens.pop(digest, None)
+        return None
+    _verified_tokens.move_to_end(digest)
+    return payload
+
+def _remember_verified_token(digest: bytes, payload: dict) -> None:
+    if TOKEN_CACHE_MAX_SIZE <= 0 or not isinstance(payload.get("exp"), (int, float)):
+        return
+    _verified_tokens[digest] = payload
+    while len(_verified_tokens) > TOKEN_CACHE_MAX_SIZE:
+        _verified_tokens.popitem(last=False)
 
 def _decode_token(token: str) -> dict:
+    digest = hashlib.sha256(token.encode("utf-8")).digest()
+    cached = _get_verified_token(digest)
+    if cached is not None:
+        return cached
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with timed("jwt"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         if payload.get("sub") is None:
             raise credentials_exception
-        return payload
     except jwt.PyJWTError:
         raise credentials_exception
+    _remember_verified_token(digest, payload)
+    return payload
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)):
-    payload = _decode_token(credentials.credentials)
+def get_access_token_user(token: str) -> str:
+    # Authorization 헤더를 쓸 수 없는 웹소켓은 쿼리의 토큰을 이 함수로 확인합니다.
+    payload = _decode_token(token)
     if payload.get("type") != "access":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token type")
     return payload["sub"]
 
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)):
+    return get_access_token_user(credentials.credentials)
+
 def get_current_refresh_user(token: str):
     payload = _decode_token(token)
     if payload.get("type") != "refresh":
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import os
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+from db.database import database
+
+# uvicorn --workers와 gunicorn이 기본값으로 읽는 워커 수입니다.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+# memory: 같은 워커 안에서만 전달합니다. mongo: capped 컬렉션을 tail 해서 다른 워커에도 전달합니다.
+# 워커가 여럿이면 메뉴 캐시 무효화와 게임 종료가 다른 워커에 닿아야 하므로 mongo가 기본입니다.
+BROADCAST_BACKEND = os.getenv("BROADCAST_BACKEND") or ("mongo" if WEB_CONCURRENCY > 1 else "memory")
+BROADCAST_COLLECTION = os.getenv("BROADCAST_COLLECTION", "broadcast")
+BROADCAST_CAPPED_BYTES = int(os.getenv("BROADCAST_CAPPED_BYTES", str(16 * 1024 * 1024)))
+BROADCAST_RETRY_SECONDS = float(os.getenv("BROADCAST_RETRY_SECONDS", "0.5"))
+
+logger = logging.getLogger(__name__)
+
+Deliver = Callable[[str, Any], None]
+
+
+class BroadcastBackend:
+    """다른 워커와 메시지를 주고받는 부분. 같은 워커의 구독자에게는 Broadcaster가 직접 전달합니다.
+
+    다른 백엔드(Redis 등)는 이 클래스를 상속해 broadcaster.use_backend()로 끼웁니다.
+    """
+
+    # False면 다른 워커가 없는 것으로 보고 publish를 부르지 않습니다.
+    remote = False
+
+    async def start(self, deliver: Deliver) -> None:
+        pass
+
+    async def publish(self, messages: List[Tuple[str, Any]]) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class MongoBackend(BroadcastBackend):
+    remote = True
+
+    def __init__(self, collection_name: str = BROADCAST_COLLECTION, size: int = BROADCAST_CAPPED_BYTES):
+        self.collection_name = collection_name
+        self.size = size
+        # 자기 워커가 보낸 메시지는 이미 직접 전달했으므로 tail 할 때 건너뜁니다.
+        self.origin = uuid.uuid4().hex
+        self._collection = database[collection_name]
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: Deliver) -> None:
+        try:
+            await database.client[database.name].create_collection(self.collection_name, capped=True, size=self.size)
+        except CollectionInvalid:
+            pass
+        last = await self._collection.find_one({}, {"_id": 1}, sort=[("$natural", -1)])
+        self._task = asyncio.create_task(self._tail(deliver, last["_id"] if last else None))
+
+    async def publish(self, messages: List[Tuple[str, Any]]) -> None:
+        await self._collection.insert_many(
+            [{"channel": channel, "origin": self.origin, "message": message} for channel, message in messages],
+            ordered=True,
+        )
+
+    async def _tail(self, deliver: Deliver, last_id) -> None:
+        while True:
+            # 컬렉션이 비어 있거나 커서가 밀려나면 tailable 커서가 닫히므로 마지막 위치부터 다시 엽니다.
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            try:
+                async for doc in self._collection.find(query, cursor_type=CursorType.TAILABLE_AWAIT):
+                    last_id = doc["_id"]
+                    if doc.get("origin") != self.origin:
+                        deliver(doc["channel"], doc["message"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("broadcast tail failed")
+            await asyncio.sleep(BROADCAST_RETRY_SECONDS)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+BACKENDS = {"memory": BroadcastBackend, "mongo": MongoBackend}
+
+
+class Broadcaster:
+    """채널별 구독자에게 메시지를 나눠 주는 프로세스 내 pub/sub."""
+
+    def __init__(self, backend: Optional[BroadcastBackend] = None):
+        self.backend = backend
+        self._subscribers: Dict[str, List[Callable[[Any], None]]] = {}
+        self._outbox: List[Tuple[str, Any]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._started = False
+
+    def use_backend(self, backend: BroadcastBackend) -> None:
+        # start() 전에 불러야 합니다.
+        self.backend = backend
+
+    def subscribe(self, channel: str, callback: Callable[[Any], None]) -> Callable[[], None]:
+        """callback은 메시지마다 동기로 불립니다. 오래 걸리는 일은 큐나 태스크로 넘기세요."""
+        self._subscribers.setdefault(channel, []).append(callback)
+
+        def unsubscribe() -> None:
+            callbacks = self._subscribers.get(channel)
+            if callbacks and callback in callbacks:
+                callbacks.remove(callback)
+                if not callbacks:
+                    del self._subscribers[channel]
+
+        return unsubscribe
+
+    def subscriber_count(self, channel: str) -> int:
+        return len(self._subscribers.get(channel, ()))
+
+    def _deliver(self, channel: str, message: Any) -> None:
+        for callback in list(self._subscribers.get(channel, ())):
+            try:
+                callback(message)
+            except Exception:
+                logger.exception("broadcast subscriber failed channel=%s", channel)
+
+    def publish(self, channel: str, message: Any, local_only: bool = False) -> None:
+        """같은 워커의 구독자에게는 바로 전달하고, 백엔드로 다른 워커에도 보냅니다."""
+        self._deliver(channel, message)
+        if not local_only and self._started and self.backend.remote:
+            self._outbox.append((channel, message))
+            if self._flush_task is None:
+                self._flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self) -> None:
+        # 같은 이벤트 루프 턴에 쌓인 메시지를 한 번에 보냅니다.
+        try:
+            while self._outbox:
+                messages, self._outbox = self._outbox, []
+                try:
+                    await self.backend.publish(messages)
+                except Exception:
+                    logger.exception("broadcast publish failed messages=%d", len(messages))
+        finally:
+            self._flush_task = None
+
+    async def start(self) -> None:
+        if self._started:
+            return
+        if self.backend is None:
+            self.backend = BACKENDS[BROADCAST_BACKEND]()
+        if not self.backend.remote and WEB_CONCURRENCY > 1:
+            logger.warning(
+                "broadcast backend is worker-local but WEB_CONCURRENCY=%d; "
+                "menu edits and game ends will not reach other workers (set BROADCAST_BACKEND=mongo)",
+                WEB_CONCURRENCY,
+            )
+        await self.backend.start(self._deliver)
+        self._started = True
+
+    async def stop(self) -> None:
+        if not self._started:
+            return
+        self._started = False
+        if self._flush_task is not None:
+            await self._flush_task
+        await self.backend.stop()
+
+
+broadcaster = Broadcaster()
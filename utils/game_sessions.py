@@ -0,0 +1,264 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from db.database import database
+from utils.broadcast import broadcaster
+from utils.leaderboard import leaderboard
+from utils.menu_cache import CompiledMenu, menu_cache
+from utils.menu_revisions import menu_revisions
+from utils.stats import answer_stats
+
+# 1이면 진행 중인 게임 상태를 워커 메모리에 두고 채점 결과를 모아서 저장합니다.
+GAME_SESSION_STORE = os.getenv("GAME_SESSION_STORE", "0") == "1"
+GAME_SESSION_FLUSH_SECONDS = float(os.getenv("GAME_SESSION_FLUSH_SECONDS", "0.5"))
+GAME_SESSION_FLUSH_BATCH = int(os.getenv("GAME_SESSION_FLUSH_BATCH", "200"))
+GAME_SESSION_IDLE_SECONDS = float(os.getenv("GAME_SESSION_IDLE_SECONDS", "1800"))
+
+# 게임이 끝나면 모든 워커가 그 게임의 세션을 내립니다. 워커가 여럿이면 BROADCAST_BACKEND=mongo가 필요합니다.
+GAME_END_CHANNEL = "game:end"
+
+logger = logging.getLogger(__name__)
+order_col = database["order"]
+game_col = database["game"]
+
+# 채점하거나 주문을 더할 수 있는 게임의 조건. db.archive_orders는 요약하기 전에 ended_at부터 찍지만
+# 그 전 버전이 종료 표시 없이 요약한 게임이 남아 있을 수 있어 archived_at도 봅니다.
+ACTIVE_GAME = {"ended_at": None, "archived_at": None}
+
+
+def is_active(game: dict) -> bool:
+    return all(game.get(key) is None for key in ACTIVE_GAME)
+
+
+class Outcome(NamedTuple):
+    game_id: ObjectId
+    is_correct: bool
+    level: int
+    scored_at: datetime
+    user_id: str
+    menu_id: ObjectId
+
+
+async def persist_outcomes(outcomes: Dict[ObjectId, Outcome]) -> Dict[ObjectId, Outcome]:
+    """채점 결과를 bulk_write 한 번으로 저장하고 실제로 반영된 주문만 돌려줍니다."""
+    if not outcomes:
+        return {}
+    batch_id = ObjectId()
+    # score_order와 같은 조건부 필터라 다른 요청(다른 워커 포함)이 먼저 채점한 주문은 건너뜁니다.
+    operations = [
+        UpdateOne(
+            {
+                "_id": order_id,
+                "game_id": outcome.game_id,
+                "queue_seq": None,
+                "scored_at": None,
+                "is_correct": {"$ne": True},
+            },
+            {"$set": {"is_correct": outcome.is_correct, "scored_at": outcome.scored_at, "scored_batch": batch_id}},
+        )
+        for order_id, outcome in outcomes.items()
+    ]
+    result = await order_col.bulk_write(operations, ordered=False)
+    if result.modified_count == len(operations):
+        return dict(outcomes)
+    cursor = order_col.find({"_id": {"$in": list(outcomes)}, "scored_batch": batch_id}, {"_id": 1})
+    return {order["_id"]: outcomes[order["_id"]] async for order in cursor}
+
+
+class GameSession:
+    __slots__ = ("game_id", "user_id", "menu_id", "date", "menu", "score", "order", "touched_at")
+
+    def __init__(self, game: dict, menu: CompiledMenu, order: Optional[dict]):
+        self.game_id: ObjectId = game["_id"]
+        self.user_id = game.get("user_id")
+        self.menu_id: ObjectId = game.get("menu_id")
+        self.date = game.get("date")
+        self.menu = menu
+        self.score = game.get("score", 0)
+        # 아직 채점하지 않은 마지막 주문. 채점하면 scored_correct가 채워집니다.
+        self.order = order
+        self.touched_at = time.monotonic()
+
+    @property
+    def level(self) -> int:
+        return self.menu.level or 0
+
+    async def current_menu(self) -> CompiledMenu:
+        # 메뉴가 수정되어 캐시에서 빠졌으면 다시 읽고, 삭제됐으면 들고 있던 메뉴로 계속 진행합니다.
+        menu = menu_cache.get(self.menu_id) or await menu_cache.load(self.menu_id)
+        if menu is not None:
+            self.menu = menu
+        return self.menu
+
+    def leaderboard_entry(self) -> dict:
+        return {
+            "_id": self.game_id,
+            "user_id": self.user_id,
+            "menu_id": self.menu_id,
+            "score": self.score,
+            "date": self.date,
+        }
+
+
+class GameSessionStore:
+    def __init__(self, enabled: bool = GAME_SESSION_STORE):
+        self.enabled = enabled
+        self._sessions: Dict[ObjectId, GameSession] = {}
+        self._outcomes: Dict[ObjectId, Outcome] = {}
+        self._score_deltas: Dict[ObjectId, int] = {}
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, game: dict, menu: CompiledMenu, order: dict) -> Optional[GameSession]:
+        if not self.enabled:
+            return None
+        session = GameSession(game, menu, order)
+        self._sessions[session.game_id] = session
+        return session
+
+    async def get(self, game_id: ObjectId) -> Optional[GameSession]:
+        if not self.enabled:
+            return None
+        session = self._sessions.get(game_id)
+        if session is None:
+            # 다른 워커에서 시작했거나 재시작으로 사라진 게임은 MongoDB에서 다시 만듭니다.
+            session = await self._reload(game_id)
+        if session is not None:
+            session.touched_at = time.monotonic()
+        return session
+
+    async def _reload(self, game_id: ObjectId) -> Optional[GameSession]:
+        game = await game_col.find_one(
+            {"_id": game_id}, {"user_id": 1, "menu_id": 1, "score": 1, "date": 1, "ended_at": 1, "archived_at": 1}
+        )
+        if game is None or not is_active(game):
+            # 끝난 게임은 세션을 다시 만들지 않습니다. 만들면 메모리에서 채점이 이어집니다.
+            return None
+        menu = await menu_cache.load(game.get("menu_id"))
+        if menu is None:
+            return None
+        order = await order_col.find_one(
+            {"game_id": game_id, "queue_seq": None, "scored_at": None, "is_correct": {"$ne": True}},
+            {"menu_id": 1, "selection": 1, "pick": 1, "level": 1, "answer": 1, "menu_hash": 1},
+            sort=[("_id", -1)],
+        )
+        if order is not None:
+            await menu_revisions.hydrate([order])
+        # 로드하는 동안 같은 워커의 다른 요청이 먼저 만들었으면 그것을 씁니다.
+        return self._sessions.setdefault(game_id, GameSession(game, menu, order))
+
+    def record(self, session: GameSession, outcome: Outcome) -> None:
+        order_id = session.order["_id"]
+        session.order["scored_correct"] = outcome.is_correct
+        self._outcomes[order_id] = outcome
+        if outcome.is_correct:
+            session.score += outcome.level
+            leaderboard.record(session.leaderboard_entry())
+        if len(self._outcomes) >= GAME_SESSION_FLUSH_BATCH:
+            self._wakeup.set()
+
+    def sync_score(self, session: GameSession, score: int) -> None:
+        # MongoDB가 돌려준 점수가 기준입니다. 아직 저장하지 않은 이 게임의 정답 점수만 더합니다.
+        pending = self._score_deltas.get(session.game_id, 0) + sum(
+            outcome.level
+            for outcome in self._outcomes.values()
+            if outcome.game_id == session.game_id and outcome.is_correct
+        )
+        session.score = score + pending
+
+    async def flush(self) -> None:
+        async with self._lock:
+            outcomes, self._outcomes = self._outcomes, {}
+            try:
+                applied = await persist_outcomes(outcomes)
+            except BaseException:
+                # 다음 flush에서 다시 시도합니다. 그 사이 새로 쌓인 결과가 우선입니다.
+                self._outcomes = {**outcomes, **self._outcomes}
+                raise
+            for order_id, outcome in outcomes.items():
+                if not outcome.is_correct:
+                    continue
+                if order_id in applied:
+                    self._score_deltas[outcome.game_id] = self._score_deltas.get(outcome.game_id, 0) + outcome.level
+                elif outcome.game_id in self._sessions:
+                    # 다른 요청이 먼저 채점한 주문은 점수에서 뺍니다.
+                    self._sessions[outcome.game_id].score -= outcome.level
+            if self._score_deltas:
+                deltas = self._score_deltas
+                result = await game_col.bulk_write(
+                    # 다른 워커에서 이미 끝난 게임의 점수는 바꾸지 않습니다 (통계와 요약은 종료 시점 점수 기준).
+                    [
+                        UpdateOne({"_id": game_id, **ACTIVE_GAME}, {"$inc": {"score": delta}})
+                        for game_id, delta in deltas.items()
+                    ],
+                    ordered=False,
+                )
+                self._score_deltas = {}
+                if result.matched_count < len(deltas):
+                    await self._drop_inactive(list(deltas))
+            answer_stats.record(outcome for order_id, outcome in outcomes.items() if order_id in applied)
+
+    async def _drop_inactive(self, game_ids: list) -> None:
+        # 점수 갱신이 빗나간 게임은 다른 워커나 archive_orders가 끝낸 것입니다. 세션을 두면 계속 채점하게 됩니다.
+        active = {game["_id"] async for game in game_col.find({"_id": {"$in": game_ids}, **ACTIVE_GAME}, {"_id": 1})}
+        for game_id in game_ids:
+            if game_id not in active:
+                self.drop(game_id)
+
+    def drop(self, game_id: ObjectId) -> None:
+        self._sessions.pop(game_id, None)
+
+    async def end(self, game_id: ObjectId) -> None:
+        if not self.enabled:
+            return
+        self.drop(game_id)
+        broadcaster.publish(GAME_END_CHANNEL, str(game_id))
+        await self.flush()
+
+    def _evict_idle(self) -> None:
+        cutoff = time.monotonic() - GAME_SESSION_IDLE_SECONDS
+        for game_id in [game_id for game_id, session in self._sessions.items() if session.touched_at < cutoff]:
+            del self._sessions[game_id]
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), GAME_SESSION_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("game session flush failed")
+            self._evict_idle()
+
+    def start(self) -> None:
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.enabled:
+            await self.flush()
+
+
+game_sessions = GameSessionStore()
+broadcaster.subscribe(GAME_END_CHANNEL, lambda game_id: game_sessions.drop(ObjectId(game_id)))
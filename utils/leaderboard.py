@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import os
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from db.database import database
+from utils.accounts import account_id_of, accounts_filter
+from utils.broadcast import broadcaster
+
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "100"))
+LEADERBOARD_RECONCILE_SECONDS = float(os.getenv("LEADERBOARD_RECONCILE_SECONDS", "60"))
+LEADERBOARD_PERIODS = ("all", "daily", "weekly")
+MAX_CACHED_USER_NAMES = 10000
+# 웹소켓 구독자에게 바뀐 순위를 보내는 주기와 보낼 개수
+LEADERBOARD_PUSH_SECONDS = float(os.getenv("LEADERBOARD_PUSH_SECONDS", "1"))
+LEADERBOARD_PUSH_LIMIT = int(os.getenv("LEADERBOARD_PUSH_LIMIT", "10"))
+# 점수가 바뀐 게임을 모든 워커의 보드에 반영하는 채널
+LEADERBOARD_CHANNEL = "leaderboard"
+
+logger = logging.getLogger(__name__)
+
+# 보드는 주기적으로 다시 맞추므로 secondary에서 읽어도 됩니다.
+game_col = database.read_mostly["game"]
+user_col = database.read_mostly["user"]
+
+BoardKey = Tuple[Optional[str], str, Optional[datetime]]
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def window_start(period: str, now: Optional[datetime] = None) -> Optional[datetime]:
+    if period == "all":
+        return None
+    now = _as_utc(now or datetime.now(timezone.utc))
+    start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == "weekly":
+        start -= timedelta(days=start.weekday())
+    return start
+
+
+def _entry_from_game(game: dict) -> dict:
+    return {
+        "id": str(game["_id"]),
+        "user_id": game.get("user_id"),
+        "menu_id": str(game["menu_id"]) if game.get("menu_id") is not None else None,
+        "score": game.get("score", 0),
+        "date": game.get("date"),
+    }
+
+
+class Board:
+    """점수 내림차순 상위 size개 게임. 정렬 키는 (-score, game id)."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._keys: List[Tuple[int, str]] = []
+        self._entries: Dict[str, dict] = {}
+        self.reconciled_at = 0.0
+
+    def replace(self, entries: List[dict]) -> None:
+        self._entries = {entry["id"]: entry for entry in entries[: self.size]}
+        self._keys = sorted((-entry["score"], entry["id"]) for entry in self._entries.values())
+        self.reconciled_at = time.monotonic()
+
+    def is_complete(self) -> bool:
+        # 상한보다 적게 들고 있으면 해당 범위의 모든 게임을 들고 있는 것입니다.
+        return len(self._keys) < self.size
+
+    def update(self, entry: dict) -> bool:
+        # 보드에 들어갔으면 True
+        key = (-entry["score"], entry["id"])
+        previous = self._entries.get(entry["id"])
+        if previous is not None:
+            index = bisect_left(self._keys, (-previous["score"], previous["id"]))
+            if index < len(self._keys) and self._keys[index][1] == entry["id"]:
+                del self._keys[index]
+        elif not self.is_complete() and key > self._keys[-1]:
+            return False
+        insort(self._keys, key)
+        self._entries[entry["id"]] = entry
+        while len(self._keys) > self.size:
+            _, evicted = self._keys.pop()
+            self._entries.pop(evicted, None)
+        return entry["id"] in self._entries
+
+    def top(self, limit: int) -> List[dict]:
+        return [self._entries[game_id] for _, game_id in self._keys[:limit]]
+
+    def rank_of(self, score: int) -> Optional[int]:
+        index = bisect_left(self._keys, (-score, ""))
+        if index >= len(self._keys) and not self.is_complete():
+            return None
+        return index + 1
+
+
+class Leaderboard:
+    def __init__(self, size: int = LEADERBOARD_SIZE, reconcile_seconds: float = LEADERBOARD_RECONCILE_SECONDS):
+        self.size = size
+        self.reconcile_seconds = reconcile_seconds
+        self._boards: Dict[BoardKey, Board] = {}
+        self._user_names: Dict[str, Optional[str]] = {}
+        # 어느 보드든 내용이 바뀔 때마다 올라갑니다. LeaderboardFeed가 다시 보낼지 판단할 때 씁니다.
+        self.version = 0
+
+    @staticmethod
+    def _query(menu_id: Optional[str], since: Optional[datetime]) -> dict:
+        query = {}
+        if menu_id is not None:
+            query["menu_id"] = ObjectId(menu_id)
+        if since is not None:
+            query["date"] = {"$gte": since}
+        return query
+
+    async def _board(self, menu_id: Optional[str], period: str) -> Board:
+        since = window_start(period)
+        key = (menu_id, period, since)
+        board = self._boards.get(key)
+        if board is None:
+            # 지난 기간의 보드는 더 이상 갱신되지 않으므로 버립니다.
+            for stale in [k for k in self._boards if k[0] == menu_id and k[1] == period]:
+                del self._boards[stale]
+            board = self._boards[key] = Board(self.size)
+        if time.monotonic() - board.reconciled_at > self.reconcile_seconds:
+            games = await game_col.find(self._query(menu_id, since)).sort("score", -1).to_list(self.size)
+            board.replace([_entry_from_game(game) for game in games])
+            self.version += 1
+        return board
+
+    def record(self, game: dict) -> None:
+        # 이 워커의 보드에는 바로, 다른 워커의 보드에는 broadcaster 백엔드를 거쳐 apply 됩니다.
+        broadcaster.publish(LEADERBOARD_CHANNEL, _entry_from_game(game))
+
+    def apply(self, entry: dict) -> None:
+        played_at = _as_utc(entry["date"]) if entry["date"] else None
+        for (menu_id, _period, since), board in self._boards.items():
+            if menu_id is not None and menu_id != entry["menu_id"]:
+                continue
+            if since is not None and (played_at is None or played_at < since):
+                continue
+            if board.update(dict(entry)):
+                self.version += 1
+
+    def invalidate(self) -> None:
+        self._boards.clear()
+
+    async def top(self, limit: int, menu_id: Optional[str] = None, period: str = "all") -> List[dict]:
+        board = await self._board(menu_id, period)
+        entries = [dict(entry) for entry in board.top(limit)]
+        names = await self.user_names({entry["user_id"] for entry in entries if entry.get("user_id")})
+        for entry in entries:
+            entry["user_name"] = names.get(entry.get("user_id"))
+        return entries
+
+    async def rank(self, score: int, menu_id: Optional[str] = None, period: str = "all") -> int:
+        board = await self._board(menu_id, period)
+        rank = board.rank_of(score)
+        if rank is None:
+            query = self._query(menu_id, window_start(period))
+            query["score"] = {"$gt": score}
+            rank = await game_col.count_documents(query) + 1
+        return rank
+
+    async def user_names(self, user_ids) -> Dict[str, Optional[str]]:
+        missing = [user_id for user_id in user_ids if user_id not in self._user_names]
+        if missing:
+            if len(self._user_names) > MAX_CACHED_USER_NAMES:
+                self._user_names.clear()
+            users = await user_col.find(
+                accounts_filter(missing),
+                {"name": 1, "account_id": 1, "accountId": 1},
+            ).to_list(len(missing))
+            for user_id in missing:
+                self._user_names[user_id] = None
+            for user in users:
+                account_id = account_id_of(user)
+                if account_id:
+                    self._user_names[account_id] = user.get("name")
+        return {user_id: self._user_names.get(user_id) for user_id in user_ids}
+
+
+def leaderboard_channel(menu_id: Optional[str], period: str) -> str:
+    return f"leaderboard.top:{menu_id or 'all'}:{period}"
+
+
+class LeaderboardFeed:
+    """구독 중인 (menu_id, period) 보드가 바뀌면 상위 목록을 같은 워커의 구독자에게 보냅니다."""
+
+    def __init__(
+        self,
+        board: Leaderboard,
+        interval: float = LEADERBOARD_PUSH_SECONDS,
+        limit: int = LEADERBOARD_PUSH_LIMIT,
+    ):
+        self.board = board
+        self.interval = interval
+        self.limit = limit
+        self._scopes: Dict[str, Tuple[Optional[str], str]] = {}
+        self._last: Dict[str, List[dict]] = {}
+        self._seen_version = -1
+        self._task: Optional[asyncio.Task] = None
+
+    def watch(self, menu_id: Optional[str], period: str, callback: Callable[[dict], None]) -> Callable[[], None]:
+        channel = leaderboard_channel(menu_id, period)
+        self._scopes[channel] = (menu_id, period)
+        return broadcaster.subscribe(channel, callback)
+
+    async def snapshot(self, menu_id: Optional[str], period: str) -> dict:
+        return {
+            "type": "leaderboard",
+            "menu_id": menu_id,
+            "period": period,
+            "top": await self.board.top(self.limit, menu_id=menu_id, period=period),
+        }
+
+    async def push(self) -> None:
+        if self.board.version == self._seen_version:
+            return
+        self._seen_version = self.board.version
+        for channel, (menu_id, period) in list(self._scopes.items()):
+            if not broadcaster.subscriber_count(channel):
+                del self._scopes[channel]
+                self._last.pop(channel, None)
+                continue
+            message = await self.snapshot(menu_id, period)
+            if message["top"] != self._last.get(channel):
+                self._last[channel] = message["top"]
+                # 각 워커가 자기 보드로 만들어 보내므로 다른 워커로는 보내지 않습니다.
+                broadcaster.publish(channel, message, local_only=True)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.push()
+            except Exception:
+                logger.exception("leaderboard push failed")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+leaderboard = Leaderboard()
+broadcaster.subscribe(LEADERBOARD_CHANNEL, leaderboard.apply)
+leaderboard_feed = LeaderboardFeed(leaderboard)
@@ -0,0 +1,233 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from bson import ObjectId
+
+from db.database import database
+from utils.broadcast import broadcaster
+
+MENU_CACHE_TTL_SECONDS = float(os.getenv("MENU_CACHE_TTL_SECONDS", "300"))
+MENU_CACHE_MAX_SIZE = int(os.getenv("MENU_CACHE_MAX_SIZE", "256"))
+MENU_CACHE_GAMES = int(os.getenv("MENU_CACHE_GAMES", "10000"))
+
+menu_col = database["menu"]
+MENU_INVALIDATION_CHANNEL = "menu:invalidate"
+
+
+@dataclass(frozen=True)
+class CompiledToppingGroup:
+    name: Optional[str]
+    items: Tuple[dict, ...]
+
+
+@dataclass(frozen=True)
+class CompiledCategory:
+    name: Optional[str]
+    items: Tuple[dict, ...]
+    topping_groups: Tuple[CompiledToppingGroup, ...]
+
+
+@dataclass(frozen=True)
+class AnswerIndex:
+    """이름 -> 정수 id. 토핑은 메뉴 전체에서 이름별 비트 하나를 씁니다."""
+
+    categories: Dict[str, int]
+    items: Tuple[Dict[str, int], ...]
+    toppings: Dict[str, int]
+    # 카테고리별로 고를 수 있는 토핑 비트 (토핑 그룹 비트의 합)
+    allowed_toppings: Tuple[int, ...]
+
+    def topping_mask(self, names: Iterable[Optional[str]]) -> Optional[int]:
+        mask = 0
+        for name in names:
+            if not name:
+                continue
+            bit = self.toppings.get(name)
+            if bit is None:
+                return None
+            mask |= 1 << bit
+        return mask
+
+    def encode(self, category: str, item: str, topping_names: Iterable[Optional[str]]) -> Optional[dict]:
+        # 메뉴에 없는 카테고리/아이템/토핑이면 None
+        category_id = self.categories.get(category)
+        if category_id is None:
+            return None
+        item_id = self.items[category_id].get(item)
+        mask = self.topping_mask(topping_names)
+        if item_id is None or mask is None or mask & ~self.allowed_toppings[category_id]:
+            return None
+        return {"c": category_id, "i": item_id, "t": pack_topping_mask(mask)}
+
+
+def pack_topping_mask(mask: int) -> Union[int, str]:
+    # MongoDB 정수는 64비트라 토핑이 63개를 넘는 메뉴는 16진 문자열로 저장합니다.
+    return mask if mask < 1 << 63 else format(mask, "x")
+
+
+def _intern(names: Iterable[Optional[str]], ids: Dict[str, int]) -> Dict[str, int]:
+    for name in names:
+        if name is not None and name not in ids:
+            ids[name] = len(ids)
+    return ids
+
+
+def build_answer_index(categories: Tuple[CompiledCategory, ...]) -> AnswerIndex:
+    category_ids: Dict[str, int] = {}
+    toppings: Dict[str, int] = {}
+    items = []
+    allowed = []
+    for position, category in enumerate(categories):
+        # 이름이 겹치는 카테고리는 먼저 나온 것을 씁니다. 이름 기준 채점과 같은 규칙입니다.
+        category_ids.setdefault(category.name, position)
+        items.append(_intern((item.get("name") for item in category.items), {}))
+        mask = 0
+        for group in category.topping_groups:
+            _intern((item.get("name") for item in group.items), toppings)
+            for item in group.items:
+                if item.get("name") is not None:
+                    mask |= 1 << toppings[item["name"]]
+        allowed.append(mask)
+    return AnswerIndex(
+        categories=category_ids,
+        items=tuple(items),
+        toppings=toppings,
+        allowed_toppings=tuple(allowed),
+    )
+
+
+@dataclass(frozen=True)
+class CompiledMenu:
+    id: ObjectId
+    name: Optional[str]
+    description: Optional[str]
+    level: Optional[int]
+    categories: Tuple[CompiledCategory, ...]
+    content_hash: str
+    answers: AnswerIndex
+
+
+def menu_content_hash(menu: dict) -> str:
+    content = {k: v for k, v in menu.items() if k not in ("_id", "content_hash")}
+    encoded = json.dumps(content, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:32]
+
+
+def compile_menu(menu: dict) -> CompiledMenu:
+    categories = []
+    for category in menu.get("data", []):
+        groups = tuple(
+            CompiledToppingGroup(name=group.get("name"), items=tuple(group.get("items", [])))
+            for group in category.get("toping", [])
+        )
+        categories.append(
+            CompiledCategory(
+                name=category.get("kategorie"),
+                items=tuple(category.get("menus", [])),
+                topping_groups=groups,
+            )
+        )
+    return CompiledMenu(
+        id=menu["_id"],
+        name=menu.get("name"),
+        description=menu.get("description"),
+        level=menu.get("level"),
+        categories=tuple(categories),
+        content_hash=menu.get("content_hash") or menu_content_hash(menu),
+        answers=build_answer_index(tuple(categories)),
+    )
+
+
+class MenuCache:
+    """menu _id -> CompiledMenu, TTL + LRU 방식으로 만료됩니다."""
+
+    def __init__(
+        self,
+        ttl_seconds: float = MENU_CACHE_TTL_SECONDS,
+        max_size: int = MENU_CACHE_MAX_SIZE,
+        max_games: int = MENU_CACHE_GAMES,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.max_games = max_games
+        self._entries: "OrderedDict[str, Tuple[float, CompiledMenu]]" = OrderedDict()
+        # game _id -> menu _id. 게임의 메뉴는 바뀌지 않으므로 TTL 없이 LRU로만 내보냅니다.
+        self._games: "OrderedDict[ObjectId, ObjectId]" = OrderedDict()
+        self._listeners: List[Callable[[str], None]] = []
+        self._generation = 0
+
+    def get(self, menu_id) -> Optional[CompiledMenu]:
+        key = str(menu_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, compiled = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return compiled
+
+    def put(self, compiled: CompiledMenu) -> None:
+        key = str(compiled.id)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, compiled)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def load(self, menu_id: ObjectId) -> Optional[CompiledMenu]:
+        compiled = self.get(menu_id)
+        if compiled is not None:
+            return compiled
+        generation = self._generation
+        menu = await menu_col.find_one({"_id": menu_id})
+        if menu is None:
+            return None
+        compiled = compile_menu(menu)
+        # 조회 중에 무효화가 일어났다면 오래된 문서를 캐시에 넣지 않습니다.
+        if generation == self._generation:
+            self.put(compiled)
+        return compiled
+
+    def bind_game(self, game_id: ObjectId, menu_id: ObjectId) -> None:
+        self._games[game_id] = menu_id
+        self._games.move_to_end(game_id)
+        while len(self._games) > self.max_games:
+            self._games.popitem(last=False)
+
+    async def for_game(self, game_id: ObjectId) -> Optional[CompiledMenu]:
+        # 채점할 때 주문을 읽기 전에 답안을 그 게임의 메뉴로 인코딩하는 데 씁니다. 모르는 게임이면 None.
+        menu_id = self._games.get(game_id)
+        if menu_id is None:
+            return None
+        self._games.move_to_end(game_id)
+        return await self.load(menu_id)
+
+    def invalidate(self, menu_id, propagate: bool = True) -> None:
+        key = str(menu_id)
+        self._generation += 1
+        self._entries.pop(key, None)
+        if propagate:
+            for listener in self._listeners:
+                listener(key)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+        self._games.clear()
+
+    def add_invalidation_listener(self, listener: Callable[[str], None]) -> None:
+        # 여러 uvicorn 워커를 쓸 때 listener에서 다른 워커로 무효화를 전파하고,
+        # 수신 측은 invalidate(menu_id, propagate=False)를 호출하면 됩니다.
+        self._listeners.append(listener)
+
+
+menu_cache = MenuCache()
+# 수정/삭제된 메뉴를 다른 워커의 캐시에서도 지웁니다. 그러지 않으면 TTL 동안 오래된 ETag로 304를 보냅니다.
+menu_cache.add_invalidation_listener(lambda key: broadcaster.publish(MENU_INVALIDATION_CHANNEL, key))
+broadcaster.subscribe(MENU_INVALIDATION_CHANNEL, lambda key: menu_cache.invalidate(key, propagate=False))
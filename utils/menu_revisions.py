@@ -0,0 +1,164 @@
+import os
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+
+from db.database import database
+from utils.menu_cache import MENU_CACHE_MAX_SIZE, CompiledMenu, compile_menu, menu_cache
+
+# 1이면 주문에 메뉴 내용을 복사하지 않고 (revision, 인덱스)만 저장합니다.
+# 0이면 예전처럼 전체 스냅샷을 저장합니다 (이 기능 이전 버전과 섞어 배포하는 동안).
+ORDER_SLIM = os.getenv("ORDER_SLIM", "1") == "1"
+
+revision_col = database["menu_revision"]
+
+# 주문 문서에서 revision으로 되살릴 수 있는 필드
+SNAPSHOT_FIELDS = ("menu_name", "menu_description", "selection")
+# 줄인 주문에서 빼는 필드. answer는 채점할 때 answer_from_pick으로 다시 만듭니다.
+SLIM_DROPPED_FIELDS = SNAPSHOT_FIELDS + ("answer",)
+
+
+def revision_doc(menu: CompiledMenu) -> dict:
+    """메뉴 내용 하나 = revision 하나. _id가 content_hash라 같은 내용은 한 번만 저장됩니다."""
+    return {
+        "_id": menu.content_hash,
+        "name": menu.name,
+        "description": menu.description,
+        "level": menu.level,
+        "data": [
+            {
+                "kategorie": category.name,
+                "menus": list(category.items),
+                "toping": [{"name": group.name, "items": list(group.items)} for group in category.topping_groups],
+            }
+            for category in menu.categories
+        ],
+    }
+
+
+def slim_order(order_doc: dict) -> dict:
+    # pick(인덱스)이 있는 주문만 줄입니다. 스냅샷 필드는 읽을 때 menu_revisions.hydrate가 되살립니다.
+    if not ORDER_SLIM or order_doc.get("pick") is None:
+        return order_doc
+    return {key: value for key, value in order_doc.items() if key not in SLIM_DROPPED_FIELDS}
+
+
+def selection_from_pick(menu: CompiledMenu, pick: dict) -> Optional[dict]:
+    try:
+        category = menu.categories[pick["c"]]
+        toppings = []
+        for group_index, topping_index in pick.get("t") or ():
+            group = category.topping_groups[group_index]
+            toppings.append({"group": group.name, "item": group.items[topping_index]})
+        return {"category": category.name, "item": category.items[pick["i"]], "topping": toppings or None}
+    except (IndexError, KeyError, TypeError):
+        return None
+
+
+def answer_from_pick(menu: CompiledMenu, pick: dict) -> Optional[dict]:
+    # OrderGenerator가 만드는 answer와 같은 값입니다. 이름이 겹치는 카테고리면 None(이름으로 채점).
+    selection = selection_from_pick(menu, pick)
+    if selection is None:
+        return None
+    names = (topping["item"].get("name") for topping in selection["topping"] or ())
+    answer = menu.answers.encode(selection["category"], selection["item"].get("name"), names)
+    return answer if answer is not None and answer["c"] == pick["c"] else None
+
+
+def pick_from_names(
+    menu: CompiledMenu, category: str, item: str, topping_names: Iterable[Optional[str]]
+) -> Optional[dict]:
+    # 이름마다 메뉴에서 처음 나오는 위치를 고릅니다. 이름이 겹치는 메뉴에서는 같은 답이 되는 다른 pick도 있습니다.
+    position = menu.answers.categories.get(category)
+    if position is None:
+        return None
+    compiled = menu.categories[position]
+    item_index = next((index for index, entry in enumerate(compiled.items) if entry.get("name") == item), None)
+    if item_index is None:
+        return None
+    picked = {}
+    for name in set(filter(None, topping_names)):
+        found = next(
+            (
+                [group_position, topping_index]
+                for group_position, group in enumerate(compiled.topping_groups)
+                for topping_index, entry in enumerate(group.items)
+                if entry.get("name") == name
+            ),
+            None,
+        )
+        if found is None or found[0] in picked:
+            return None
+        picked[found[0]] = found
+    return {"c": position, "i": item_index, "t": [picked[group_position] for group_position in sorted(picked)]}
+
+
+class MenuRevisions:
+    """content_hash -> CompiledMenu. 내용이 바뀌지 않으므로 TTL 없이 LRU로만 내보냅니다."""
+
+    def __init__(self, max_size: int = MENU_CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, CompiledMenu]" = OrderedDict()
+        # 이 워커에서 저장을 확인한 revision
+        self._saved = set()
+
+    def _put(self, compiled: CompiledMenu) -> None:
+        self._entries[compiled.content_hash] = compiled
+        self._entries.move_to_end(compiled.content_hash)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def save(self, menu: CompiledMenu) -> None:
+        if menu.content_hash in self._saved:
+            return
+        doc = revision_doc(menu)
+        doc["created_at"] = datetime.now(timezone.utc)
+        await revision_col.update_one({"_id": doc["_id"]}, {"$setOnInsert": doc}, upsert=True)
+        self._saved.add(menu.content_hash)
+        self._put(menu)
+
+    async def resolve(self, menu_id: ObjectId, revision: Optional[str]) -> Optional[CompiledMenu]:
+        if not revision:
+            return None
+        # 진행 중인 게임은 대부분 현재 메뉴 그대로이므로 메뉴 캐시부터 봅니다.
+        current = menu_cache.get(menu_id)
+        if current is not None and current.content_hash == revision:
+            return current
+        compiled = self._entries.get(revision)
+        if compiled is not None:
+            self._entries.move_to_end(revision)
+            return compiled
+        doc = await revision_col.find_one({"_id": revision})
+        if doc is None:
+            return None
+        compiled = compile_menu({**doc, "_id": menu_id, "content_hash": revision})
+        self._put(compiled)
+        self._saved.add(revision)
+        return compiled
+
+    async def hydrate(self, orders: Iterable[dict]) -> List[dict]:
+        """pick만 있는 주문에 menu_name/menu_description/selection을 채웁니다. 예전 주문은 그대로 둡니다."""
+        orders = list(orders)
+        resolved = {}
+        for order in orders:
+            pick = order.get("pick")
+            if pick is None or "selection" in order:
+                continue
+            key: Tuple[ObjectId, str] = (order.get("menu_id"), order.get("menu_hash"))
+            if key not in resolved:
+                resolved[key] = await self.resolve(*key)
+            menu = resolved[key]
+            if menu is None:
+                continue
+            order["menu_name"] = menu.name
+            order["menu_description"] = menu.description
+            order.setdefault("level", menu.level)
+            selection = selection_from_pick(menu, pick)
+            if selection is not None:
+                order["selection"] = selection
+        return orders
+
+
+menu_revisions = MenuRevisions()
@@ -0,0 +1,138 @@
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from pymongo import monitoring
+
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "0") == "1"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class RequestStats:
+    __slots__ = ("mongo_commands", "mongo_seconds", "phases")
+
+    def __init__(self):
+        self.mongo_commands = 0
+        self.mongo_seconds = 0.0
+        self.phases: Dict[str, float] = defaultdict(float)
+
+
+class RouteStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds_sum = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.mongo_commands = 0
+        self.mongo_seconds = 0.0
+        self.phases: Dict[str, float] = defaultdict(float)
+
+    def observe(self, seconds: float, stats: RequestStats) -> None:
+        self.count += 1
+        self.seconds_sum += seconds
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                self.buckets[index] += 1
+        self.mongo_commands += stats.mongo_commands
+        self.mongo_seconds += stats.mongo_seconds
+        for phase, phase_seconds in stats.phases.items():
+            self.phases[phase] += phase_seconds
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+routes: Dict[str, RouteStats] = defaultdict(RouteStats)
+mongo_commands_by_name: Dict[str, int] = defaultdict(int)
+
+
+def start_request() -> RequestStats:
+    stats = RequestStats()
+    _current.set(stats)
+    return stats
+
+
+def route_label(scope: dict) -> str:
+    if scope.get("route") is None:
+        return "unmatched"
+    # 경로 파라미터 값을 이름으로 되돌려 /api/menu/{menu_id} 같은 템플릿 단위로 집계합니다.
+    parts = scope["path"].split("/")
+    names = {str(value): name for name, value in scope.get("path_params", {}).items()}
+    path = "/".join("{" + names[part] + "}" if part in names else part for part in parts)
+    return f"{scope['method']} {path}"
+
+
+def finish_request(route: str, seconds: float, stats: RequestStats) -> None:
+    routes[route].observe(seconds, stats)
+
+
+@contextmanager
+def timed(phase: str):
+    # pydantic, bcrypt, jwt 등 요청 안에서 쓴 시간을 단계별로 누적합니다.
+    stats = _current.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stats is not None:
+            stats.phases[phase] += time.perf_counter() - start
+
+
+def server_timing(seconds: float, stats: RequestStats) -> str:
+    parts = [
+        f"app;dur={seconds * 1000:.2f}",
+        f'mongo;dur={stats.mongo_seconds * 1000:.2f};desc="{stats.mongo_commands} commands"',
+    ]
+    parts += [f"{phase};dur={phase_seconds * 1000:.2f}" for phase, phase_seconds in stats.phases.items()]
+    return ", ".join(parts)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    # Motor는 executor로 넘길 때 contextvars를 복사하므로 요청별 통계에 그대로 누적됩니다.
+    def started(self, event):
+        pass
+
+    def _finished(self, event):
+        mongo_commands_by_name[event.command_name] += 1
+        stats = _current.get()
+        if stats is not None:
+            stats.mongo_commands += 1
+            stats.mongo_seconds += event.duration_micros / 1_000_000
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        self._finished(event)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def render_prometheus(extra: Optional[List[str]] = None) -> str:
+    lines = ["# TYPE http_request_duration_seconds histogram"]
+    for route, stats in sorted(routes.items()):
+        label = f'route="{_label(route)}"'
+        for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+            lines.append(f'http_request_duration_seconds_bucket{{{label},le="{bound}"}} {count}')
+        lines.append(f'http_request_duration_seconds_bucket{{{label},le="+Inf"}} {stats.count}')
+        lines.append(f"http_request_duration_seconds_sum{{{label}}} {stats.seconds_sum}")
+        lines.append(f"http_request_duration_seconds_count{{{label}}} {stats.count}")
+    lines.append("# TYPE http_request_mongo_commands_total counter")
+    for route, stats in sorted(routes.items()):
+        lines.append(f'http_request_mongo_commands_total{{route="{_label(route)}"}} {stats.mongo_commands}')
+    lines.append("# TYPE http_request_mongo_seconds_total counter")
+    for route, stats in sorted(routes.items()):
+        lines.append(f'http_request_mongo_seconds_total{{route="{_label(route)}"}} {stats.mongo_seconds}')
+    lines.append("# TYPE http_request_phase_seconds_total counter")
+    for route, stats in sorted(routes.items()):
+        for phase, seconds in sorted(stats.phases.items()):
+            lines.append(
+                f'http_request_phase_seconds_total{{route="{_label(route)}",phase="{_label(phase)}"}} {seconds}'
+            )
+    lines.append("# TYPE mongo_commands_total counter")
+    for name, count in sorted(mongo_commands_by_name.items()):
+        lines.append(f'mongo_commands_total{{command="{_label(name)}"}} {count}')
+    lines.extend(extra or [])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from db.database import database
+from utils.menu_revisions import menu_revisions
+
+# 0이면 게임이 끝나도 주문을 요약하지 않고 원본 그대로 둡니다.
+ORDER_ARCHIVE = os.getenv("ORDER_ARCHIVE", "1") == "1"
+# 요약한 뒤 원본 주문을 남겨 둘 시간. TTL 인덱스(expire_at)가 지웁니다. 0이면 바로 삭제합니다.
+ORDER_ARCHIVE_RAW_TTL_SECONDS = int(os.getenv("ORDER_ARCHIVE_RAW_TTL_SECONDS", "86400"))
+
+logger = logging.getLogger(__name__)
+order_col = database["order"]
+game_col = database["game"]
+archive_col = database["order_archive"]
+
+_background_tasks = set()
+_ORDER_PROJECTION = {
+    "menu_name": 1,
+    "menu_description": 1,
+    "level": 1,
+    "selection": 1,
+    "menu_id": 1,
+    "menu_hash": 1,
+    "pick": 1,
+    "created_at": 1,
+    "scored_at": 1,
+    "is_correct": 1,
+}
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _elapsed_ms(start: Optional[datetime], end: Optional[datetime]) -> Optional[int]:
+    if start is None or end is None:
+        return None
+    return int((_as_utc(end) - _as_utc(start)).total_seconds() * 1000)
+
+
+def build_summary(game: dict, orders: List[dict]) -> dict:
+    """게임 하나의 주문을 요약 문서 하나로 만듭니다. 목록 API가 쓰는 정답 주문만 내용을 남깁니다."""
+    correct_orders = []
+    answer_ms = []
+    scored = 0
+    for order in orders:
+        elapsed = _elapsed_ms(order.get("created_at"), order.get("scored_at"))
+        if order.get("scored_at") is not None or order.get("is_correct"):
+            scored += 1
+        if elapsed is not None:
+            answer_ms.append(elapsed)
+        if order.get("is_correct"):
+            correct_orders.append(
+                {
+                    "_id": order["_id"],
+                    "level": order.get("level"),
+                    "selection": order.get("selection"),
+                    "created_at": order.get("created_at"),
+                    "scored_at": order.get("scored_at"),
+                    "answer_ms": elapsed,
+                }
+            )
+    first = orders[0] if orders else {}
+    return {
+        "_id": game["_id"],
+        "user_id": game.get("user_id"),
+        "menu_id": game.get("menu_id"),
+        "menu_name": first.get("menu_name"),
+        "menu_description": first.get("menu_description"),
+        "score": game.get("score", 0),
+        "started_at": game.get("date"),
+        "ended_at": game.get("ended_at"),
+        "duration_ms": _elapsed_ms(game.get("date"), game.get("ended_at")),
+        "orders_served": len(orders),
+        "orders_scored": scored,
+        "orders_correct": len(correct_orders),
+        "answer_ms_sum": sum(answer_ms),
+        "answer_ms_max": max(answer_ms) if answer_ms else None,
+        "correct_orders": correct_orders,
+        "archived_at": datetime.now(timezone.utc),
+    }
+
+
+def archived_orders(summary: dict) -> List[dict]:
+    # 원본 주문과 같은 모양으로 되돌려 list_orders_by_game이 어느 쪽에서 읽었는지 드러나지 않게 합니다.
+    return [
+        {
+            "_id": order["_id"],
+            "menu_id": summary.get("menu_id"),
+            "game_id": summary["_id"],
+            "menu_name": summary.get("menu_name"),
+            "menu_description": summary.get("menu_description"),
+            "level": order.get("level"),
+            "selection": order.get("selection"),
+            "created_at": order.get("created_at"),
+            "is_correct": True,
+            "scored_at": order.get("scored_at"),
+        }
+        for order in summary.get("correct_orders", [])
+    ]
+
+
+async def archive_game(game: dict) -> Optional[dict]:
+    """끝난 게임의 주문을 order_archive에 요약하고 원본 주문은 만료시킵니다. 이미 요약했으면 None."""
+    if game.get("archived_at") is not None:
+        return None
+    find_cursor = order_col.find({"game_id": game["_id"], "queue_seq": None}, _ORDER_PROJECTION).sort("_id", 1)
+    # revision을 참조하는 주문도 요약에는 스냅샷으로 남깁니다. 요약은 원본과 revision 없이 읽혀야 합니다.
+    orders = await menu_revisions.hydrate(await find_cursor.to_list(None))
+    if not orders and await archive_col.find_one({"_id": game["_id"]}, {"_id": 1}) is not None:
+        # 요약과 원본 정리까지 끝내고 게임 표시만 못 한 경우입니다. 요약을 빈 것으로 덮어쓰지 않습니다.
+        await game_col.update_one({"_id": game["_id"]}, {"$set": {"archived_at": datetime.now(timezone.utc)}})
+        return None
+    summary = build_summary(game, orders)
+    await archive_col.replace_one({"_id": game["_id"]}, summary, upsert=True)
+    if ORDER_ARCHIVE_RAW_TTL_SECONDS > 0:
+        expire_at = summary["archived_at"] + timedelta(seconds=ORDER_ARCHIVE_RAW_TTL_SECONDS)
+        await order_col.update_many({"game_id": game["_id"]}, {"$set": {"expire_at": expire_at}})
+    else:
+        await order_col.delete_many({"game_id": game["_id"]})
+    # 마지막에 표시하므로 중간에 실패하면 db.archive_orders가 처음부터 다시 요약합니다.
+    await game_col.update_one({"_id": game["_id"]}, {"$set": {"archived_at": summary["archived_at"]}})
+    return summary
+
+
+async def _archive_quietly(game: dict) -> None:
+    try:
+        await archive_game(game)
+    except Exception:
+        # 놓친 게임은 python -m db.archive_orders로 다시 요약합니다.
+        logger.exception("order archive failed game_id=%s", game.get("_id"))
+
+
+def archive_game_later(game: dict) -> None:
+    if not ORDER_ARCHIVE:
+        return
+    task = asyncio.create_task(_archive_quietly(game))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
@@ -0,0 +1,167 @@
+import os
+import random
+import secrets
+from array import array
+from collections import OrderedDict
+from math import comb
+from typing import List, Optional, Sequence, Tuple, Union
+
+from bson import ObjectId
+
+from utils.menu_cache import MENU_CACHE_MAX_SIZE, CompiledCategory, CompiledMenu, pack_topping_mask
+
+# 같은 시드, game_id, 위치면 같은 주문이 나옵니다. 비워 두면 프로세스마다 새로 정합니다.
+ORDER_GENERATOR_SEED = os.getenv("ORDER_GENERATOR_SEED") or secrets.token_hex(16)
+DEFAULT_LEVEL = 5
+# 토핑 그룹이 이 수 이하면 그룹 조합 전체를 표 하나로 뽑습니다.
+MAX_SUBSET_GROUPS = 10
+
+
+def topping_probability(level: Optional[int]) -> float:
+    # 토핑 그룹마다 토핑이 붙을 확률. level 5가 기존의 동전 던지기(0.5)와 같습니다.
+    level = DEFAULT_LEVEL if level is None else level
+    return min(0.9, max(0.1, 0.1 + 0.08 * level))
+
+
+class AliasTable:
+    """Vose alias method. 가중치 목록에서 난수 한 번으로 인덱스 하나를 뽑습니다."""
+
+    __slots__ = ("size", "prob", "alias")
+
+    def __init__(self, weights: Sequence[float]):
+        size = len(weights)
+        total = float(sum(weights))
+        scaled = [weight * size / total for weight in weights]
+        self.size = size
+        self.prob = array("d", [1.0] * size)
+        self.alias = array("l", range(size))
+        small = [index for index, value in enumerate(scaled) if value < 1.0]
+        large = [index for index, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+
+    def sample(self, rng: random.Random) -> int:
+        value = rng.random() * self.size
+        index = int(value)
+        return index if value - index < self.prob[index] else self.alias[index]
+
+
+def _topping_bit(toppings: dict, item: dict) -> int:
+    return 1 << toppings[item["name"]] if item.get("name") is not None else 0
+
+
+class _CategoryTable:
+    __slots__ = ("position", "name", "items", "item_ids", "category_id", "groups", "subsets", "subset_table", "topping_counts")
+
+    def __init__(self, position: int, category: CompiledCategory, menu: CompiledMenu, probability: float):
+        answers = menu.answers
+        self.position = position
+        self.name = category.name
+        self.items = category.items
+        # 이름이 겹치는 카테고리는 채점 인덱스가 앞 카테고리를 가리키므로 answer 없이 이름으로 채점합니다.
+        self.category_id = position if answers.categories.get(category.name) == position else None
+        self.item_ids = array("l", (answers.items[position].get(item.get("name"), -1) for item in category.items))
+        # (메뉴 안 그룹 위치, 그룹 이름, 토핑 목록, 토핑별 비트)
+        self.groups = [
+            (group_position, group.name, group.items, [_topping_bit(answers.toppings, item) for item in group.items])
+            for group_position, group in enumerate(category.topping_groups)
+            if group.items
+        ]
+        count = len(self.groups)
+        self.subsets = self.subset_table = self.topping_counts = None
+        if count <= MAX_SUBSET_GROUPS:
+            # 그룹마다 probability로 토핑을 붙이는 것과 같은 분포를 조합 단위로 펼쳐 둡니다.
+            self.subsets = [
+                tuple(index for index in range(count) if subset >> index & 1) for subset in range(1 << count)
+            ]
+            self.subset_table = AliasTable(
+                [probability ** len(groups) * (1 - probability) ** (count - len(groups)) for groups in self.subsets]
+            )
+        else:
+            # 그룹이 많으면 붙일 그룹 수(이항분포)를 뽑은 뒤 그만큼 그룹을 고릅니다.
+            self.topping_counts = AliasTable(
+                [comb(count, k) * probability**k * (1 - probability) ** (count - k) for k in range(count + 1)]
+            )
+
+    def pick_groups(self, rng: random.Random) -> Sequence[int]:
+        if self.subset_table is not None:
+            return self.subsets[self.subset_table.sample(rng)]
+        picked = self.topping_counts.sample(rng)
+        return sorted(rng.sample(range(len(self.groups)), picked)) if picked else ()
+
+
+class OrderGenerator:
+    def __init__(self, menu: CompiledMenu):
+        self.menu = menu
+        probability = topping_probability(menu.level)
+        self._categories = [
+            _CategoryTable(position, category, menu, probability)
+            for position, category in enumerate(menu.categories)
+            if category.items
+        ]
+        self._category_table = AliasTable([1.0] * len(self._categories)) if self._categories else None
+
+    @property
+    def empty(self) -> bool:
+        return self._category_table is None
+
+    def generate(self, count: int, rng: random.Random) -> List[Tuple[dict, Optional[dict], dict]]:
+        """(selection, answer, pick) 목록. answer는 CompiledMenu.answers.encode와 같은 형식이고,
+        pick은 메뉴 안 위치({"c": 카테고리, "i": 아이템, "t": [[토핑 그룹, 토핑], ...]})입니다.
+
+        selection 안의 item dict는 캐시된 메뉴와 공유하므로 고치지 말고 복사해서 쓰세요.
+        """
+        categories = self._categories
+        category_table = self._category_table
+        uniform = rng.random
+        orders = []
+        for _ in range(count):
+            category = categories[category_table.sample(rng)]
+            item_index = int(uniform() * len(category.items))
+            toppings = []
+            picked = []
+            mask = 0
+            for group_index in category.pick_groups(rng):
+                group_position, group_name, items, bits = category.groups[group_index]
+                topping_index = int(uniform() * len(items))
+                toppings.append({"group": group_name, "item": items[topping_index]})
+                picked.append([group_position, topping_index])
+                mask |= bits[topping_index]
+            selection = {"category": category.name, "item": category.items[item_index], "topping": toppings or None}
+            answer = None
+            item_id = category.item_ids[item_index]
+            if category.category_id is not None and item_id >= 0:
+                answer = {"c": category.category_id, "i": item_id, "t": pack_topping_mask(mask)}
+            orders.append((selection, answer, {"c": category.position, "i": item_index, "t": picked}))
+        return orders
+
+
+class OrderGeneratorRegistry:
+    """메뉴별 샘플링 테이블을 들고 있고 게임의 주문 위치마다 난수 스트림을 만듭니다."""
+
+    def __init__(self, seed: str = ORDER_GENERATOR_SEED):
+        self.seed = seed
+        self._generators: "OrderedDict[Tuple[str, str], OrderGenerator]" = OrderedDict()
+
+    def for_menu(self, menu: CompiledMenu) -> OrderGenerator:
+        key = (str(menu.id), menu.content_hash)
+        generator = self._generators.get(key)
+        if generator is None:
+            generator = self._generators[key] = OrderGenerator(menu)
+            while len(self._generators) > MENU_CACHE_MAX_SIZE:
+                self._generators.popitem(last=False)
+        else:
+            self._generators.move_to_end(key)
+        return generator
+
+    def stream(self, game_id: ObjectId, position: Union[int, str]) -> random.Random:
+        # 위치는 게임 문서(order_seq)나 주문 큐(queue_seq)에 저장된 값입니다. 워커가 여럿이거나
+        # 재시작해도 같은 위치를 다시 쓰지 않으므로 한 게임에 같은 주문 순서가 반복되지 않습니다.
+        return random.Random(f"{self.seed}:{game_id}:{position}")
+
+
+order_generators = OrderGeneratorRegistry()
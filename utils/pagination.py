@@ -0,0 +1,90 @@
+import base64
+import binascii
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+
+from utils.responses import dumps
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(last_id: ObjectId) -> str:
+    return base64.urlsafe_b64encode(last_id.binary).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> ObjectId:
+    try:
+        return ObjectId(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, InvalidId, TypeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+def page_query(query: dict, cursor: Optional[str]) -> dict:
+    # 결과는 항상 _id 오름차순이므로 마지막으로 받은 _id 다음부터 이어서 조회합니다.
+    if cursor:
+        query = {**query, "_id": {"$gt": decode_cursor(cursor)}}
+    return query
+
+
+async def fetch_page(find_cursor, limit: int) -> Tuple[List[dict], Optional[str]]:
+    docs = await find_cursor.limit(limit + 1).to_list(limit + 1)
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1]["_id"])
+
+
+def page_list(docs: List[dict], cursor: Optional[str], limit: int) -> Tuple[List[dict], Optional[str]]:
+    # 이미 메모리에 있는 _id 오름차순 목록을 page_query/fetch_page와 같은 방식으로 자릅니다.
+    if cursor:
+        after = decode_cursor(cursor)
+        docs = [doc for doc in docs if doc["_id"] > after]
+    if len(docs) <= limit:
+        return docs, None
+    docs = docs[:limit]
+    return docs, encode_cursor(docs[-1]["_id"])
+
+
+def next_cursor_headers(next_cursor: Optional[str]) -> Dict[str, str]:
+    if next_cursor:
+        return {NEXT_CURSOR_HEADER: next_cursor}
+    return {}
+
+
+def ndjson_response(
+    find_cursor,
+    limit: int,
+    serialize: Callable[[dict], dict],
+    prepare: Optional[Callable[[List[dict]], Awaitable[Any]]] = None,
+) -> StreamingResponse:
+    # prepare는 serialize 전에 문서 목록을 제자리에서 채울 때 씁니다 (예: menu_revisions.hydrate).
+    async def lines():
+        last_id = None
+        sent = 0
+        async for doc in find_cursor.limit(limit + 1):
+            if sent == limit:
+                # 다음 페이지가 있으면 마지막 줄로 이어받기용 커서를 보냅니다.
+                yield dumps({"next_cursor": encode_cursor(last_id)}) + b"\n"
+                break
+            last_id = doc["_id"]
+            sent += 1
+            if prepare is not None:
+                await prepare([doc])
+            yield dumps(serialize(doc)) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+def ndjson_page(docs: List[dict], next_cursor: Optional[str], serialize: Callable[[dict], dict]) -> StreamingResponse:
+    # ndjson_response와 같은 형식이지만 이미 읽어 둔 페이지를 내보냅니다.
+    async def lines():
+        for doc in docs:
+            yield dumps(serialize(doc)) + b"\n"
+        if next_cursor:
+            yield dumps({"next_cursor": next_cursor}) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
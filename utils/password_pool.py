@@ -0,0 +1,90 @@
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Optional, Tuple
+
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # thread | process
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class PasswordPoolSaturated(Exception):
+    pass
+
+
+def _timed_call(fn: Callable, *args) -> Tuple[object, float]:
+    # 워커 안에서 실행되므로 모듈 수준 함수여야 합니다 (process executor pickle).
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+class PasswordHashPool:
+    def __init__(
+        self,
+        kind: str = PASSWORD_HASH_EXECUTOR,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+    ):
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.hash_seconds_sum = 0.0
+        self.wait_seconds_sum = 0.0
+        self.hash_seconds_buckets = [0] * len(LATENCY_BUCKETS)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+
+    async def run(self, fn: Callable, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordPoolSaturated()
+        self.pending += 1
+        submitted = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, hash_seconds = await loop.run_in_executor(self._get_executor(), _timed_call, fn, *args)
+        finally:
+            self.pending -= 1
+        self._observe(hash_seconds, time.perf_counter() - submitted - hash_seconds)
+        return result
+
+    def _observe(self, hash_seconds: float, wait_seconds: float) -> None:
+        self.completed += 1
+        self.hash_seconds_sum += hash_seconds
+        self.wait_seconds_sum += max(wait_seconds, 0.0)
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if hash_seconds <= bound:
+                self.hash_seconds_buckets[index] += 1
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "hash_seconds_sum": self.hash_seconds_sum,
+            "wait_seconds_sum": self.wait_seconds_sum,
+            "hash_seconds_buckets": dict(zip(LATENCY_BUCKETS, self.hash_seconds_buckets)),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+password_pool = PasswordHashPool()
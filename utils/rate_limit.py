@@ -0,0 +1,257 @@
+import logging
+import math
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from pymongo import ReturnDocument
+from starlette.requests import HTTPConnection
+
+from db.database import database
+
+# 0이면 한도를 확인하지 않습니다.
+RATE_LIMIT = os.getenv("RATE_LIMIT", "1") == "1"
+# memory: 워커마다 따로 셉니다. mongo: 토큰 버킷을 MongoDB에 두고 모든 워커가 나눠 씁니다.
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+# memory 백엔드가 들고 있을 최대 버킷 수. 넘으면 오래 안 쓴 버킷부터 지웁니다 (가득 찬 버킷과 같음).
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+# 프록시 뒤에서 실행할 때만 1로 두세요. X-Forwarded-For의 첫 주소를 클라이언트 IP로 씁니다.
+RATE_LIMIT_TRUST_FORWARDED = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "0") == "1"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Rate:
+    """토큰 버킷. capacity개까지 몰아서 쓸 수 있고 초당 per_second개씩 다시 찹니다."""
+
+    capacity: float
+    per_second: float
+
+
+def parse_rate(value: str) -> Optional[Rate]:
+    # "10/60" = 60초에 10번 (한 번에 10번까지). 비우거나 0이면 제한하지 않습니다.
+    if not value or value == "0":
+        return None
+    count, _, seconds = value.partition("/")
+    return Rate(float(count), float(count) / float(seconds or 1))
+
+
+@dataclass(frozen=True)
+class RoutePolicy:
+    route: Optional[Rate]
+    ip: Optional[Rate]
+    account: Optional[Rate]
+    # 이 워커에서 동시에 처리할 요청 수 (라우트 전체 / 계정별). 0이면 제한하지 않습니다.
+    concurrency: int
+    account_concurrency: int
+
+
+def _policy(name: str, route: str, ip: str, account: str, concurrency: int, account_concurrency: int) -> RoutePolicy:
+    prefix = f"RATE_LIMIT_{name.upper()}"
+    return RoutePolicy(
+        route=parse_rate(os.getenv(prefix, route)),
+        ip=parse_rate(os.getenv(f"{prefix}_IP", ip)),
+        account=parse_rate(os.getenv(f"{prefix}_ACCOUNT", account)),
+        concurrency=int(os.getenv(f"{prefix}_CONCURRENCY", str(concurrency))),
+        account_concurrency=int(os.getenv(f"{prefix}_ACCOUNT_CONCURRENCY", str(account_concurrency))),
+    )
+
+
+# 키오스크 여러 대가 IP 하나를 나눠 쓰는 매장이 있으므로 IP 한도는 계정 한도보다 넉넉하게 둡니다.
+# login + signup 동시 처리 수의 합은 PASSWORD_HASH_MAX_PENDING(32) 이하로 둬야 bcrypt 풀의 503보다 먼저 걸립니다.
+POLICIES: Dict[str, RoutePolicy] = {
+    "login": _policy("login", route="100/1", ip="60/60", account="10/60", concurrency=24, account_concurrency=1),
+    "signup": _policy("signup", route="50/1", ip="20/60", account="5/60", concurrency=8, account_concurrency=1),
+    # 채점의 계정별 버킷은 기본으로 끕니다. 오프라인 키오스크가 다시 연결되면 쌓인 답안을 몰아서 보냅니다.
+    # 필요하면 RATE_LIMIT_SCORE_ACCOUNT(예: 10/1)로 켜세요.
+    "score": _policy("score", route="", ip="1200/60", account="", concurrency=0, account_concurrency=4),
+}
+
+
+class RateLimitBackend(ABC):
+    """토큰 버킷 상태 저장소. 기본은 워커 메모리입니다.
+
+    여러 워커가 한도를 나눠 쓰려면 이 클래스를 상속해(Redis 등) rate_limiter.use_backend()로 끼웁니다.
+    동시 처리 수는 워커 자원(이벤트 루프, bcrypt 풀)을 지키는 것이므로 백엔드와 상관없이 워커별로 셉니다.
+    """
+
+    @abstractmethod
+    async def take(self, key: str, rate: Rate) -> float:
+        """토큰 하나를 쓰면 0, 모자라면 다음 토큰까지 기다릴 초를 반환합니다."""
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class MemoryBackend(RateLimitBackend):
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+
+    async def take(self, key: str, rate: Rate) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [rate.capacity, now]
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(rate.capacity, bucket[0] + (now - bucket[1]) * rate.per_second)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / rate.per_second
+
+
+class MongoBackend(RateLimitBackend):
+    """버킷 하나 = 문서 하나. 파이프라인 업데이트 한 번으로 채우고 쓰므로 워커 사이에 경쟁이 없습니다."""
+
+    def __init__(self):
+        self._collection = database["rate_limit"]
+
+    async def take(self, key: str, rate: Rate) -> float:
+        # 워커마다 시계가 다를 수 있으므로 서버 시각($$NOW)으로 계산합니다.
+        elapsed_ms = {"$subtract": ["$$NOW", {"$ifNull": ["$updated_at", "$$NOW"]}]}
+        refilled = {"$add": [{"$ifNull": ["$tokens", rate.capacity]}, {"$multiply": [elapsed_ms, rate.per_second / 1000]}]}
+        has_token = {"$gte": ["$tokens", 1]}
+        try:
+            bucket = await self._collection.find_one_and_update(
+                {"_id": key},
+                [
+                    {"$set": {"tokens": {"$min": [rate.capacity, refilled]}, "updated_at": "$$NOW"}},
+                    {
+                        "$set": {
+                            "allowed": has_token,
+                            "tokens": {"$cond": [has_token, {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                            # 다시 가득 찰 때쯤 TTL 인덱스(expire_at_ttl)가 지웁니다.
+                            "expire_at": {"$add": ["$$NOW", int(rate.capacity / rate.per_second * 1000)]},
+                        }
+                    },
+                ],
+                projection={"tokens": 1, "allowed": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except Exception:
+            # 저장소가 안 될 때 로그인까지 막지 않도록 통과시킵니다.
+            logger.exception("rate limit backend failed key=%s", key)
+            return 0.0
+        if bucket.get("allowed"):
+            return 0.0
+        return (1 - bucket.get("tokens", 0)) / rate.per_second
+
+
+BACKENDS = {"memory": MemoryBackend, "mongo": MongoBackend}
+
+
+def client_ip(connection: HTTPConnection) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = connection.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return connection.client.host if connection.client else "unknown"
+
+
+def _too_many_requests(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests, try again later",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class RateLimiter:
+    """라우트별 토큰 버킷(라우트 전체, IP별, 계정별)과 동시 처리 수로 요청을 받을지 정합니다."""
+
+    def __init__(
+        self,
+        policies: Dict[str, RoutePolicy] = POLICIES,
+        backend: Optional[RateLimitBackend] = None,
+        enabled: bool = RATE_LIMIT,
+    ):
+        self.policies = policies
+        self.backend = backend
+        self.enabled = enabled
+        self._in_flight: Dict[Tuple[str, Optional[str]], int] = defaultdict(int)
+        self.rejected: Dict[Tuple[str, str], int] = defaultdict(int)
+
+    def use_backend(self, backend: RateLimitBackend) -> None:
+        # start() 전에 불러야 합니다.
+        self.backend = backend
+
+    async def start(self) -> None:
+        if self.backend is None:
+            self.backend = BACKENDS[RATE_LIMIT_BACKEND]()
+        await self.backend.start()
+
+    async def stop(self) -> None:
+        if self.backend is not None:
+            await self.backend.stop()
+
+    async def check(self, route: str, ip: Optional[str], account: Optional[str]) -> None:
+        """한도를 넘으면 429 HTTPException(Retry-After 포함)을 냅니다."""
+        policy = self.policies[route]
+        if self.backend is None:
+            # lifespan 없이 앱을 쓰는 경우(스크립트 등)
+            self.backend = BACKENDS[RATE_LIMIT_BACKEND]()
+        # 좁은 범위부터 봅니다. 계정/IP 한도에 걸린 요청이 라우트 전체 토큰을 쓰면 다른 사용자까지 막힙니다.
+        buckets = ((policy.account, "account", account), (policy.ip, "ip", ip), (policy.route, "route", ""))
+        for rate, scope, value in buckets:
+            if rate is None or value is None:
+                continue
+            retry_after = await self.backend.take(f"{route}:{scope}:{value}", rate)
+            if retry_after > 0:
+                self.rejected[(route, scope)] += 1
+                raise _too_many_requests(retry_after)
+
+    @asynccontextmanager
+    async def admit(self, route: str, ip: Optional[str], account: Optional[str]) -> AsyncIterator[None]:
+        """check()를 통과하고 동시 처리 자리가 있을 때만 블록을 실행합니다."""
+        if not self.enabled:
+            yield
+            return
+        await self.check(route, ip, account)
+        policy = self.policies[route]
+        slots = []
+        if policy.concurrency > 0:
+            slots.append(((route, None), policy.concurrency, "concurrency"))
+        if policy.account_concurrency > 0 and account is not None:
+            slots.append(((route, account), policy.account_concurrency, "account_concurrency"))
+        for key, limit, scope in slots:
+            if self._in_flight[key] >= limit:
+                # 기다리게 하면 뒤 요청의 지연만 늘어나므로 바로 거절합니다.
+                self.rejected[(route, scope)] += 1
+                raise _too_many_requests(1)
+        for key, _limit, _scope in slots:
+            self._in_flight[key] += 1
+        try:
+            yield
+        finally:
+            for key, _limit, _scope in slots:
+                self._in_flight[key] -= 1
+                if not self._in_flight[key]:
+                    del self._in_flight[key]
+
+    def metrics(self) -> dict:
+        return {
+            "rejected": dict(self.rejected),
+            "in_flight": {
+                route: self._in_flight.get((route, None), 0)
+                for route, policy in self.policies.items()
+                if policy.concurrency > 0
+            },
+        }
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,39 @@
+from typing import Any, Mapping, Optional
+
+import orjson
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+def _default(value: Any):
+    # orjson이 모르는 타입만 여기로 옵니다. datetime, dict, list는 orjson이 직접 처리합니다.
+    if isinstance(value, ObjectId):
+        return str(value)
+    return jsonable_encoder(value)
+
+
+class BSONJSONResponse(JSONResponse):
+    """ObjectId/datetime이 섞인 MongoDB 문서를 한 번에 orjson으로 인코딩합니다."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def public_doc(doc: dict) -> dict:
+    # _id -> id. 중첩된 ObjectId는 인코딩할 때 문자열로 바뀝니다.
+    doc["id"] = doc.pop("_id")
+    return doc
+
+
+def json_response(
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[Mapping[str, str]] = None,
+) -> BSONJSONResponse:
+    # dict를 그대로 반환하면 FastAPI가 jsonable_encoder로 한 번 더 순회하므로 응답 객체를 직접 만듭니다.
+    return BSONJSONResponse(content, status_code=status_code, headers=headers)
@@ -0,0 +1,167 @@
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from db.database import database
+
+# 채점 통계는 요청에서 기다리지 않고 모아서 저장합니다.
+STATS_FLUSH_SECONDS = float(os.getenv("STATS_FLUSH_SECONDS", "0.5"))
+STATS_FLUSH_BATCH = int(os.getenv("STATS_FLUSH_BATCH", "500"))
+
+logger = logging.getLogger(__name__)
+stats_col = database["stats"]
+
+
+def _day(value: datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%d")
+
+
+def stats_id(scope: str, *parts) -> str:
+    return ":".join([scope, *map(str, parts)])
+
+
+def _scopes(user_id: str, menu_id: ObjectId, day: str) -> List[Tuple[str, dict, bool]]:
+    # (_id, 식별 필드, 연속 정답 집계 여부). 메뉴 전체 통계에는 연속 정답이 의미가 없습니다.
+    menu = str(menu_id)
+    return [
+        (stats_id("user", user_id), {"scope": "user", "user_id": user_id}, True),
+        (stats_id("user_menu", user_id, menu), {"scope": "user_menu", "user_id": user_id, "menu_id": menu}, True),
+        (stats_id("menu", menu), {"scope": "menu", "menu_id": menu}, False),
+        (stats_id("menu_day", menu, day), {"scope": "menu_day", "menu_id": menu, "day": day}, False),
+    ]
+
+
+def _current(field: str) -> dict:
+    return {"$ifNull": [f"${field}", 0]}
+
+
+def _answers_update(identity: dict, results: List[bool], streaks: bool) -> list:
+    fields = {
+        # 파이프라인 안에서는 "$"로 시작하는 문자열이 필드 경로가 되므로 account_id 같은 값은 $literal로 감쌉니다.
+        **{key: {"$literal": value} for key, value in identity.items()},
+        "orders_served": {"$add": [_current("orders_served"), len(results)]},
+        "correct": {"$add": [_current("correct"), sum(results)]},
+    }
+    if streaks:
+        # 한 번에 여러 결과가 들어와도 순서대로 적용한 것과 같은 값이 되도록
+        # 앞쪽 연속 정답, 뒤쪽 연속 정답, 가장 긴 연속 정답을 미리 계산합니다.
+        runs, run = [], 0
+        for is_correct in results:
+            run = run + 1 if is_correct else 0
+            runs.append(run)
+        leading = results.index(False) if False in results else len(results)
+        if leading == len(results):
+            fields["current_streak"] = {"$add": [_current("current_streak"), leading]}
+        else:
+            fields["current_streak"] = runs[-1]
+        fields["best_streak"] = {
+            "$max": [_current("best_streak"), {"$add": [_current("current_streak"), leading]}, max(runs)]
+        }
+    fields["updated_at"] = datetime.now(timezone.utc)
+    return [{"$set": fields}]
+
+
+async def record_answers(outcomes: Iterable) -> None:
+    """채점 결과(Outcome) 순서대로 통계 문서를 bulk_write 한 번으로 갱신합니다."""
+    grouped: Dict[str, Tuple[dict, bool, List[bool]]] = {}
+    for outcome in outcomes:
+        for key, identity, streaks in _scopes(outcome.user_id, outcome.menu_id, _day(outcome.scored_at)):
+            grouped.setdefault(key, (identity, streaks, []))[2].append(bool(outcome.is_correct))
+    if not grouped:
+        return
+    await stats_col.bulk_write(
+        [
+            UpdateOne({"_id": key}, _answers_update(identity, results, streaks), upsert=True)
+            for key, (identity, streaks, results) in grouped.items()
+        ]
+    )
+
+
+class AnswerStats:
+    """채점 결과(Outcome)를 받은 순서대로 모았다가 STATS_FLUSH_SECONDS마다 record_answers로 저장합니다."""
+
+    def __init__(self):
+        self._pending: list = []
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, outcomes: Iterable) -> None:
+        self._pending.extend(outcomes)
+        if len(self._pending) >= STATS_FLUSH_BATCH:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            pending, self._pending = self._pending, []
+            try:
+                await record_answers(pending)
+            except Exception:
+                # 일부만 반영됐을 수 있으므로 다시 시도하지 않습니다. 통계는 점수보다 덜 중요합니다.
+                logger.exception("answer stats update failed count=%d", len(pending))
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), STATS_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+answer_stats = AnswerStats()
+
+
+async def record_game(user_id: str, menu_id: ObjectId, score: int, played_at: datetime) -> None:
+    await stats_col.bulk_write(
+        [
+            UpdateOne(
+                {"_id": key},
+                {
+                    "$inc": {"games": 1, "score_sum": score},
+                    "$max": {"best_score": score},
+                    "$set": {**identity, "updated_at": datetime.now(timezone.utc)},
+                },
+                upsert=True,
+            )
+            for key, identity, _streaks in _scopes(user_id, menu_id, _day(played_at))
+        ]
+    )
+
+
+def public_stats(doc: Optional[dict]) -> dict:
+    doc = dict(doc or {})
+    doc.pop("_id", None)
+    served = doc.get("orders_served", 0)
+    games = doc.get("games", 0)
+    doc["accuracy"] = doc.get("correct", 0) / served if served else None
+    doc["average_score"] = doc.get("score_sum", 0) / games if games else None
+    return doc
+
+
+def recent_days(days: int) -> List[str]:
+    # 오늘(UTC)부터 거꾸로 days일
+    today = datetime.now(timezone.utc)
+    return [_day(today - timedelta(days=offset)) for offset in range(days)]